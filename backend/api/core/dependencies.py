@@ -256,13 +256,12 @@ async def get_db() -> AsyncSession:
 
 # ============ 权限检查依赖 ============
 
-from backend.api.services.tier_service import TierService
-from utils.database import Database
+from backend.api.repositories.async_queries import TierQueries, UserQueries
 
 
 async def require_admin(current_user_id: int = Depends(get_current_user)) -> int:
     """要求超级管理员权限"""
-    if not TierService.is_superuser(current_user_id):
+    if not await TierQueries.is_superuser(current_user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="需要超级管理员权限"
@@ -272,27 +271,15 @@ async def require_admin(current_user_id: int = Depends(get_current_user)) -> int
 
 async def get_user_tier(current_user_id: int = Depends(get_current_user)) -> str:
     """获取当前用户的会员等级"""
-    return TierService.get_user_tier(current_user_id)
+    return await TierQueries.get_user_tier(current_user_id)
 
 
 async def get_user_info_with_tier(current_user_id: int = Depends(get_current_user)) -> dict:
-    """获取包含会员等级的用户信息"""
-    with Database.get_cursor() as cursor:
-        cursor.execute("""
-            SELECT id, username, email, display_name, membership_tier
-            FROM users WHERE id = %s
-        """, (current_user_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="用户不存在"
-            )
-        return {
-            "id": row['id'],
-            "username": row['username'],
-            "email": row['email'],
-            "display_name": row['display_name'],
-            "membership_tier": row['membership_tier'],
-            "is_admin": TierService.is_superuser(current_user_id)
-        }
+    """获取包含会员等级的用户信息（单次异步查询，不阻塞事件循环）"""
+    user_info = await UserQueries.get_user_info(current_user_id)
+    if not user_info:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    return user_info
@@ -6,14 +6,16 @@ FAISS 索引缓存管理器
 - FAISS 索引存储在文件系统
 - Redis 缓存元数据和状态
 - 支持多用户隔离
+- 进程内缓存按字节数 LRU 淘汰，索引以只读 mmap 加载，同一节点的多个进程共享页缓存
 """
 
 import logging
 import os
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Any
 
 from backend.api.core.redis_client import redis_client
+from utils.faiss_store import FaissLRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +32,8 @@ class FaissIndexCache:
 
     def __init__(self):
         """初始化缓存管理器"""
-        # 进程内内存缓存（避免重复加载）
-        self._memory_cache: Dict[str, Any] = {}
+        # 进程内内存缓存（避免重复加载），按字节数限制，长时间运行内存保持平稳
+        self._memory_cache: FaissLRUCache = FaissLRUCache()
         self._base_dir = 'data/faiss'
 
     async def get_or_load_index(
@@ -229,12 +231,13 @@ class FaissIndexCache:
         try:
             from utils.embedding_utils import create_faiss_index
 
-            # 使用 create_faiss_index 加载现有索引
+            # 使用 create_faiss_index 加载现有索引（只读 mmap，检索时不复制向量）
             faiss_index = create_faiss_index(
                 load_from_disk=True,
                 index_dir=self._base_dir,
                 username=str(user_id),
-                article_id=task_id
+                article_id=task_id,
+                mmap=True
             )
 
             if faiss_index.get_size() > 0:
@@ -395,8 +398,7 @@ async def cleanup_expired_faiss_indexes(ctx=None) -> dict:
 
                 # 4. 清除内存缓存
                 cache_key = f"{user_id}:{task_id}"
-                if cache_key in faiss_cache._memory_cache:
-                    del faiss_cache._memory_cache[cache_key]
+                faiss_cache._memory_cache.pop(cache_key, None)
 
                 stats["cleaned"] += 1
                 logger.info(f"Successfully cleaned FAISS index: user={user_id}, task={task_id}")
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+FAISS 索引就绪信号（进程内 Future + Redis Pub/Sub）
+
+原先每个章节插图前都调用 _wait_for_faiss_index，每 2 秒轮询一次 faiss_cache 和
+Redis 图片状态，最多 30 秒，还会重复尝试从磁盘加载。现在：
+
+- 后台索引任务完成（或失败）时调用 notify：直接完成本进程内该任务的 Future，
+  并 PUBLISH 到 faiss:ready:{user_id}:{task_id}，通知其他进程
+- 第一个等待者启动一个监听协程：先订阅频道，再调用 probe 检查一次当前状态
+  （索引可能在订阅前已经就绪），之后只等待信号，不再轮询
+- 同一任务的所有章节共享同一个 Future，索引只解析一次；等待超时按任务计算，
+  超时后的章节立即回退，监听协程仍在后台继续等待，索引就绪后后续章节可直接使用
+
+消息格式：ready / failed
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from backend.api.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+FAISS_READY_CHANNEL_PREFIX = "faiss:ready:"
+# 首个等待者开始后，监听协程最多在后台继续等待的时间（秒）
+FAISS_READY_LISTEN_TIMEOUT = float(os.getenv('FAISS_READY_LISTEN_TIMEOUT', '600'))
+
+READY = "ready"
+FAILED = "failed"
+
+# probe 返回 PENDING 表示索引尚未就绪，返回 None 表示已确定不可用
+PENDING = object()
+
+Probe = Callable[[], Awaitable[Any]]
+
+
+def ready_channel(user_id: int, task_id: str) -> str:
+    return f"{FAISS_READY_CHANNEL_PREFIX}{user_id}:{task_id}"
+
+
+class _TaskWaiter:
+    """单个任务的等待状态：共享 Future、等待截止时间和后台监听协程"""
+
+    __slots__ = ('future', 'deadline', 'listener')
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.deadline: Optional[float] = None
+        self.listener: Optional[asyncio.Task] = None
+
+
+class FaissReadySignal:
+    """
+    按任务注册的 FAISS 就绪信号
+
+    记录最近 max_tasks 个任务；任务结束时调用 forget 释放 Future 持有的索引。
+    """
+
+    def __init__(self, max_tasks: int = 256, listen_timeout: float = FAISS_READY_LISTEN_TIMEOUT):
+        self.max_tasks = max_tasks
+        self.listen_timeout = listen_timeout
+        self._waiters: "OrderedDict[str, _TaskWaiter]" = OrderedDict()
+
+    def _get_waiter(self, user_id: int, task_id: str) -> _TaskWaiter:
+        key = f"{user_id}:{task_id}"
+        loop = asyncio.get_running_loop()
+        waiter = self._waiters.pop(key, None)
+        # Future 绑定事件循环，不同事件循环（如测试、独立线程）各自创建
+        if waiter is None or waiter.future.get_loop() is not loop:
+            waiter = _TaskWaiter(loop.create_future())
+        self._waiters[key] = waiter
+        while len(self._waiters) > self.max_tasks:
+            _, stale = self._waiters.popitem(last=False)
+            self._cancel_listener(stale)
+        return waiter
+
+    @staticmethod
+    def _cancel_listener(waiter: _TaskWaiter) -> None:
+        if waiter.listener and not waiter.listener.done():
+            waiter.listener.cancel()
+
+    @staticmethod
+    def _resolve(waiter: _TaskWaiter, result: Any) -> None:
+        if not waiter.future.done():
+            waiter.future.set_result(result)
+
+    async def notify(self, user_id: int, task_id: str, faiss_index: Any = None) -> None:
+        """
+        发布索引结果：faiss_index 为 None 表示创建失败
+
+        本进程内的等待者直接拿到索引对象；发布失败只记录日志。
+        """
+        self._resolve(self._get_waiter(user_id, task_id), faiss_index)
+        message = READY if faiss_index is not None else FAILED
+        try:
+            await redis_client.async_client.publish(ready_channel(user_id, task_id), message)
+        except Exception as e:
+            logger.warning(f"[FaissReady] Publish failed: user={user_id}, task={task_id}, error={e}")
+
+    async def wait(self, user_id: int, task_id: str, probe: Probe, timeout: float = 30.0) -> Optional[Any]:
+        """
+        等待索引就绪，返回索引或 None（失败 / 超时）
+
+        probe 检查当前状态：返回索引、None（已失败）或 PENDING（未就绪）。
+        同一任务只在第一次等待时调用 probe；收到其他进程的 ready 消息后再调用一次加载索引。
+        """
+        waiter = self._get_waiter(user_id, task_id)
+        if waiter.future.done():
+            return waiter.future.result()
+
+        if waiter.deadline is None:
+            waiter.deadline = time.monotonic() + timeout
+        if waiter.listener is None:
+            waiter.listener = asyncio.create_task(self._listen(user_id, task_id, waiter, probe))
+
+        remaining = waiter.deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), remaining)
+        except asyncio.TimeoutError:
+            logger.warning(f"[FaissReady] Timeout waiting for index: user={user_id}, task={task_id}, timeout={timeout}s")
+            return None
+
+    async def _listen(self, user_id: int, task_id: str, waiter: _TaskWaiter, probe: Probe) -> None:
+        """订阅频道 → 检查一次当前状态 → 等待 ready / failed 消息"""
+        pubsub = None
+        try:
+            try:
+                pubsub = redis_client.async_client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(ready_channel(user_id, task_id))
+            except Exception as e:
+                # 无法订阅时仍可由本进程内的 notify 完成
+                logger.warning(f"[FaissReady] Subscribe failed, waiting for in-process signal only: {e}")
+                pubsub = None
+
+            result = await probe()
+            if result is not PENDING:
+                self._resolve(waiter, result)
+                return
+
+            if pubsub is None:
+                return
+            give_up_at = time.monotonic() + self.listen_timeout
+            while not waiter.future.done():
+                remaining = give_up_at - time.monotonic()
+                if remaining <= 0:
+                    logger.debug(f"[FaissReady] Listener expired: user={user_id}, task={task_id}")
+                    return
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(remaining, 5.0))
+                if message is None:
+                    continue
+                if message.get('data') == FAILED:
+                    self._resolve(waiter, None)
+                elif message.get('data') == READY and not waiter.future.done():
+                    result = await probe()
+                    self._resolve(waiter, None if result is PENDING else result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[FaissReady] Listener failed: user={user_id}, task={task_id}, error={e}")
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.unsubscribe()
+                    await pubsub.aclose()
+                except Exception as e:
+                    logger.debug(f"[FaissReady] Pubsub close failed: {e}")
+
+    def forget(self, user_id: int, task_id: str) -> None:
+        """任务结束后释放等待状态（及其引用的索引）"""
+        waiter = self._waiters.pop(f"{user_id}:{task_id}", None)
+        if waiter is not None:
+            self._cancel_listener(waiter)
+
+
+# 全局实例
+faiss_ready = FaissReadySignal()
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+文章生成进度事件推送（Redis Stream + Pub/Sub）
+
+原先 SSE 接口每秒 HGETALL 一次进度哈希，并重发完整内容（整篇 live_article、搜索结果等）。
+现在进度写入方（redis_client.set_article_progress / ProgressTracker.update）在写哈希的同时发布增量事件：
+
+- 事件追加到 article:events:{task_id}（有长度上限和 TTL），Stream ID 即 SSE 事件 ID，用于断线续传
+- 同时 PUBLISH 到 article:progress:events:{task_id}，订阅方收到后立即转发
+- 搜索结果、大纲、图片等大字段只在本次更新包含时发送
+
+撰写阶段的实时文章按章节追加保存在 Redis 列表 article:segments:{task_id} 中
+（每个元素是一个片段，序号即列表下标 + 1），进度哈希不再反复写入整篇文章；
+事件中以 article_append {seq, text} 只携带新增片段，每次写入的代价与章节长度成正比。
+
+订阅前先按进度哈希中的 user_id 校验任务归属（is_task_owner）。
+订阅方（SSE、WebSocket）先发送一次快照（进度哈希 + 拼接后的文章和片段序号 article_seq），
+之后只转发增量事件；客户端按 seq 拼接，重复的片段（seq 不大于已有序号）直接忽略。
+
+事件流和片段列表不使用 article:progress:* 前缀，该前缀下只有进度哈希。
+"""
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from backend.api.core.redis_client import progress_key, redis_client
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_CHANNEL_PREFIX = "article:progress:events:"
+PROGRESS_STREAM_PREFIX = "article:events:"
+ARTICLE_SEGMENTS_PREFIX = "article:segments:"
+PROGRESS_STREAM_MAXLEN = int(os.getenv('PROGRESS_STREAM_MAXLEN', '500'))
+PROGRESS_HEARTBEAT_INTERVAL = float(os.getenv('PROGRESS_HEARTBEAT_INTERVAL', '15'))
+
+TERMINAL_STATUSES = ('completed', 'failed', 'error')
+
+# 进度哈希中以 JSON 字符串保存的字段
+_JSON_FIELDS = ('outline', 'search_results', 'search_stats', 'images', 'references', 'article_metadata')
+
+
+def events_channel(task_id: str) -> str:
+    return f"{PROGRESS_CHANNEL_PREFIX}{task_id}"
+
+
+def events_stream(task_id: str) -> str:
+    return f"{PROGRESS_STREAM_PREFIX}{task_id}"
+
+
+def article_segments_key(task_id: str) -> str:
+    return f"{ARTICLE_SEGMENTS_PREFIX}{task_id}"
+
+
+def parse_event_id(event_id: Optional[str]) -> Tuple[int, int]:
+    """解析 Stream ID（<毫秒>-<序号>），无效 ID 视为最小值"""
+    try:
+        ms, _, seq = (event_id or '').partition('-')
+        return int(ms), int(seq or 0)
+    except ValueError:
+        return 0, 0
+
+
+def is_terminal(event: Dict[str, Any]) -> bool:
+    return event.get('status') in TERMINAL_STATUSES
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _load_json(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return None
+    return value
+
+
+def build_progress_event(task_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把进度哈希字段转换为 SSE 事件格式
+
+    同时兼容 set_article_progress 写入的字段（progress_percent/current_step/content/...）
+    和 ProgressTracker 写入的字段（progress/step/data）。
+    """
+    current_status = fields.get('status') or 'unknown'
+    progress = fields.get('progress_percent')
+    if progress is None:
+        progress = fields.get('progress', 0)
+    event = {
+        "task_id": task_id,
+        "type": current_status,
+        "status": current_status,
+        "progress_percent": _to_int(progress),
+        "current_step": fields.get('current_step') or fields.get('step') or '',
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+    data = {}
+    if fields.get('content'):
+        data['live_article'] = fields['content']
+    if fields.get('error_message'):
+        data['error_message'] = fields['error_message']
+    for name in _JSON_FIELDS:
+        if fields.get(name):
+            value = _load_json(fields[name])
+            if value is not None:
+                data[name] = value
+
+    tracker_data = _load_json(fields.get('data')) if fields.get('data') else None
+    if isinstance(tracker_data, dict):
+        if tracker_data.get('type'):
+            event['type'] = tracker_data['type']
+        data.update({k: v for k, v in tracker_data.items() if k != 'type'})
+
+    if data:
+        event['data'] = data
+    return event
+
+
+def pending_event(task_id: str) -> Dict[str, Any]:
+    """任务尚未开始或已过期时的占位事件"""
+    return {
+        "task_id": task_id,
+        "type": "pending",
+        "status": "queued",
+        "progress_percent": 0,
+        "current_step": "等待中",
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+class ProgressEventPublisher:
+    """
+    进度增量事件发布器
+
+    为每个任务记录最近一次发布的状态和进度，更新中缺失的进度字段沿用上一次的值，
+    每个事件都是完整可用的进度信息。
+
+    进程内没有该任务的状态时（首次发布、LRU 淘汰或终止事件之后），publish 先从进度哈希
+    读取当前状态和进度作为初始值；仍然未知的状态不写入事件，而不是假定为 queued。
+    """
+
+    def __init__(self, max_tasks: int = 256):
+        self.max_tasks = max_tasks
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _get_state(self, task_id: str, seed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        state = self._states.pop(task_id, None)
+        if state is None:
+            seed = seed or {}
+            progress = seed.get('progress_percent') or seed.get('progress')
+            state = {
+                'status': seed.get('status') or None,
+                'progress_percent': _to_int(progress),
+                'current_step': seed.get('current_step') or seed.get('step') or '',
+            }
+        self._states[task_id] = state
+        while len(self._states) > self.max_tasks:
+            self._states.popitem(last=False)
+        return state
+
+    def has_state(self, task_id: str) -> bool:
+        return task_id in self._states
+
+    async def _load_seed(self, task_id: str) -> Dict[str, Any]:
+        """从进度哈希读取当前状态和进度（一次 HMGET），失败时返回空字典"""
+        names = ('status', 'progress_percent', 'progress', 'current_step', 'step')
+        try:
+            values = await redis_client.async_client.hmget(progress_key(task_id), list(names))
+        except Exception as e:
+            logger.debug(f"[ProgressEvents] Failed to load state for {task_id}: {e}")
+            return {}
+        return {name: value for name, value in zip(names, values) if value is not None}
+
+    def make_delta(self, task_id: str, fields: Dict[str, Any],
+                   seed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        把一次进度更新转换为增量事件
+
+        Args:
+            seed: 进程内没有该任务状态时使用的初始值（进度哈希中的字段）
+        """
+        state = self._get_state(task_id, seed)
+        progress = fields.get('progress_percent', fields.get('progress'))
+        step = fields.get('current_step', fields.get('step'))
+        if fields.get('status'):
+            state['status'] = fields['status']
+        if progress is not None:
+            state['progress_percent'] = _to_int(progress)
+        if step is not None:
+            state['current_step'] = step
+
+        event = build_progress_event(task_id, {
+            **fields,
+            'status': state['status'],
+            'progress_percent': state['progress_percent'],
+            'current_step': state['current_step'],
+        })
+        if state['status'] is None:
+            # 状态未知：不发送 status，订阅方保留已有状态
+            del event['status']
+            event['type'] = 'progress'
+
+        if fields.get('article_append'):
+            event.setdefault('data', {})['article_append'] = fields['article_append']
+
+        if is_terminal(event):
+            self._states.pop(task_id, None)
+        return event
+
+    async def publish(self, task_id: str, fields: Dict[str, Any], ttl: int = 3600) -> Optional[str]:
+        """
+        发布进度增量事件，返回事件 ID
+
+        推送失败只记录日志，不影响进度哈希的写入。
+        """
+        seed = None
+        if not self.has_state(task_id):
+            seed = await self._load_seed(task_id)
+        event = self.make_delta(task_id, fields, seed)
+        payload = json.dumps(event, ensure_ascii=False)
+        try:
+            client = redis_client.async_client
+            stream = events_stream(task_id)
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.xadd(stream, {'event': payload}, maxlen=PROGRESS_STREAM_MAXLEN, approximate=True)
+                pipe.expire(stream, ttl)
+                event_id, _ = await pipe.execute()
+            # 消息格式：<事件 ID> <事件 JSON>
+            await client.publish(events_channel(task_id), f"{event_id} {payload}")
+            return event_id
+        except Exception as e:
+            logger.warning(f"[ProgressEvents] Publish failed for {task_id}: {e}")
+            return None
+
+
+async def append_article_segment(task_id: str, progress_key: str, progress_fields: Dict[str, str],
+                                 text: str, ttl: int) -> int:
+    """
+    在一个事务中追加文章片段并更新进度哈希，返回片段序号
+
+    只写入本次的片段和少量进度字段，不重写整篇文章。
+    """
+    segments_key = article_segments_key(task_id)
+    async with redis_client.async_client.pipeline(transaction=True) as pipe:
+        pipe.rpush(segments_key, text)
+        pipe.expire(segments_key, ttl)
+        pipe.hset(progress_key, mapping=progress_fields)
+        pipe.expire(progress_key, ttl)
+        seq, *_ = await pipe.execute()
+    return seq
+
+
+async def is_task_owner(task_id: str, user_id: Any) -> bool:
+    """进度哈希中的 user_id 与调用方一致时返回 True；任务不存在或没有归属时一律拒绝"""
+    owner = await redis_client.async_client.hget(progress_key(task_id), 'user_id')
+    return bool(owner) and str(owner) == str(user_id)
+
+
+def decode_message(data: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """解析频道消息，返回 (事件 ID, 事件)"""
+    try:
+        event_id, _, payload = data.partition(' ')
+        return event_id, json.loads(payload)
+    except (AttributeError, json.JSONDecodeError):
+        logger.warning(f"[ProgressEvents] Invalid message: {str(data)[:80]}")
+        return None
+
+
+async def load_snapshot(task_id: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    读取当前快照，返回 (快照对应的事件 ID, 快照事件)
+
+    Stream 最新 ID、进度哈希和文章片段在同一个事务中读取。哈希和片段总是先于事件写入，
+    快照不会比该 ID 旧；之后重复收到的追加事件由客户端按 seq 忽略。
+    """
+    async with redis_client.async_client.pipeline(transaction=True) as pipe:
+        pipe.xrevrange(events_stream(task_id), count=1)
+        pipe.hgetall(progress_key(task_id))
+        pipe.lrange(article_segments_key(task_id), 0, -1)
+        entries, progress, segments = await pipe.execute()
+    cursor = entries[0][0] if entries else '0-0'
+    if not progress:
+        return cursor, pending_event(task_id)
+
+    event = build_progress_event(task_id, progress)
+    if segments:
+        data = event.setdefault('data', {})
+        # 完成后进度哈希中保存的是完整文章，优先使用
+        data.setdefault('live_article', ''.join(segments))
+        data['article_seq'] = len(segments)
+    return cursor, event
+
+
+async def load_article(task_id: str) -> Tuple[int, str]:
+    """读取撰写中的实时文章，返回 (片段数, 拼接后的文章)"""
+    segments = await redis_client.async_client.lrange(article_segments_key(task_id), 0, -1)
+    return len(segments), ''.join(segments)
+
+
+async def replay_events(task_id: str, after_id: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    读取 after_id 之后的事件；Stream 已过期或被截断（无法连续补发）时返回 None
+    """
+    client = redis_client.async_client
+    stream = events_stream(task_id)
+    first = await client.xrange(stream, min='-', max='+', count=1)
+    if not first or parse_event_id(first[0][0]) > parse_event_id(after_id):
+        return None
+    entries = await client.xrange(stream, min=f"({after_id}", max='+')
+    events = []
+    for event_id, fields in entries:
+        try:
+            events.append((event_id, json.loads(fields['event'])))
+        except (KeyError, json.JSONDecodeError):
+            continue
+    return events
+
+
+async def stream_progress_events(
+    task_id: str,
+    last_event_id: Optional[str] = None,
+    heartbeat_interval: float = PROGRESS_HEARTBEAT_INTERVAL,
+) -> AsyncIterator[Tuple[Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    订阅单个任务的进度事件
+
+    先订阅频道，再发送快照（或从 last_event_id 续传），之后转发实时事件，
+    任务进入终止状态后结束。heartbeat_interval 内没有事件时产出 (None, None) 作为心跳。
+    """
+    pubsub = redis_client.async_client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(events_channel(task_id))
+    try:
+        replayed = await replay_events(task_id, last_event_id) if last_event_id else None
+        if replayed is None:
+            cursor, snapshot = await load_snapshot(task_id)
+            yield cursor, snapshot
+            if is_terminal(snapshot):
+                return
+        else:
+            cursor = last_event_id
+            for event_id, event in replayed:
+                cursor = event_id
+                yield event_id, event
+                if is_terminal(event):
+                    return
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat_interval)
+            if message is None:
+                yield None, None
+                continue
+            decoded = decode_message(message.get('data'))
+            if decoded is None:
+                continue
+            event_id, event = decoded
+            # 快照或补发已经覆盖的事件
+            if parse_event_id(event_id) <= parse_event_id(cursor):
+                continue
+            cursor = event_id
+            yield event_id, event
+            if is_terminal(event):
+                return
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        except Exception as e:
+            logger.debug(f"[ProgressEvents] Pubsub close failed: {e}")
+
+
+# 全局实例
+progress_publisher = ProgressEventPublisher()
@@ -5,13 +5,27 @@ import redis.asyncio as aioredis
 import redis
 import json
 import logging
-from typing import Optional, Dict, List, Any
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
 from backend.api.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 用户任务索引即用户队列：有序集合 user:queue:{user_id}，成员为 task_id，
+# 分数为入队时间，ProgressTracker.init 和 set_article_progress（带 user_id）写入时刷新为更新时间
+USER_QUEUE_TTL = 604800  # 7 天
+USER_QUEUE_MAX = 200     # 按用户列出任务时最多读取的任务数
+
+
+def progress_key(task_id: str) -> str:
+    return f"article:progress:{task_id}"
+
+
+def user_queue_key(user_id: int) -> str:
+    return f"user:queue:{user_id}"
+
 
 class RedisClient:
     """Redis 客户端（支持同步和异步）"""
@@ -61,11 +75,140 @@ class RedisClient:
             logger.error(f"Redis async ping failed: {e}")
             return False
 
+    # ============ 批量操作 ============
+
+    def pipeline(self, transaction: bool = True):
+        """获取异步 pipeline（transaction=True 时以 MULTI/EXEC 原子执行），多条命令一次往返"""
+        return self.async_client.pipeline(transaction=transaction)
+
+    async def hset_with_ttl(self, key: str, mapping: Dict[str, Any], ttl: int,
+                            defaults: Optional[Dict[str, Any]] = None):
+        """
+        在一个事务中写入哈希并设置过期时间
+
+        Args:
+            defaults: 仅在字段不存在时写入（HSETNX），如 created_at
+        """
+        async with self.pipeline() as pipe:
+            for field, value in (defaults or {}).items():
+                pipe.hsetnx(key, field, value)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def write_task_progress(self, task_id: str, mapping: Dict[str, Any], ttl: int,
+                                  user_id: Optional[int] = None,
+                                  defaults: Optional[Dict[str, Any]] = None,
+                                  index: bool = False):
+        """
+        写入任务进度哈希（HSET + EXPIRE 一个事务）
+
+        Args:
+            user_id: 任务所属用户，写入哈希的 user_id 字段（订阅进度时据此校验归属）
+            defaults: 仅在字段不存在时写入（HSETNX），如 created_at
+            index: 为 True 且提供 user_id 时，在同一事务中把任务加入用户队列（分数为当前时间），
+                不经过 add_to_user_queue 的任务（如 batch / agent 任务）也能被按用户列出
+        """
+        key = progress_key(task_id)
+        if user_id is not None:
+            mapping = {**mapping, "user_id": str(user_id)}
+        async with self.pipeline() as pipe:
+            for field, value in (defaults or {}).items():
+                pipe.hsetnx(key, field, value)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, ttl)
+            if index and user_id is not None:
+                queue_key = user_queue_key(user_id)
+                pipe.zadd(queue_key, {task_id: time.time()})
+                pipe.expire(queue_key, USER_QUEUE_TTL)
+            await pipe.execute()
+
+    async def get_progress_many(self, task_ids: List[str]) -> List[Optional[Dict[str, str]]]:
+        """一次 pipeline 读取多个任务的进度哈希，不存在的任务为 None"""
+        results = await self.hgetall_many([progress_key(task_id) for task_id in task_ids])
+        return [data or None for data in results]
+
+    async def get_user_task_progress(self, user_id: int, limit: int = USER_QUEUE_MAX) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        按用户队列读取任务进度（最近入队或更新的在前）
+
+        读取代价只与该用户的任务数有关；进度已过期的任务顺便从队列中移除。
+
+        Returns:
+            [(task_id, 进度哈希)]
+        """
+        key = user_queue_key(user_id)
+        task_ids = await self.async_client.zrevrange(key, 0, limit - 1)
+        if not task_ids:
+            return []
+
+        entries = []
+        expired = []
+        for task_id, data in zip(task_ids, await self.get_progress_many(task_ids)):
+            if data:
+                entries.append((task_id, data))
+            else:
+                expired.append(task_id)
+        if expired:
+            await self.async_client.zrem(key, *expired)
+        return entries
+
+    async def sadd_many(self, key: str, members: Iterable[str], ttl: Optional[int] = None) -> Tuple[int, int]:
+        """
+        一条 SADD 批量添加集合成员（同一事务内设置过期时间）
+
+        Returns:
+            (新增数量, 添加后集合大小)
+        """
+        members = list(members)
+        async with self.pipeline() as pipe:
+            if members:
+                pipe.sadd(key, *members)
+            if ttl:
+                pipe.expire(key, ttl)
+            pipe.scard(key)
+            results = await pipe.execute()
+        added = results[0] if members else 0
+        return added, results[-1]
+
+    async def hgetall_many(self, keys: List[str]) -> List[Dict[str, str]]:
+        """一次往返读取多个哈希，结果与 keys 顺序一致"""
+        if not keys:
+            return []
+        async with self.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            return await pipe.execute()
+
+    async def scan_hgetall(self, pattern: str, count: int = 100) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        SCAN 匹配的键并批量读取哈希（每批 count 个键一次往返）
+
+        Returns:
+            [(key, 哈希内容)]，已过滤掉空哈希
+        """
+        results = []
+        batch = []
+
+        async def flush():
+            for key, data in zip(batch, await self.hgetall_many(batch)):
+                if data:
+                    results.append((key, data))
+            batch.clear()
+
+        async for key in self.async_client.scan_iter(match=pattern, count=count):
+            batch.append(key)
+            if len(batch) >= count:
+                await flush()
+        if batch:
+            await flush()
+        return results
+
     # ============ 文章进度相关 ============
 
-    async def set_article_progress(self, article_id: str, data: Dict[str, Any], ttl: int = 1800):
-        """设置文章生成进度（默认30分钟）"""
-        key = f"article:progress:{article_id}"
+    async def set_article_progress(self, article_id: str, data: Dict[str, Any], ttl: int = 1800,
+                                   user_id: Optional[int] = None):
+        """设置文章生成进度（默认30分钟），提供 user_id 时记录任务归属"""
         now_iso = datetime.utcnow().isoformat()
         
         # 根据状态调整 TTL
@@ -74,31 +217,51 @@ class RedisClient:
         elif data.get("status") == "failed":
             ttl = 3600   # 失败后保留 1 小时
 
-        # 自动补充时间戳，便于识别僵尸任务
-        if "created_at" not in data:
-            existing_created_at = await self.async_client.hget(key, "created_at")
-            if existing_created_at:
-                data["created_at"] = existing_created_at
-            else:
-                data["created_at"] = now_iso
+        # 自动补充时间戳，便于识别僵尸任务（created_at 只在首次写入时设置）
         data["updated_at"] = now_iso
 
         # 转换所有值为字符串
         str_data = {k: str(v) if v is not None else "" for k, v in data.items()}
-        
-        await self.async_client.hset(key, mapping=str_data)
-        await self.async_client.expire(key, ttl)
+
+        defaults = None if "created_at" in data else {"created_at": now_iso}
+        await self.write_task_progress(article_id, str_data, ttl, user_id=user_id, defaults=defaults,
+                                       index=user_id is not None)
+
+        # 推送增量事件给 SSE / WebSocket 订阅方
+        from backend.api.core.progress_events import progress_publisher
+        await progress_publisher.publish(article_id, data, ttl)
+
+    async def append_article_progress(self, article_id: str, text: str, data: Dict[str, Any], ttl: int = 1800,
+                                      user_id: Optional[int] = None) -> int:
+        """
+        追加实时文章片段（通常是一个章节）并更新进度字段，返回片段序号
+
+        片段保存在独立的 Redis 列表中，进度哈希只写入本次的进度字段。
+        """
+        from backend.api.core.progress_events import append_article_segment, progress_publisher
+
+        data["updated_at"] = datetime.utcnow().isoformat()
+        str_data = {k: str(v) if v is not None else "" for k, v in data.items()}
+        if user_id is not None:
+            str_data["user_id"] = str(user_id)
+        seq = await append_article_segment(article_id, progress_key(article_id), str_data, text, ttl)
+        await progress_publisher.publish(article_id, {**data, "article_append": {"seq": seq, "text": text}}, ttl)
+        return seq
 
     async def get_article_progress(self, article_id: str) -> Optional[Dict[str, Any]]:
         """获取文章生成进度"""
-        key = f"article:progress:{article_id}"
-        data = await self.async_client.hgetall(key)
+        data = await self.async_client.hgetall(progress_key(article_id))
         return data if data else None
 
-    async def delete_article_progress(self, article_id: str):
-        """删除文章进度"""
-        key = f"article:progress:{article_id}"
-        await self.async_client.delete(key)
+    async def delete_article_progress(self, article_id: str, user_id: Optional[int] = None):
+        """删除文章进度（提供 user_id 时同时移出用户队列）"""
+        from backend.api.core.progress_events import article_segments_key, events_stream
+
+        async with self.pipeline() as pipe:
+            pipe.delete(progress_key(article_id), article_segments_key(article_id), events_stream(article_id))
+            if user_id is not None:
+                pipe.zrem(user_queue_key(user_id), article_id)
+            await pipe.execute()
 
     async def get_all_article_progress(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -111,21 +274,19 @@ class RedisClient:
             任务列表
         """
         tasks = []
-        pattern = "article:progress:*"
 
-        # 使用 SCAN 遍历所有进度键
-        async for key in self.async_client.scan_iter(match=pattern, count=100):
-            data = await self.async_client.hgetall(key)
+        if user_id is not None:
+            # 读取用户队列，代价只与该用户的任务数有关
+            entries = await self.get_user_task_progress(user_id)
+        else:
+            # 管理视角：SCAN 遍历进度键，按批次 pipeline 读取
+            entries = await self.scan_hgetall("article:progress:*")
+
+        for key, data in entries:
             if data:
-                # 提取 task_id
+                # 提取 task_id（队列条目的 key 即 task_id）
                 task_id = data.get('task_id', key.split(':')[-1])
 
-                # 过滤用户
-                if user_id is not None:
-                    task_user_id = data.get('user_id')
-                    if task_user_id != str(user_id):
-                        continue
-
                 # 解析进度数据
                 task = {
                     'task_id': task_id,
@@ -148,8 +309,9 @@ class RedisClient:
 
                 tasks.append(task)
 
-        # 按时间戳排序（最新的在前）
-        tasks.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        # 按时间戳排序（最新的在前）；用户队列本身已按时间倒序
+        if user_id is None:
+            tasks.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
         return tasks
 
     # ============ 用户队列相关 ============
@@ -158,19 +320,21 @@ class RedisClient:
         """添加到用户队列"""
         if score is None:
             score = datetime.now().timestamp()
-        key = f"user:queue:{user_id}"
-        await self.async_client.zadd(key, {article_id: score})
-        await self.async_client.expire(key, 604800)  # 7 天过期
+        key = user_queue_key(user_id)
+        async with self.pipeline() as pipe:
+            pipe.zadd(key, {article_id: score})
+            pipe.expire(key, USER_QUEUE_TTL)
+            await pipe.execute()
 
     async def get_user_queue(self, user_id: int, limit: int = 20) -> List[tuple]:
         """获取用户队列"""
-        key = f"user:queue:{user_id}"
+        key = user_queue_key(user_id)
         items = await self.async_client.zrevrange(key, 0, limit - 1, withscores=True)
         return items
 
     async def remove_from_queue(self, user_id: int, article_id: str):
         """从用户队列中移除"""
-        key = f"user:queue:{user_id}"
+        key = user_queue_key(user_id)
         await self.async_client.zrem(key, article_id)
 
     # ============ 热点缓存相关 ============
@@ -188,6 +352,21 @@ class RedisClient:
             return json.loads(data)
         return None
 
+    # ============ 文章数量缓存 ============
+
+    async def get_cached_article_count(self, user_id: int, status: Optional[str] = None) -> Optional[int]:
+        """获取缓存的用户文章数量（按状态分字段保存）"""
+        value = await self.async_client.hget(f"article:count:{user_id}", status or "all")
+        return int(value) if value is not None else None
+
+    async def cache_article_count(self, user_id: int, count: int, status: Optional[str] = None, ttl: int = 300):
+        """缓存用户文章数量（默认5分钟）"""
+        await self.hset_with_ttl(f"article:count:{user_id}", {status or "all": count}, ttl)
+
+    async def invalidate_article_count(self, user_id: int):
+        """文章新增、删除或状态变化后清除数量缓存（包括各状态字段）"""
+        await self.async_client.delete(f"article:count:{user_id}")
+
     # ============ 草稿相关 ============
 
     async def set_draft(self, user_id: int, article_id: str, content: str, ttl: int = 604800):
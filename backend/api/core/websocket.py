@@ -15,6 +15,9 @@ from backend.api.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 任务进度房间前缀：客户端订阅 task:{task_id} 即可收到该任务的进度事件
+TASK_ROOM_PREFIX = "task:"
+
 
 class ConnectionManager:
     """
@@ -34,6 +37,9 @@ class ConnectionManager:
         # room_id -> Set[user_id]
         self.rooms: Dict[str, Set[str]] = {}
 
+        # 进度事件转发任务（订阅 Redis 进度频道，转发到 task:{task_id} 房间）
+        self._progress_relay: Optional[asyncio.Task] = None
+
     async def connect(self, user_id: str, websocket: WebSocket):
         """
         接受新的 WebSocket 连接
@@ -222,10 +228,88 @@ class ConnectionManager:
         if room_id not in self.rooms:
             return
 
-        for user_id in self.rooms[room_id]:
+        # 发送失败会断开连接并修改房间成员，遍历副本
+        for user_id in list(self.rooms[room_id]):
             if user_id not in exclude:
                 await self.send_message(user_id, data)
 
+    # 文章进度订阅
+
+    async def subscribe_task_progress(self, user_id: str, task_id: str) -> bool:
+        """
+        订阅任务进度：先发送当前快照，之后由转发任务推送增量事件
+
+        Args:
+            user_id: 用户 ID
+            task_id: 任务 ID
+
+        Returns:
+            是否订阅成功（只能订阅自己的任务）
+        """
+        from backend.api.core.progress_events import is_task_owner, load_snapshot
+
+        if not await is_task_owner(task_id, user_id):
+            logger.warning(f"user_id={user_id} denied subscription to task={task_id}")
+            await self.send_message(user_id, {
+                "type": "error",
+                "task_id": task_id,
+                "message": "无权订阅此任务",
+            })
+            return False
+
+        await self.join_room(user_id, f"{TASK_ROOM_PREFIX}{task_id}")
+        self._ensure_progress_relay()
+
+        event_id, snapshot = await load_snapshot(task_id)
+        await self.send_message(user_id, {
+            "type": "article_progress_event",
+            "event_id": event_id,
+            "event": snapshot,
+        })
+        return True
+
+    def _ensure_progress_relay(self):
+        if self._progress_relay is None or self._progress_relay.done():
+            self._progress_relay = asyncio.create_task(self._relay_progress_events())
+
+    async def _relay_progress_events(self):
+        """
+        进程内只维护一个 Pub/Sub 连接（PSUBSCRIBE 全部进度频道），
+        收到事件后转发给对应 task 房间内的用户；没有 task 房间时退出。
+        """
+        from backend.api.core.progress_events import PROGRESS_CHANNEL_PREFIX, decode_message
+        from backend.api.core.redis_client import redis_client
+
+        pubsub = redis_client.async_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.psubscribe(f"{PROGRESS_CHANNEL_PREFIX}*")
+        logger.info("Progress relay started")
+        try:
+            while any(users for room_id, users in self.rooms.items() if room_id.startswith(TASK_ROOM_PREFIX)):
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+                decoded = decode_message(message.get("data"))
+                if decoded is None:
+                    continue
+                event_id, event = decoded
+                task_id = message["channel"][len(PROGRESS_CHANNEL_PREFIX):]
+                await self.send_to_room(f"{TASK_ROOM_PREFIX}{task_id}", {
+                    "type": "article_progress_event",
+                    "event_id": event_id,
+                    "event": event,
+                })
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Progress relay failed: {e}")
+        finally:
+            try:
+                await pubsub.punsubscribe()
+                await pubsub.aclose()
+            except Exception:
+                pass
+            logger.info("Progress relay stopped")
+
     def get_connected_users(self) -> Set[str]:
         """
         获取所有在线用户 ID
@@ -0,0 +1,54 @@
+"""Async raw-SQL access over the shared asyncpg engine.
+
+FastAPI routes historically used ``utils.database.Database`` (psycopg2), whose
+queries block the event loop. ``AsyncDB`` runs the same hand-written SQL through
+``backend.api.db.base.async_engine`` instead, returning plain dicts like
+psycopg2's ``RealDictCursor`` so call sites translate one-to-one.
+
+SQL uses SQLAlchemy named parameters (``:user_id``) instead of ``%s``.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from backend.api.db.base import async_engine
+
+
+class AsyncDB:
+    """Thin async facade for raw SQL on the async engine."""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+
+    @property
+    def engine(self):
+        return self._engine or async_engine
+
+    async def fetch_one(self, sql: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Run a read query and return the first row as a dict (or None)."""
+        async with self.engine.connect() as conn:
+            result = await conn.execute(text(sql), params or {})
+            row = result.mappings().first()
+            return dict(row) if row is not None else None
+
+    async def fetch_all(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Run a read query and return all rows as dicts."""
+        async with self.engine.connect() as conn:
+            result = await conn.execute(text(sql), params or {})
+            return [dict(row) for row in result.mappings().all()]
+
+    async def fetch_val(self, sql: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Run a read query and return the first column of the first row."""
+        async with self.engine.connect() as conn:
+            result = await conn.execute(text(sql), params or {})
+            return result.scalar()
+
+    async def execute(self, sql: str, params: Optional[Dict[str, Any]] = None) -> int:
+        """Run a write statement in its own transaction and return the affected row count."""
+        async with self.engine.begin() as conn:
+            result = await conn.execute(text(sql), params or {})
+            return result.rowcount
+
+
+# Global instance
+async_db = AsyncDB()
@@ -0,0 +1,26 @@
+"""Add (user_id, created_at, id) index for keyset article listing
+
+Revision ID: 20261017_articles_keyset_index
+Revises: 20260406_update_tier_quotas
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "20261017_articles_keyset_index"
+down_revision: Union[str, Sequence[str], None] = "20260406_update_tier_quotas"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_articles_user_created_id
+        ON articles (user_id, created_at DESC, id DESC)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_articles_user_created_id")
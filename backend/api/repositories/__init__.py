@@ -22,6 +22,7 @@ from backend.api.repositories.hotspot import (
     HotspotItemRepository,
     HotspotRankHistoryRepository
 )
+from backend.api.repositories.async_queries import TierQueries, UserQueries, ArticleQueries
 
 __all__ = [
     'BaseRepository',
@@ -44,4 +45,7 @@ __all__ = [
     'HotspotSourceRepository',
     'HotspotItemRepository',
     'HotspotRankHistoryRepository',
+    'TierQueries',
+    'UserQueries',
+    'ArticleQueries',
 ]
@@ -1,12 +1,40 @@
 """Article repository with content management operations."""
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, delete, func
-from typing import Optional, List
+from sqlalchemy import select, and_, or_, delete, func, text
+from typing import Optional, List, Dict, Any, Tuple
 from uuid import UUID
+from datetime import datetime
+import base64
+import json
 from backend.api.db.models.article import Article
 from backend.api.repositories.base import BaseRepository
 
 
+# Length of the excerpt returned by summary listings
+SUMMARY_EXCERPT_LENGTH = 160
+
+
+def encode_article_cursor(created_at: datetime, article_id: Any) -> str:
+    """Encode a (created_at, id) keyset position as an opaque URL-safe cursor."""
+    raw = json.dumps([created_at.isoformat(), str(article_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_article_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decode a cursor produced by encode_article_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, article_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), UUID(article_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 class ArticleRepository(BaseRepository[Article]):
     """
     Repository for Article model with content-specific operations.
@@ -402,3 +430,85 @@ class ArticleRepository(BaseRepository[Article]):
 
         result = await self.session.execute(stmt)
         return result.rowcount
+
+    async def list_summaries_by_user(
+        self,
+        user_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List a user's articles as lightweight summaries using keyset pagination.
+
+        Rows are ordered by (created_at, id) descending and each page starts
+        strictly after the cursor position, so the cost of a page does not grow
+        with its depth. Only a short excerpt and word count are returned;
+        content and metadata are left to the detail endpoint.
+
+        Uses raw SQL because the live articles table has columns (topic,
+        summary, model_type, ...) that are not mapped on the ORM model.
+
+        Args:
+            user_id: User ID
+            limit: Page size
+            cursor: Cursor returned with the previous page
+            status: Optional status filter
+
+        Returns:
+            Tuple of (summary dicts, next page cursor or None)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        conditions = ["user_id = :user_id"]
+        params: Dict[str, Any] = {
+            "user_id": user_id,
+            "limit": limit + 1,
+            "excerpt_length": SUMMARY_EXCERPT_LENGTH,
+        }
+        if status:
+            conditions.append("status = :status")
+            params["status"] = status
+        if cursor:
+            params["cursor_created_at"], params["cursor_id"] = decode_article_cursor(cursor)
+            conditions.append("(created_at, id) < (:cursor_created_at, :cursor_id)")
+
+        stmt = text(f"""
+            SELECT id, topic, title, status, model_type, model_name,
+                   LEFT(COALESCE(NULLIF(summary, ''), content, ''), :excerpt_length) AS excerpt,
+                   COALESCE(NULLIF(word_count, 0), char_length(content), 0) AS word_count,
+                   created_at, updated_at, completed_at
+            FROM articles
+            WHERE {' AND '.join(conditions)}
+            ORDER BY created_at DESC, id DESC
+            LIMIT :limit
+        """)
+        result = await self.session.execute(stmt, params)
+        rows = [dict(row) for row in result.mappings().all()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_article_cursor(last["created_at"], last["id"])
+        return rows, next_cursor
+
+    async def count_user_articles(self, user_id: int, status: Optional[str] = None) -> int:
+        """
+        Count a user's articles in the live articles table.
+
+        Args:
+            user_id: User ID
+            status: Optional status filter
+
+        Returns:
+            Number of articles
+        """
+        sql = "SELECT COUNT(*) FROM articles WHERE user_id = :user_id"
+        params: Dict[str, Any] = {"user_id": user_id}
+        if status:
+            sql += " AND status = :status"
+            params["status"] = status
+        result = await self.session.execute(text(sql), params)
+        return result.scalar() or 0
@@ -0,0 +1,200 @@
+"""Event-loop-safe queries for hot FastAPI routes.
+
+Async counterparts of the psycopg2 queries used by ``TierService``, the
+auth/tier dependencies and the article routes. They run on the asyncpg engine
+via ``AsyncDB``, so a slow query no longer blocks every other request in the
+uvicorn worker. Result shapes match the synchronous versions.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from backend.api.db.async_db import async_db
+from backend.api.services.tier_service import TierService, get_super_admin_emails
+
+
+def _parse_uuid(value: str) -> Optional[UUID]:
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+class TierQueries:
+    """Membership tier and quota queries (async mirror of TierService reads)."""
+
+    @staticmethod
+    async def is_superuser(user_id: int) -> bool:
+        """Check whether the user is a whitelisted superuser."""
+        row = await async_db.fetch_one(
+            "SELECT email, is_superuser FROM users WHERE id = :user_id",
+            {"user_id": user_id}
+        )
+        if not row:
+            return False
+        return row['email'] in get_super_admin_emails() and bool(row['is_superuser'])
+
+    @staticmethod
+    async def get_user_tier(user_id: int) -> str:
+        """Get the user's membership tier ('free' when the user is missing)."""
+        tier = await async_db.fetch_val(
+            "SELECT membership_tier FROM users WHERE id = :user_id",
+            {"user_id": user_id}
+        )
+        return tier or 'free'
+
+    @staticmethod
+    async def get_tier_defaults(tier: str) -> Optional[Dict[str, Any]]:
+        """Get the default models and monthly article limit for a tier."""
+        return await async_db.fetch_one("""
+            SELECT tier, default_chat_model, default_writer_model, article_limit_per_month, updated_at
+            FROM tier_default_models
+            WHERE tier = :tier
+        """, {"tier": tier})
+
+    @staticmethod
+    async def get_global_providers() -> List[Dict[str, Any]]:
+        """Get global LLM providers in the frontend format."""
+        rows = await async_db.fetch_all("""
+            SELECT id, provider_id, provider_name, base_url, models, enabled, api_key_encrypted
+            FROM global_llm_providers
+            ORDER BY provider_id
+        """)
+        return [TierService.provider_row_to_dict(row) for row in rows]
+
+    @staticmethod
+    async def get_tier_available_models(tier: str) -> List[Dict[str, str]]:
+        """Get the models available to a tier (inherits lower tiers)."""
+        return TierService.filter_models_for_tier(await TierQueries.get_global_providers(), tier)
+
+    @staticmethod
+    async def check_user_quota(user_id: int) -> Dict[str, Any]:
+        """
+        Check the user's monthly article quota.
+
+        Tier, tier limit and this month's usage come from a single query.
+
+        Returns:
+            {"allowed", "used", "limit", "remaining"}
+        """
+        row = await async_db.fetch_one("""
+            SELECT COALESCE(u.membership_tier, 'free') AS tier,
+                   t.article_limit_per_month,
+                   (SELECT COUNT(*) FROM articles a
+                    WHERE a.user_id = u.id
+                    AND DATE_TRUNC('month', a.created_at) = DATE_TRUNC('month', CURRENT_DATE)) AS used
+            FROM users u
+            LEFT JOIN tier_default_models t ON t.tier = COALESCE(u.membership_tier, 'free')
+            WHERE u.id = :user_id
+        """, {"user_id": user_id})
+
+        if not row:
+            # Same fallback as TierService: unknown users are treated as free
+            defaults = await TierQueries.get_tier_defaults('free')
+            limit = defaults.get('article_limit_per_month', 5) if defaults else 5
+            return {"allowed": limit > 0, "used": 0, "limit": limit, "remaining": limit}
+
+        used = row['used'] or 0
+        if row['tier'] == 'superuser':
+            return {"allowed": True, "used": used, "limit": 999999, "remaining": 999999}
+
+        limit = row['article_limit_per_month'] if row['article_limit_per_month'] is not None else 5
+        return {
+            "allowed": used < limit,
+            "used": used,
+            "limit": limit,
+            "remaining": max(0, limit - used)
+        }
+
+
+class UserQueries:
+    """User lookups used by auth dependencies and routes."""
+
+    @staticmethod
+    async def get_user_info(user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get basic user info with tier and admin flag in one query.
+
+        Returns:
+            Dict with id, username, email, display_name, membership_tier, is_admin,
+            or None if the user does not exist
+        """
+        row = await async_db.fetch_one("""
+            SELECT id, username, email, display_name, membership_tier, is_superuser
+            FROM users WHERE id = :user_id
+        """, {"user_id": user_id})
+        if not row:
+            return None
+        is_superuser = row.pop('is_superuser')
+        row['is_admin'] = row['email'] in get_super_admin_emails() and bool(is_superuser)
+        return row
+
+    @staticmethod
+    async def get_username(user_id: int) -> Optional[str]:
+        """Get a user's username."""
+        return await async_db.fetch_val(
+            "SELECT username FROM users WHERE id = :user_id",
+            {"user_id": user_id}
+        )
+
+    @staticmethod
+    async def get_writer_model(user_id: int) -> Optional[str]:
+        """Get the user's configured writer model ("provider:model")."""
+        return await async_db.fetch_val(
+            "SELECT writer_model FROM user_model_configs WHERE user_id = :user_id",
+            {"user_id": user_id}
+        )
+
+
+class ArticleQueries:
+    """Article queries used by the article routes."""
+
+    @staticmethod
+    async def list_by_user(user_id: int, limit: int, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        List a user's articles (full rows) with the total count.
+
+        Returns:
+            Tuple of (article rows, total count)
+        """
+        rows = await async_db.fetch_all("""
+            SELECT id, user_id, username, topic, title, content, status,
+                   model_type, model_name, spider_num, custom_style, image_enabled,
+                   metadata,
+                   created_at, updated_at, completed_at
+            FROM articles
+            WHERE user_id = :user_id
+            ORDER BY created_at DESC
+            LIMIT :limit OFFSET :offset
+        """, {"user_id": user_id, "limit": limit, "offset": offset})
+        total = await async_db.fetch_val(
+            "SELECT COUNT(*) FROM articles WHERE user_id = :user_id",
+            {"user_id": user_id}
+        )
+        return rows, total or 0
+
+    @staticmethod
+    async def get_detail(article_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a single article owned by the user (None if missing or not a UUID)."""
+        article_uuid = _parse_uuid(article_id)
+        if article_uuid is None:
+            return None
+        return await async_db.fetch_one("""
+            SELECT id, user_id, username, topic, title, content, outline, status,
+                   model_type, model_name, spider_num, custom_style, image_enabled,
+                   metadata,
+                   created_at, updated_at, completed_at
+            FROM articles
+            WHERE id = :article_id AND user_id = :user_id
+        """, {"article_id": article_uuid, "user_id": user_id})
+
+    @staticmethod
+    async def delete(article_id: str, user_id: int) -> bool:
+        """Delete an article owned by the user. Returns False if nothing was deleted."""
+        article_uuid = _parse_uuid(article_id)
+        if article_uuid is None:
+            return False
+        deleted = await async_db.execute(
+            "DELETE FROM articles WHERE id = :article_id AND user_id = :user_id",
+            {"article_id": article_uuid, "user_id": user_id}
+        )
+        return deleted > 0
@@ -4,18 +4,19 @@
 支持 SSE 流式进度推送和 Redis 队列管理
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List, Dict, Any
 import logging
 import json
 import uuid
 from datetime import datetime, timezone
 
-from backend.api.core.dependencies import get_current_user
+from backend.api.core.dependencies import get_current_user, get_db
 from backend.api.core.redis_client import redis_client
+from backend.api.repositories.async_queries import ArticleQueries, TierQueries, UserQueries
 from backend.api.services.article_generator import article_generator
-from backend.api.services.tier_service import TierService
 from utils.database import Database
 
 logger = logging.getLogger(__name__)
@@ -39,6 +40,14 @@ def _parse_timestamp(value: Any) -> Optional[datetime]:
     return None
 
 
+async def _invalidate_article_count(user_id: int) -> None:
+    """文章新增或状态变化后清除数量缓存（失败只记录日志）"""
+    try:
+        await redis_client.invalidate_article_count(user_id)
+    except Exception as e:
+        logger.warning(f"清除文章数量缓存失败: {e}")
+
+
 async def _mark_task_interrupted(
     user_id: int,
     article_id: str,
@@ -61,6 +70,7 @@ async def _mark_task_interrupted(
             SET status = 'failed', updated_at = NOW()
             WHERE id = %s AND user_id = %s AND status IN ('queued', 'generating')
         """, (article_id, user_id))
+    await _invalidate_article_count(user_id)
 
 
 async def _reconcile_queue_item(
@@ -166,7 +176,7 @@ async def generate_article(
     import asyncio
 
     # 检查用户配额
-    quota_info = TierService.check_user_quota(current_user_id)
+    quota_info = await TierQueries.check_user_quota(current_user_id)
     if not quota_info.get('allowed', False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -179,23 +189,20 @@ async def generate_article(
         )
 
     # ===== 等级验证：检查用户是否有权限使用请求的模型 =====
-    user_tier = TierService.get_user_tier(current_user_id)
-    available_models = TierService.get_tier_available_models(user_tier)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
+    available_models = await TierQueries.get_tier_available_models(user_tier)
 
     # 获取请求的模型（优先使用请求参数，否则使用用户配置的writer_model）
     model_to_check = request_data.model_name if request_data.model_name else None
     if not model_to_check:
         # 从用户配置获取默认 writer_model
-        with Database.get_cursor() as cursor:
-            cursor.execute("SELECT writer_model FROM user_model_configs WHERE user_id = %s", (current_user_id,))
-            model_row = cursor.fetchone()
-            if model_row and model_row['writer_model']:
-                # 解析 "provider:model" 格式
-                writer_model = model_row['writer_model']
-                if ':' in writer_model:
-                    model_to_check = writer_model.split(':', 1)[1]
-                else:
-                    model_to_check = writer_model
+        writer_model = await UserQueries.get_writer_model(current_user_id)
+        if writer_model:
+            # 解析 "provider:model" 格式
+            if ':' in writer_model:
+                model_to_check = writer_model.split(':', 1)[1]
+            else:
+                model_to_check = writer_model
 
     if model_to_check:
         # 检查模型是否在用户可用模型列表中
@@ -245,7 +252,7 @@ async def generate_article(
         "progress_percent": "0",
         "current_step": "等待中",
         "topic": request_data.topic,
-    })
+    }, user_id=current_user_id)
 
     # 添加到用户队列
     await redis_client.add_to_user_queue(current_user_id, article_id)
@@ -279,6 +286,7 @@ async def generate_article(
                     INSERT INTO articles (id, user_id, username, topic, title, status, word_count, created_at, updated_at)
                     VALUES (%s, %s, %s, %s, %s, 'generating', 0, NOW(), NOW())
                 """, (article_id, current_user_id, username, request_data.topic, request_data.topic))
+            await _invalidate_article_count(current_user_id)
             
             # 收集生成过程中的数据
             article_content = ""
@@ -338,6 +346,7 @@ async def generate_article(
                         json.dumps(metadata_to_save, ensure_ascii=False),
                         article_id
                     ))
+                await _invalidate_article_count(current_user_id)
                 
                 logger.info(f"文章已保存到数据库: article_id={article_id}, title={article_title}")
         except asyncio.CancelledError:
@@ -358,7 +367,7 @@ async def generate_article(
                 "progress_percent": "0",
                 "current_step": "生成失败",
                 "error_message": str(e),
-            })
+            }, user_id=current_user_id)
             await redis_client.remove_from_queue(current_user_id, article_id)
             # 更新数据库状态为失败
             try:
@@ -369,6 +378,7 @@ async def generate_article(
                     """, (article_id,))
             except:
                 pass
+            await _invalidate_article_count(current_user_id)
 
     asyncio.create_task(_run_generation())
 
@@ -403,8 +413,8 @@ async def get_user_quota(
             "allowed": 是否可以继续生成
         }
     """
-    quota_info = TierService.check_user_quota(current_user_id)
-    tier = TierService.get_user_tier(current_user_id)
+    quota_info = await TierQueries.check_user_quota(current_user_id)
+    tier = await TierQueries.get_user_tier(current_user_id)
 
     return {
         "tier": tier,
@@ -428,7 +438,7 @@ async def generate_article_stream(
     返回 Server-Sent Events 流，实时推送生成进度
     """
     # 检查用户配额
-    quota_info = TierService.check_user_quota(current_user_id)
+    quota_info = await TierQueries.check_user_quota(current_user_id)
     if not quota_info.get('allowed', False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -441,8 +451,8 @@ async def generate_article_stream(
         )
 
     # ===== 等级验证：检查用户是否有权限使用请求的模型 =====
-    user_tier = TierService.get_user_tier(current_user_id)
-    available_models = TierService.get_tier_available_models(user_tier)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
+    available_models = await TierQueries.get_tier_available_models(user_tier)
 
     # 获取请求的模型
     model_to_check = request_data.model_name
@@ -513,6 +523,7 @@ async def generate_article_stream(
             VALUES (%s, %s, %s, %s, 'generating', 0, NOW(), NOW())
             RETURNING id
         """, (article_id, current_user_id, request_data.topic, request_data.topic))
+    await _invalidate_article_count(current_user_id)
     
     # 添加到用户队列
     await redis_client.add_to_user_queue(current_user_id, article_id)
@@ -545,6 +556,7 @@ async def generate_article_stream(
                                 completed_at = NOW(), updated_at = NOW()
                             WHERE id = %s
                         """, (content, article_id))
+                    await _invalidate_article_count(current_user_id)
                 
                 # 如果失败，更新数据库
                 elif progress_event.get("type") == "error":
@@ -555,6 +567,7 @@ async def generate_article_stream(
                             SET status = 'failed', updated_at = NOW()
                             WHERE id = %s
                         """, (article_id,))
+                    await _invalidate_article_count(current_user_id)
             
             # 发送完成信号
             yield "data: [DONE]\n\n"
@@ -588,9 +601,16 @@ async def stream_article_progress(
 ):
     """
     通过 SSE 流式推送已有任务的生成进度。
-    前端先调用 POST /generate 创建任务，再用此接口轮询进度。
+    前端先调用 POST /generate 创建任务，再用此接口订阅进度：
+    首个事件为当前快照，之后只推送增量事件（live_article 以 article_append 追加）。
+    断线重连时通过 Last-Event-ID 请求头（或 last_event_id 查询参数）从上次的事件之后续传。
     """
     from backend.api.core.security import verify_token
+    from backend.api.core.progress_events import (
+        PROGRESS_HEARTBEAT_INTERVAL,
+        is_task_owner,
+        stream_progress_events,
+    )
 
     # 验证身份
     auth_header = request.headers.get("Authorization")
@@ -601,89 +621,40 @@ async def stream_article_progress(
     if current_user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    async def event_generator():
-        import asyncio
-        max_polls = 600          # 最多轮询 10 分钟（600 × 1s）
-        polls = 0
-        last_status = None
-
-        while polls < max_polls:
-            progress = await redis_client.get_article_progress(article_id)
-
-            if progress:
-                current_status = progress.get("status", "unknown")
-                # 解码 bytes keys if needed
-                if isinstance(current_status, bytes):
-                    current_status = current_status.decode()
-
-                event = {
-                    "task_id": article_id,
-                    "type": current_status,
-                    "status": current_status,
-                    "progress_percent": int(progress.get("progress_percent", 0)),
-                    "current_step": progress.get("current_step", ""),
-                    "timestamp": datetime.utcnow().isoformat(),
-                }
-
-                # 构建 data 字段（使用 setdefault 避免覆盖）
-                data = {}
-                if progress.get("content"):
-                    data["live_article"] = progress["content"]
-                if progress.get("error_message"):
-                    data["error_message"] = progress["error_message"]
-                if progress.get("outline"):
-                    try:
-                        data["outline"] = json.loads(progress["outline"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                if progress.get("search_results"):
-                    try:
-                        data["search_results"] = json.loads(progress["search_results"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                if progress.get("search_stats"):
-                    try:
-                        data["search_stats"] = json.loads(progress["search_stats"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                if progress.get("images"):
-                    try:
-                        data["images"] = json.loads(progress["images"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                if progress.get("references"):
-                    try:
-                        data["references"] = json.loads(progress["references"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                if progress.get("article_metadata"):
-                    try:
-                        data["article_metadata"] = json.loads(progress["article_metadata"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                
-                if data:
-                    event["data"] = data
+    # 验证任务所有权（进度哈希中的 user_id）
+    if not await is_task_owner(article_id, current_user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权访问此文章")
 
-                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+
+    async def event_generator():
+        max_idle = 600           # 10 分钟没有任何进度事件视为超时
+        idle = 0.0
+        events = stream_progress_events(article_id, last_event_id)
 
-                if current_status in ("completed", "failed", "error"):
+        try:
+            async for event_id, event in events:
+                if event is None:
+                    # 心跳（SSE 注释行），同时检测超时
+                    idle += PROGRESS_HEARTBEAT_INTERVAL
+                    if idle >= max_idle:
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+
+                idle = 0.0
+                yield f"id: {event_id}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if event.get("status") in ("completed", "failed", "error"):
                     yield "data: [DONE]\n\n"
                     return
-            else:
-                # 任务尚未开始或已过期
-                event = {
-                    "task_id": article_id,
-                    "type": "pending",
-                    "status": "queued",
-                    "progress_percent": 0,
-                    "current_step": "等待中",
-                    "timestamp": datetime.utcnow().isoformat(),
-                }
-                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
-
-            polls += 1
-            await asyncio.sleep(1)
+        except Exception as e:
+            logger.error(f"SSE 进度订阅失败: article_id={article_id}, error={e}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'task_id': article_id, 'data': {'error_message': '进度订阅失败'}}, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+            return
+        finally:
+            # 释放 Pub/Sub 连接
+            await events.aclose()
 
         # 超时
         yield f"data: {json.dumps({'type': 'error', 'task_id': article_id, 'data': {'error_message': '进度查询超时'}}, ensure_ascii=False)}\n\n"
@@ -756,6 +727,12 @@ async def get_article_progress(
                     current_step='等待中'
                 )
     
+    # 撰写中的实时文章按章节保存在片段列表中，完成后进度哈希中保存完整文章
+    content = progress_data.get('content')
+    if not content:
+        from backend.api.core.progress_events import load_article
+        _, content = await load_article(article_id)
+
     # 返回 Redis 中的进度
     return ProgressResponse(
         article_id=article_id,
@@ -763,7 +740,7 @@ async def get_article_progress(
         progress_percent=int(progress_data.get('progress_percent', 0)),
         current_step=progress_data.get('current_step', ''),
         error_message=progress_data.get('error_message'),
-        content=progress_data.get('content'),
+        content=content or None,
         outline=json.loads(progress_data.get('outline', '{}')) if progress_data.get('outline') else None
     )
 
@@ -780,28 +757,9 @@ async def list_articles(
     获取用户的文章列表
     """
     offset = (page - 1) * limit
-    
-    with Database.get_cursor() as cursor:
-        # 查询文章列表（包含content用于预览和下载，以及详情字段）
-        cursor.execute("""
-            SELECT id, user_id, username, topic, title, content, status, 
-                   model_type, model_name, spider_num, custom_style, image_enabled,
-                   metadata,
-                   created_at, updated_at, completed_at
-            FROM articles
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-        """, (current_user_id, limit, offset))
-        
-        articles = cursor.fetchall()
-        
-        # 查询总数
-        cursor.execute("""
-            SELECT COUNT(*) as total FROM articles WHERE user_id = %s
-        """, (current_user_id,))
-        total_row = cursor.fetchone()
-        total = total_row['total'] if total_row else 0
+
+    # 查询文章列表（包含content用于预览和下载，以及详情字段）和总数
+    articles, total = await ArticleQueries.list_by_user(current_user_id, limit, offset)
     
     # 转换为响应格式
     items = []
@@ -851,6 +809,70 @@ async def list_articles(
     }
 
 
+@router.get("/summaries")
+async def list_article_summaries(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user_id: int = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    获取用户的文章摘要列表（游标分页）
+
+    按 (created_at, id) 倒序做 keyset 分页，深翻页的代价与第一页相同；
+    只返回标题、摘要片段和字数，正文通过 /detail/{article_id} 按需获取。
+    total 为缓存的文章总数（按状态分字段缓存 5 分钟），不在每次请求时 COUNT(*)；
+    文章新增、状态变化和删除时清除缓存。
+    """
+    from backend.api.repositories.article import ArticleRepository
+
+    repo = ArticleRepository(db)
+    try:
+        rows, next_cursor = await repo.list_summaries_by_user(
+            current_user_id, limit=limit, cursor=cursor, status=status_filter
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+
+    total = None
+    try:
+        total = await redis_client.get_cached_article_count(current_user_id, status_filter)
+    except Exception as e:
+        logger.warning(f"读取文章数量缓存失败: {e}")
+    if total is None:
+        total = await repo.count_user_articles(current_user_id, status_filter)
+        try:
+            await redis_client.cache_article_count(current_user_id, total, status_filter)
+        except Exception as e:
+            logger.warning(f"写入文章数量缓存失败: {e}")
+
+    items = [
+        {
+            "id": str(row['id']),
+            "topic": row['topic'],
+            "title": row['title'],
+            "excerpt": row['excerpt'] or '',
+            "word_count": row['word_count'] or 0,
+            "status": row['status'],
+            "model_type": row.get('model_type'),
+            "model_name": row.get('model_name'),
+            "created_at": row['created_at'].isoformat() if row['created_at'] else None,
+            "updated_at": row['updated_at'].isoformat() if row['updated_at'] else None,
+            "completed_at": row['completed_at'].isoformat() if row['completed_at'] else None,
+        }
+        for row in rows
+    ]
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+        "total": total,
+        "limit": limit,
+    }
+
+
 # ============ 用户队列管理 ============
 
 @router.get("/queue")
@@ -887,10 +909,10 @@ async def get_user_queue(
     if not article_ids:
         return {"items": [], "total": 0}
     
-    # 从 Redis 获取每个任务的进度信息，自动清理过期/异常任务
+    # 一次 pipeline 获取所有任务的进度信息，自动清理过期/异常任务
     items = []
-    for aid in article_ids:
-        progress = await redis_client.get_article_progress(aid)
+    progress_list = await redis_client.get_progress_many(article_ids)
+    for aid, progress in zip(article_ids, progress_list):
         reconciled = await _reconcile_queue_item(current_user_id, aid, progress)
         if not reconciled:
             if progress is None:
@@ -930,7 +952,7 @@ async def remove_from_queue(
     await redis_client.remove_from_queue(current_user_id, article_id)
     
     # 删除进度缓存
-    await redis_client.delete_article_progress(article_id)
+    await redis_client.delete_article_progress(article_id, current_user_id)
     
     logger.info(f"手动移除队列任务: user={current_user_id}, task={article_id}")
     return {"message": "已从队列中移除"}
@@ -963,7 +985,7 @@ async def clear_user_queue(
         if isinstance(aid, bytes):
             aid = aid.decode()
         # 删除进度缓存
-        await redis_client.delete_article_progress(aid)
+        await redis_client.delete_article_progress(aid, current_user_id)
         # 从队列中移除
         await redis_client.remove_from_queue(current_user_id, aid)
         cleared_count += 1
@@ -998,7 +1020,7 @@ async def convert_to_wechat(
     from utils.wechat_converter import markdown_to_wechat_html
     from backend.api.utils.watermark import inject_watermark_if_needed
 
-    user_tier = TierService.get_user_tier(current_user_id)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
     html = markdown_to_wechat_html(request_data.markdown, style=request_data.style)
     html = inject_watermark_if_needed(html, user_tier=user_tier, format="html")
     return {"html": html}
@@ -1023,7 +1045,7 @@ async def convert_to_platform(
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     # F2 规则延续：仅 free 用户在输出层注入水印
-    user_tier = TierService.get_user_tier(current_user_id)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
     if converted.get("format") == "html":
         converted["content"] = inject_watermark_if_needed(
             converted.get("content", ""),
@@ -1050,17 +1072,7 @@ async def get_article_detail(
     """
     获取单篇文章详情（含content）
     """
-    with Database.get_cursor() as cursor:
-        cursor.execute("""
-            SELECT id, user_id, username, topic, title, content, outline, status,
-                   model_type, model_name, spider_num, custom_style, image_enabled,
-                   metadata,
-                   created_at, updated_at, completed_at
-            FROM articles
-            WHERE id = %s AND user_id = %s
-        """, (article_id, current_user_id))
-        article = cursor.fetchone()
-    
+    article = await ArticleQueries.get_detail(article_id, current_user_id)
     if not article:
         raise HTTPException(status_code=404, detail="文章不存在")
     
@@ -1089,7 +1101,7 @@ async def get_article_detail(
         "topic": article['topic'],
         "title": article['title'],
         "content": article.get('content') or '',
-        "outline": json.loads(article['outline']) if article.get('outline') else None,
+        "outline": (json.loads(article['outline']) if isinstance(article['outline'], str) else article['outline']) if article.get('outline') else None,
         "status": article['status'],
         "model_type": article.get('model_type'),
         "model_name": article.get('model_name'),
@@ -1482,10 +1494,9 @@ async def analyze_article_seo(
     权限要求：Pro及以上用户
     """
     from backend.api.services.seo_analyzer_v2 import SEOAnalyzerServiceV2
-    from backend.api.services.tier_service import TierService
 
     # 检查用户等级权限
-    user_tier = TierService.get_user_tier(current_user_id)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
     if user_tier == 'free':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1528,10 +1539,9 @@ async def extract_seo_keywords(
     权限要求：Pro及以上用户
     """
     from backend.api.services.seo_analyzer import SEOAnalyzerService
-    from backend.api.services.tier_service import TierService
 
     # 检查用户等级权限
-    user_tier = TierService.get_user_tier(current_user_id)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
     if user_tier == 'free':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1569,10 +1579,9 @@ async def optimize_article_title(
     权限要求：Pro及以上用户
     """
     from backend.api.services.seo_analyzer import SEOAnalyzerService
-    from backend.api.services.tier_service import TierService
 
     # 检查用户等级权限
-    user_tier = TierService.get_user_tier(current_user_id)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
     if user_tier == 'free':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1609,10 +1618,9 @@ async def generate_meta_description(
     权限要求：Pro及以上用户
     """
     from backend.api.services.seo_analyzer import SEOAnalyzerService
-    from backend.api.services.tier_service import TierService
 
     # 检查用户等级权限
-    user_tier = TierService.get_user_tier(current_user_id)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
     if user_tier == 'free':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1650,10 +1658,9 @@ async def get_internal_link_suggestions(
     权限要求：Pro及以上用户
     """
     from backend.api.services.seo_analyzer import SEOAnalyzerService
-    from backend.api.services.tier_service import TierService
 
     # 检查用户等级权限
-    user_tier = TierService.get_user_tier(current_user_id)
+    user_tier = await TierQueries.get_user_tier(current_user_id)
     if user_tier == 'free':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1850,18 +1857,10 @@ async def delete_article(
     """
     删除文章
     """
-    with Database.get_cursor() as cursor:
-        cursor.execute(
-            "SELECT id FROM articles WHERE id = %s AND user_id = %s",
-            (article_id, current_user_id)
-        )
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="文章不存在")
-        
-        cursor.execute(
-            "DELETE FROM articles WHERE id = %s AND user_id = %s",
-            (article_id, current_user_id)
-        )
+    if not await ArticleQueries.delete(article_id, current_user_id):
+        raise HTTPException(status_code=404, detail="文章不存在")
+
+    await _invalidate_article_count(current_user_id)
     
     logger.info(f"文章已删除: article_id={article_id}, user_id={current_user_id}")
     return {"message": "文章已删除"}
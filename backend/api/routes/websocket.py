@@ -9,7 +9,7 @@ from typing import Optional
 import logging
 import asyncio
 
-from backend.api.core.websocket import manager
+from backend.api.core.websocket import manager, TASK_ROOM_PREFIX
 from backend.api.core.dependencies import require_ws_user
 from backend.api.config import settings
 
@@ -118,7 +118,11 @@ async def handle_client_message(user_id: str, message: dict):
     if message_type == "subscribe":
         # 订阅特定主题
         topic = message.get("topic")
-        if topic:
+        if topic and topic.startswith(TASK_ROOM_PREFIX):
+            # 文章进度：发送快照后推送增量事件
+            if await manager.subscribe_task_progress(user_id, topic[len(TASK_ROOM_PREFIX):]):
+                logger.info(f"User {user_id} subscribed to {topic}")
+        elif topic:
             await manager.join_room(user_id, topic)
             logger.info(f"User {user_id} subscribed to {topic}")
 
@@ -13,7 +13,7 @@ import json
 # 使用 backend 兼容层导入 searxng 工具
 from backend.api.utils.searxng_compat import Search, llm_task, chat
 import utils.prompt_template as pt
-# create_faiss_index, search_similar_text 已移至 article_worker._insert_images_to_chapter
+# create_faiss_index, search_similar_text 已移至 article_worker._insert_images_to_chapters
 from backend.api.core.redis_client import redis_client
 
 logger = logging.getLogger(__name__)
@@ -25,6 +25,8 @@ class ArticleGeneratorService:
     def __init__(self):
         """初始化文章生成服务"""
         self.search_engine = Search(result_num=30)
+        # article_id -> user_id，进度写入时同步刷新用户任务索引
+        self._task_owners: Dict[str, int] = {}
     
     async def generate_article_stream(
         self,
@@ -61,6 +63,7 @@ class ArticleGeneratorService:
         try:
             # 重置图片收集列表
             self._current_images = []
+            self._task_owners[article_id] = user_id
             
             # 设置用户上下文，以便动态加载用户的 LLM 配置
             set_user_context(user_id)
@@ -256,14 +259,13 @@ class ArticleGeneratorService:
             yield self._create_progress_event(article_id, 45, "大纲生成完成", {"outline": outline})
 
             # Step 3: 按章节生成内容（对齐 Streamlit / article_worker 流程）
-            from backend.api.workers.article_worker import _insert_images_to_chapter
+            from backend.api.workers.article_worker import _insert_images_to_chapters
 
             content_outline = outline.get('content_outline', [])
             total_sections = len(content_outline)
             section_progress_step = 45 / max(total_sections, 1)
 
             article_chapters = []
-            used_images = set()  # 跨章节共享已使用图片集合
 
             for idx, section in enumerate(content_outline, 1):
                 h1 = section.get('h1', '')
@@ -310,30 +312,17 @@ class ArticleGeneratorService:
                     )
                 chapter_content = await asyncio.to_thread(_refine)
 
-                # 使用 FAISS 语义匹配插入图片（与 article_worker 共用逻辑）
-                logger.info(f"[图片插入] 开始为章节 '{h1}' 插入图片 (FAISS)...")
-                chapter_content = await _insert_images_to_chapter(
-                    chapter_content=chapter_content,
-                    outline_block=section,
-                    search_results=search_results,
-                    user_id=user_id,
-                    task_id=article_id,
-                    used_images=used_images,
-                    max_images_per_chapter=3,
-                    similarity_threshold=0
-                )
-
                 article_chapters.append(chapter_content)
 
                 # 组装实时文章内容
                 full_content = f"# {outline.get('title', topic)}\n\n" + '\n\n'.join(article_chapters)
 
-                # 更新实时文章内容（每个章节完成后都推送）
-                await self._update_progress(article_id, {
+                # 更新实时文章内容（每个章节完成后只追加本章节）
+                segment = f"# {outline.get('title', topic)}\n\n{chapter_content}" if idx == 1 else f"\n\n{chapter_content}"
+                await self._append_progress(article_id, segment, {
                     "status": "running",
                     "progress_percent": current_progress,
                     "current_step": f"章节 {idx}/{total_sections} 完成",
-                    "content": full_content,
                 })
                 yield self._create_progress_event(
                     article_id, current_progress,
@@ -341,6 +330,18 @@ class ArticleGeneratorService:
                     {"live_article": full_content}
                 )
 
+            # 全部章节完成后统一配图：一次批量检索，跨章节全局分配（与 article_worker 共用逻辑）
+            logger.info(f"[图片插入] 开始为 {total_sections} 个章节插入图片 (FAISS)...")
+            article_chapters = await _insert_images_to_chapters(
+                chapters=article_chapters,
+                outline_blocks=content_outline,
+                search_results=search_results,
+                user_id=user_id,
+                task_id=article_id,
+                max_images_per_chapter=3,
+                similarity_threshold=0
+            )
+
             # 组装最终文章（不再将参考来源追加到正文中）
             full_content = f"# {outline.get('title', topic)}\n\n" + '\n\n'.join(article_chapters)
 
@@ -401,11 +402,25 @@ class ArticleGeneratorService:
                 f"生成失败: {str(e)}",
                 error=True
             )
+        finally:
+            owner = self._task_owners.pop(article_id, None)
+            if owner:
+                from backend.api.core.faiss_ready import faiss_ready
+                faiss_ready.forget(owner, article_id)
     
     async def _update_progress(self, article_id: str, data: Dict[str, Any]):
         """更新文章生成进度到 Redis"""
         try:
-            await redis_client.set_article_progress(article_id, data)
+            await redis_client.set_article_progress(article_id, data, user_id=self._task_owners.get(article_id))
+        except Exception as e:
+            logger.error(f"更新进度失败: {e}")
+    
+    async def _append_progress(self, article_id: str, text: str, data: Dict[str, Any]):
+        """追加实时文章片段并更新进度到 Redis"""
+        try:
+            await redis_client.append_article_progress(
+                article_id, text, data, user_id=self._task_owners.get(article_id)
+            )
         except Exception as e:
             logger.error(f"更新进度失败: {e}")
     
@@ -431,7 +446,7 @@ class ArticleGeneratorService:
             event["error_message"] = message
         return event
     
-    # _find_relevant_images 已废弃，改用 article_worker._insert_images_to_chapter (FAISS 语义匹配)
+    # _find_relevant_images 已废弃，改用 article_worker._insert_images_to_chapters (FAISS 语义匹配)
 
 
 # 全局实例
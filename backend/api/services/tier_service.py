@@ -16,6 +16,15 @@ def get_super_admin_emails() -> List[str]:
     return [email.strip() for email in emails_str.split(',') if email.strip()]
 
 
+def _invalidate_provider_cache(provider_id: str) -> None:
+    """提供商配置变更后，使 LLM 凭据/客户端缓存失效"""
+    try:
+        from utils.llm_provider_registry import provider_registry
+        provider_registry.invalidate(provider_id)
+    except Exception as e:
+        logger.warning(f"使 LLM 提供商缓存失效失败: {provider_id}, {e}")
+
+
 class TierService:
     """会员等级配置服务"""
 
@@ -70,10 +79,15 @@ class TierService:
         - pro 用户可以看到所有 min_tier <= 1 的模型
         - free 用户只能看到 min_tier <= 0 的模型
         """
+        return TierService.filter_models_for_tier(TierService.get_global_providers(), tier)
+
+    @staticmethod
+    def filter_models_for_tier(providers: List[Dict[str, Any]], tier: str) -> List[Dict[str, str]]:
+        """从提供商列表中筛选指定等级可用的模型（同步/异步查询共用）"""
         tier_level = TierService.TIER_LEVELS.get(tier, 0)
         result = []
 
-        for provider in TierService.get_global_providers():
+        for provider in providers:
             for model in provider.get('models', []):
                 model_min_tier = model.get('min_tier', 'free')
                 model_tier_level = TierService.TIER_LEVELS.get(model_min_tier, 0)
@@ -185,20 +199,22 @@ class TierService:
                 FROM global_llm_providers
                 ORDER BY provider_id
             """)
-            return [
-                {
-                    "id": row['provider_id'],  # 使用 provider_id 作为前端 id
-                    "provider_id": row['provider_id'],
-                    "provider_name": row['provider_name'],
-                    "name": row['provider_name'],  # 添加 name 字段供前端使用
-                    "base_url": row['base_url'],
-                    "models": row['models'] or [],
-                    "enabled": row['enabled'],
-                    # 如果有加密密钥，返回占位符表示已设置
-                    "api_key": "••••••••" if row['api_key_encrypted'] else ""
-                }
-                for row in cursor.fetchall()
-            ]
+            return [TierService.provider_row_to_dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def provider_row_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+        """global_llm_providers 行转换为前端格式（不含密钥明文）"""
+        return {
+            "id": row['provider_id'],  # 使用 provider_id 作为前端 id
+            "provider_id": row['provider_id'],
+            "provider_name": row['provider_name'],
+            "name": row['provider_name'],  # 添加 name 字段供前端使用
+            "base_url": row['base_url'],
+            "models": row['models'] or [],
+            "enabled": row['enabled'],
+            # 如果有加密密钥，返回占位符表示已设置
+            "api_key": "••••••••" if row['api_key_encrypted'] else ""
+        }
 
     @staticmethod
     def get_provider_credentials(provider_id: str) -> Optional[Dict[str, Any]]:
@@ -318,7 +334,10 @@ class TierService:
                 json.dumps(models),
                 enabled
             ))
-            return cursor.fetchone() is not None
+            success = cursor.fetchone() is not None
+
+        _invalidate_provider_cache(provider_id)
+        return success
 
     @staticmethod
     def delete_global_provider(provider_id: str) -> bool:
@@ -328,7 +347,10 @@ class TierService:
                 "DELETE FROM global_llm_providers WHERE provider_id = %s",
                 (provider_id,)
             )
-            return cursor.rowcount > 0
+            success = cursor.rowcount > 0
+
+        _invalidate_provider_cache(provider_id)
+        return success
 
     @staticmethod
     def search_users(query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
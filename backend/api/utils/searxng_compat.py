@@ -131,13 +131,15 @@ _dynamic_settings = _DynamicSettings()
 sys.modules['settings'] = _dynamic_settings
 
 # 现在可以安全导入 searxng_utils
-from utils.searxng_utils import Search, llm_task, chat, parse_outline_json
+from utils.searxng_utils import Search, llm_task, allm_task, chat, achat, parse_outline_json
 
 # 导出函数
 __all__ = [
     'Search',
     'llm_task',
+    'allm_task',
     'chat',
+    'achat',
     'parse_outline_json',
     'set_user_context',  # 新：设置用户上下文
     'get_user_context',  # 新：获取当前用户ID
@@ -6,24 +6,28 @@ Article Generation Worker Function
 import asyncio
 import logging
 import os
-import time
 from typing import Dict, List, Any, Optional
 
 # 使用 backend 兼容层导入 searxng 工具
 from backend.api.utils.searxng_compat import (
-    Search, llm_task, chat, parse_outline_json,
+    Search, allm_task, achat, parse_outline_json,
     set_user_context  # 导入用户上下文设置函数
 )
 
 # Image indexing imports
 from backend.api.workers.image_store import redis_image_store
 from backend.api.workers.image_indexer import batch_embed_with_fallback
+from backend.api.workers.source_digest import SourceDigest
 from backend.api.core.faiss_cache import faiss_cache
+from backend.api.core.faiss_ready import PENDING, faiss_ready
 
 import re
 
 logger = logging.getLogger(__name__)
 
+# 并行撰写章节的默认并发数（可通过 SystemConfig 的 article.chapter_concurrency 覆盖）
+DEFAULT_CHAPTER_CONCURRENCY = 3
+
 
 def remove_thinking_tags(content):
     """
@@ -268,21 +272,16 @@ async def generate_outline(
     """
     import utils.prompt_template as pt
 
-    loop = asyncio.get_event_loop()
-
     if progress_tracker:
         await progress_tracker.update(30, "正在生成大纲...")
 
     # Generate outline
-    outlines = await loop.run_in_executor(
-        None,
-        lambda: llm_task(
-            search_results,
-            topic,
-            pt.ARTICLE_OUTLINE_GEN,
-            model_type=model_type,
-            model_name=model_name
-        )
+    outlines = await allm_task(
+        search_results,
+        topic,
+        pt.ARTICLE_OUTLINE_GEN,
+        model_type=model_type,
+        model_name=model_name
     )
     outlines = remove_thinking_tags(outlines)
 
@@ -293,15 +292,12 @@ async def generate_outline(
     if isinstance(outlines, str) and outlines.count("title") <= 1:
         outline_summary = outlines
     else:
-        outline_summary = await loop.run_in_executor(
-            None,
-            lambda: chat(
-                f'<topic>{topic}</topic> <content>{outlines}</content>',
-                pt.ARTICLE_OUTLINE_SUMMARY,
-                model_type=model_type,
-                model_name=model_name,
-                max_tokens=16384
-            )
+        outline_summary = await achat(
+            f'<topic>{topic}</topic> <content>{outlines}</content>',
+            pt.ARTICLE_OUTLINE_SUMMARY,
+            model_type=model_type,
+            model_name=model_name,
+            max_tokens=16384
         )
         outline_summary = remove_thinking_tags(outline_summary)
 
@@ -327,6 +323,26 @@ async def generate_outline(
     return outline_json
 
 
+def _place_image(chapter_content: str, public_url: str, position: int, max_images_per_chapter: int) -> str:
+    """
+    按 Streamlit 策略插入第 position 张图片（从 0 开始）
+
+    第1张放章节开头，后续均匀分布在段落之间；段落不足时追加到末尾。
+    """
+    if position == 0:
+        return f"![图片]({public_url})\n\n" + chapter_content
+
+    image_markdown = f"\n\n![图片]({public_url})"
+    paragraphs = chapter_content.split('\n\n')
+    if len(paragraphs) >= 3:
+        insert_position = len(paragraphs) // max_images_per_chapter * position
+        insert_position = min(insert_position, len(paragraphs) - 1)
+        insert_position = max(insert_position, 1)
+        paragraphs[insert_position] = paragraphs[insert_position] + image_markdown
+        return '\n\n'.join(paragraphs)
+    return chapter_content + image_markdown
+
+
 async def _insert_images_fallback(
     chapter_content: str,
     outline_block: Dict[str, Any],
@@ -383,21 +399,7 @@ async def _insert_images_fallback(
                 continue
 
             # 插入策略与 FAISS 路径一致
-            if images_inserted == 0:
-                image_markdown = f"![图片]({public_url})\n\n"
-                chapter_content = image_markdown + chapter_content
-            else:
-                paragraphs = chapter_content.split('\n\n')
-                if len(paragraphs) >= 3:
-                    insert_position = len(paragraphs) // max_images_per_chapter * images_inserted
-                    insert_position = min(insert_position, len(paragraphs) - 1)
-                    insert_position = max(insert_position, 1)
-                    image_markdown = f"\n\n![图片]({public_url})"
-                    paragraphs[insert_position] = paragraphs[insert_position] + image_markdown
-                    chapter_content = '\n\n'.join(paragraphs)
-                else:
-                    image_markdown = f"\n\n![图片]({public_url})"
-                    chapter_content += image_markdown
+            chapter_content = _place_image(chapter_content, public_url, images_inserted, max_images_per_chapter)
 
             images_inserted += 1
             logger.info(f"[Fallback] Inserted image {images_inserted}/{max_images_per_chapter}: {image_url[:60]}")
@@ -414,45 +416,52 @@ async def _insert_images_fallback(
         return chapter_content
 
 
-async def _insert_images_to_chapter(
-    chapter_content: str,
-    outline_block: Dict[str, Any],
+def _chapter_query(outline_block: Dict[str, Any], chapter_content: str) -> str:
+    """章节检索文本：章节标题 + h2列表 + 实际生成的章节内容（与 Streamlit 一致）"""
+    h1 = outline_block.get('h1', '')
+    h2_list = outline_block.get('h2', [])
+    h2_str = "".join(h2_list) if isinstance(h2_list, list) else str(h2_list)
+    return f"{h1}{h2_str}{chapter_content}".strip()
+
+
+async def _insert_images_to_chapters(
+    chapters: List[str],
+    outline_blocks: List[Dict[str, Any]],
     search_results: List[Dict[str, Any]],
     user_id: int,
     task_id: str,
-    used_images: set = None,
     max_images_per_chapter: int = 3,
     similarity_threshold: float = 0
-) -> str:
+) -> List[str]:
     """
-    为章节内容插入相关图片（对齐 Streamlit 版本逻辑）
+    为全部章节统一配图
 
-    关键改进（vs 旧版）：
-    1. 查询文本 = 章节标题 + h2列表 + 实际生成的章节内容（而非大纲元数据）
-    2. 相似度阈值默认为 0（与 Streamlit 一致），接受所有匹配
-    3. used_images 跨章节共享，避免同一张图片在不同章节重复出现
-    4. 插入策略：第1张放章节开头，后续均匀分布在段落之间
+    1. 查询文本 = 章节标题 + h2列表 + 实际生成的章节内容
+    2. 所有章节的查询一次 embedding、一次矩阵检索（search_similar_texts）
+    3. 在相似度矩阵上全局分配图片（assign_images）：每张图片只用一次，
+       每章最多 max_images_per_chapter 张，不再由靠前的章节先占用图片
+    4. 无法转存的图片排除后重新分配，其余章节的分配结果随之调整
+    5. 插入策略：第1张放章节开头，后续均匀分布在段落之间
 
     Args:
-        chapter_content: 实际生成的章节内容
-        outline_block: 大纲块（包含 h1, h2, content）
-        search_results: 搜索结果（包含图片）
+        chapters: 实际生成的章节内容（按大纲顺序）
+        outline_blocks: 对应的大纲块（包含 h1, h2, content）
+        search_results: 搜索结果（包含图片，FAISS 不可用时回退使用）
         user_id: 用户 ID
         task_id: 任务 ID
-        used_images: 跨章节共享的已使用图片集合（避免重复）
         max_images_per_chapter: 每章节最多插入图片数
         similarity_threshold: 相似度阈值（默认0，与Streamlit一致）
 
     Returns:
-        插入图片后的章节内容
+        插入图片后的章节内容列表
     """
-    if used_images is None:
-        used_images = set()
+    if not chapters:
+        return []
 
     try:
-        from utils.embedding_utils import search_similar_text
+        from utils.embedding_utils import search_similar_texts
+        from utils.image_assignment import assign_images
         from utils.qiniu_utils import ensure_public_image_url
-        from backend.api.core.faiss_cache import faiss_cache
 
         # 等待后台 FAISS 索引创建完成
         logger.info(f"[Insert] Waiting for FAISS index: user={user_id}, task={task_id}")
@@ -460,120 +469,85 @@ async def _insert_images_to_chapter(
 
         if faiss_index is None:
             logger.warning(f"[Insert] FAISS index not available, using keyword-based fallback: user={user_id}, task={task_id}")
-            return await _insert_images_fallback(
-                chapter_content, outline_block, search_results,
-                used_images, max_images_per_chapter
-            )
-
-        logger.info(f"[Insert] FAISS index ready: user={user_id}, task={task_id}, size={faiss_index.get_size()}")
-
-        # 构建查询文本（与 Streamlit 一致：章节标题 + h2列表 + 实际生成的章节内容）
-        h1 = outline_block.get('h1', '')
-        h2_list = outline_block.get('h2', [])
-        h2_str = "".join(h2_list) if isinstance(h2_list, list) else str(h2_list)
-
-        # 关键：使用实际生成的 chapter_content 而非大纲中的 content 元数据
-        query_text = f"{h1}{h2_str}{chapter_content}".strip()
-        logger.info(f"[Insert] Chapter query built: h1='{h1[:50]}', h2_count={len(h2_list) if isinstance(h2_list, list) else 1}, content_length={len(chapter_content)}")
-
-        if not query_text:
-            logger.warning("[Insert] Empty query text, skipping image insertion")
-            return chapter_content
-
-        # FAISS 相似度搜索
-        logger.info(f"[Insert] Starting FAISS search with k=10...")
-        indices, similarities, matched_data = await asyncio.get_event_loop().run_in_executor(
+            used_images = set()
+            results = []
+            for chapter_content, outline_block in zip(chapters, outline_blocks):
+                results.append(await _insert_images_fallback(
+                    chapter_content, outline_block, search_results,
+                    used_images, max_images_per_chapter
+                ))
+            return results
+
+        queries = [_chapter_query(block, content) for block, content in zip(outline_blocks, chapters)]
+        # 候选数随章节数增加，保证全局分配有足够的选择空间
+        k = max(10, max_images_per_chapter * len(chapters))
+        logger.info(f"[Insert] Batched FAISS search: chapters={len(chapters)}, k={k}, index_size={faiss_index.get_size()}")
+        _, similarities, matched_data = await asyncio.get_event_loop().run_in_executor(
             None,
-            lambda: search_similar_text(query_text, faiss_index, k=10, is_image_url=False)
+            lambda: search_similar_texts(queries, faiss_index, k=k, is_image_url=False)
         )
 
-        logger.info(f"[Insert] FAISS search returned {len(matched_data)} matches, similarities: {similarities[:5] if len(similarities) > 0 else []}")
-
-        # 过滤和选择图片（与 Streamlit 一致的逻辑）
-        selected_images = []
-        images_inserted = 0
-        logger.info(f"[Insert] Filtering images: threshold={similarity_threshold}, max={max_images_per_chapter}, already_used={len(used_images)}")
-
-        if matched_data:
-            for similarity, data in zip(similarities, matched_data):
-                if images_inserted >= max_images_per_chapter:
-                    break
-
-                if not isinstance(data, dict) or 'image_url' not in data:
-                    continue
-
-                image_url = data['image_url']
-
-                # 跨章节去重
-                if image_url in used_images:
-                    logger.debug(f"[Insert] Skipping already used image: {image_url[:80]}...")
-                    continue
+        candidates = [
+            [
+                (data['image_url'], similarity)
+                for similarity, data in zip(chapter_similarities, chapter_data)
+                if isinstance(data, dict) and data.get('image_url')
+            ]
+            for chapter_similarities, chapter_data in zip(similarities, matched_data)
+        ]
 
-                # 相似度阈值检查
-                if similarity < similarity_threshold:
-                    continue
+        # 分配 → 转存新分配的图片 → 排除失败的图片后重新分配
+        public_urls: Dict[str, Optional[str]] = {}
+        for _ in range(3):
+            assignment = assign_images(
+                candidates, max_images_per_chapter, similarity_threshold,
+                exclude=[url for url, public_url in public_urls.items() if not public_url]
+            )
+            pending = list(dict.fromkeys(
+                image_url for chapter_images in assignment for image_url, _ in chapter_images
+                if image_url not in public_urls
+            ))
+            if not pending:
+                break
 
-                # 确保图片 URL 可公开访问（上传到七牛云）
+            async def _publish(image_url: str) -> Optional[str]:
                 try:
                     public_url = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda url=image_url: ensure_public_image_url(url)
+                        None, lambda: ensure_public_image_url(image_url)
                     )
                 except Exception as e:
                     logger.error(f"[Insert] Error ensuring public URL: {e}")
-                    used_images.add(image_url)
-                    continue
-
-                # 验证图片URL是否有效
+                    return None
                 if not public_url or len(public_url) < 10:
                     logger.warning(f"[Insert] Invalid image URL, skipping: {image_url[:80]}...")
-                    used_images.add(image_url)
+                    return None
+                return public_url
+
+            for image_url, public_url in zip(pending, await asyncio.gather(*[_publish(url) for url in pending])):
+                public_urls[image_url] = public_url
+
+        results = []
+        for chapter_content, outline_block, chapter_images in zip(chapters, outline_blocks, assignment):
+            inserted = 0
+            for image_url, similarity in chapter_images:
+                public_url = public_urls.get(image_url)
+                if not public_url:
                     continue
+                chapter_content = _place_image(chapter_content, public_url, inserted, max_images_per_chapter)
+                inserted += 1
+                logger.info(f"[Insert] ✓ Chapter '{outline_block.get('h1', '')[:30]}' image {inserted} (similarity={similarity:.4f}): {image_url[:80]}")
+            results.append(chapter_content)
 
-                logger.info(f"[Insert] ✓ Selected image (similarity={similarity:.4f}): {image_url[:80]}...")
-
-                # 标记原始URL为已使用（跨章节生效）
-                used_images.add(image_url)
-
-                # 按 Streamlit 策略插入图片
-                if images_inserted == 0:
-                    # 第一张图片放在章节开头
-                    image_markdown = f"![图片]({public_url})\n\n"
-                    chapter_content = image_markdown + chapter_content
-                else:
-                    # 后续图片尝试插入到段落之间（均匀分布）
-                    paragraphs = chapter_content.split('\n\n')
-                    if len(paragraphs) >= 3:
-                        # 计算插入位置 - 均匀分布
-                        insert_position = len(paragraphs) // max_images_per_chapter * images_inserted
-                        insert_position = min(insert_position, len(paragraphs) - 1)
-                        insert_position = max(insert_position, 1)
-
-                        image_markdown = f"\n\n![图片]({public_url})"
-                        paragraphs[insert_position] = paragraphs[insert_position] + image_markdown
-                        chapter_content = '\n\n'.join(paragraphs)
-                    else:
-                        # 段落不够，添加到末尾
-                        image_markdown = f"\n\n![图片]({public_url})"
-                        chapter_content += image_markdown
-
-                logger.info(f"[Insert] Inserted image {images_inserted+1}/{max_images_per_chapter} for chapter '{h1[:30]}'")
-                images_inserted += 1
-                selected_images.append(public_url)
-
-        if not selected_images:
-            logger.warning(f"[Insert] No suitable images found after filtering (had {len(matched_data)} candidates, {len(used_images)} already used)")
-        else:
-            logger.info(f"[Insert] ✓✓✓ Successfully inserted {len(selected_images)} images into chapter '{h1[:30]}'!")
-
-        return chapter_content
+        total_inserted = sum(1 for chapter_images in assignment for image_url, _ in chapter_images if public_urls.get(image_url))
+        logger.info(f"[Insert] ✓ Inserted {total_inserted} images across {len(chapters)} chapters")
+        return results
 
     except Exception as e:
         logger.error(f"[Insert] Error inserting images: {e}")
         import traceback
         logger.debug(traceback.format_exc())
         # 失败时返回原始内容，不影响文章生成
-        return chapter_content
+        return list(chapters)
 
 
 def _build_references_section(search_results: List[Dict[str, Any]]) -> str:
@@ -607,6 +581,15 @@ def _build_references_section(search_results: List[Dict[str, Any]]) -> str:
     return "---\n\n## 参考来源\n\n" + "\n".join(references)
 
 
+def _get_chapter_concurrency() -> int:
+    """读取章节并行撰写的并发数（SystemConfig: article.chapter_concurrency）"""
+    try:
+        from backend.api.core.system_config import SystemConfig
+        return max(1, SystemConfig.get_int('article.chapter_concurrency', DEFAULT_CHAPTER_CONCURRENCY))
+    except Exception:
+        return DEFAULT_CHAPTER_CONCURRENCY
+
+
 async def write_article_content(
     outline: Dict[str, Any],
     search_results: List[Dict[str, Any]],
@@ -616,11 +599,20 @@ async def write_article_content(
     custom_style: str = "",
     progress_tracker = None,
     user_id: int = None,
-    task_id: str = None
+    task_id: str = None,
+    max_concurrent_chapters: int = None
 ) -> str:
     """
     Write article content from outline
 
+    章节正文以有限并发并行生成；实时预览按章节顺序组装：
+    某章节完成后，从当前位置起连续已完成的章节依次推送正文预览。
+    全部章节完成后统一配图（_insert_images_to_chapters）：一次 embedding、一次矩阵检索，
+    在所有章节之间全局分配不重复的图片，最终文章包含配图。
+
+    语料只在开始时切块并 embedding 一次（SourceDigest），每个章节仅检索
+    与其大纲块最相关的片段交给 LLM；digest 不可用时回退为完整语料。
+
     Args:
         outline: Outline dict from generate_outline
         search_results: Search results
@@ -631,15 +623,13 @@ async def write_article_content(
         progress_tracker: Optional ProgressTracker
         user_id: User ID (for FAISS isolation)
         task_id: Task ID (for FAISS isolation)
+        max_concurrent_chapters: 同时撰写的章节数，None 时读取系统配置，1 为串行
 
     Returns:
         Complete article content as string
     """
     import utils.prompt_template as pt
 
-    loop = asyncio.get_event_loop()
-    article_chapters = []
-
     content_outline = outline.get('content_outline', [])
     if not content_outline:
         return ""
@@ -650,88 +640,116 @@ async def write_article_content(
     total = len(content_outline)
     base_progress = 60
 
-    # 跨章节共享已使用图片集合，避免同一张图片在不同章节重复出现（与 Streamlit 一致）
-    used_images = set()
+    if max_concurrent_chapters is None:
+        max_concurrent_chapters = _get_chapter_concurrency()
+    semaphore = asyncio.Semaphore(max(1, max_concurrent_chapters))
 
-    for i, outline_block in enumerate(content_outline):
+    # Apply custom style if provided
+    custom_prompt = pt.ARTICLE_OUTLINE_BLOCK
+    if custom_style and custom_style.strip():
+        custom_prompt = custom_prompt.replace(
+            '---要求---',
+            f'---要求---\n        - 请围绕这个这个中心主题来编写当前章节内容：{custom_style}\n'
+        )
+
+    # 语料切块 + embedding 只做一次，各章节共享
+    source_digest = await SourceDigest.build(search_results)
+
+    article_chapters = []
+    drafts: Dict[int, str] = {}
+    assemble_lock = asyncio.Lock()
+
+    async def _write_chapter(i: int, outline_block: Dict[str, Any]) -> str:
         n = i + 1
-        progress = base_progress + int((n / total) * 35)
+        async with semaphore:
+            if progress_tracker:
+                await progress_tracker.update(
+                    base_progress + int((len(article_chapters) / total) * 35),
+                    f"正在撰写: {outline_block.get('h1', '')} ({n}/{total})"
+                )
 
-        if progress_tracker:
-            await progress_tracker.update(
-                progress,
-                f"正在撰写: {outline_block.get('h1', '')} ({n}/{total})"
-            )
+            # Generate chapter content (match Streamlit: first chapter has extra instructions)
+            is_first_chapter = n == 1
+            title_instruction = '，注意不要包含任何标题，直接开始正文内容，有吸引力开头（痛点/悬念），生动形象，风趣幽默！' if is_first_chapter else ''
+            question = f'<完整大纲>{outline_summary}</完整大纲> 请根据上述信息，书写出以下内容 >>> {outline_block} <<<{title_instruction}'
 
-        # Generate chapter content (match Streamlit: first chapter has extra instructions)
-        is_first_chapter = n == 1
-        title_instruction = '，注意不要包含任何标题，直接开始正文内容，有吸引力开头（痛点/悬念），生动形象，风趣幽默！' if is_first_chapter else ''
-        question = f'<完整大纲>{outline_summary}</完整大纲> 请根据上述信息，书写出以下内容 >>> {outline_block} <<<{title_instruction}'
+            chapter_sources = await source_digest.select(outline_block) or search_results
 
-        outline_block_content = await loop.run_in_executor(
-            None,
-            lambda: llm_task(
-                search_results,
+            outline_block_content = await allm_task(
+                chapter_sources,
                 question=question,
                 output_type=pt.ARTICLE_OUTLINE_BLOCK,
                 model_type=model_type,
                 model_name=model_name
             )
-        )
-        outline_block_content = remove_thinking_tags(outline_block_content)
-
-        # Apply custom style if provided
-        custom_prompt = pt.ARTICLE_OUTLINE_BLOCK
-        if custom_style and custom_style.strip():
-            custom_prompt = custom_prompt.replace(
-                '---要求---',
-                f'---要求---\n        - 请围绕这个这个中心主题来编写当前章节内容：{custom_style}\n'
-            )
+            outline_block_content = remove_thinking_tags(outline_block_content)
 
-        # Finalize content
-        final_instruction = '，注意不要包含任何标题（不要包含h1和h2标题），直接开始正文内容' if is_first_chapter else ''
-        outline_block_content_final = await loop.run_in_executor(
-            None,
-            lambda: chat(
+            # Finalize content
+            final_instruction = '，注意不要包含任何标题（不要包含h1和h2标题），直接开始正文内容' if is_first_chapter else ''
+            outline_block_content_final = await achat(
                 f'<完整大纲>{outline_summary}</完整大纲> <相关资料>{outline_block_content}</相关资料> 请根据上述信息，书写大纲中的以下这部分内容：{outline_block}{final_instruction}',
                 custom_prompt,
                 model_type=model_type,
                 model_name=model_name
             )
-        )
-        outline_block_content_final = remove_thinking_tags(outline_block_content_final)
-
-        # Insert images into chapter (always enabled, cross-chapter dedup via shared used_images)
-        logger.info(f"Inserting images into chapter {n}/{total}, used_images_count={len(used_images)}")
-        outline_block_content_final = await _insert_images_to_chapter(
-            chapter_content=outline_block_content_final,
-            outline_block=outline_block,
-            search_results=search_results,
-            user_id=user_id,
-            task_id=task_id,
-            used_images=used_images,
-            max_images_per_chapter=3,
-            similarity_threshold=0
-        )
+            return remove_thinking_tags(outline_block_content_final)
+
+    async def _assemble_ready_chapters():
+        """按章节顺序收集已完成的连续章节，并推送实时预览"""
+        async with assemble_lock:
+            while len(article_chapters) in drafts:
+                i = len(article_chapters)
+                n = i + 1
+                outline_block = content_outline[i]
+                chapter_content = drafts.pop(i)
+                article_chapters.append(chapter_content)
+
+                # Update live preview: append only the new chapter
+                if progress_tracker:
+                    if n == 1:
+                        segment = f"> {outline['summary']}\n\n{chapter_content}" if outline.get('summary') else chapter_content
+                    else:
+                        segment = f"\n\n{chapter_content}"
+
+                    await progress_tracker.append_article(
+                        base_progress + int((n / total) * 35),
+                        f"正在撰写: {outline_block.get('h1', '')} ({n}/{total})",
+                        segment,
+                        {
+                            "type": "writing",
+                            "chapter_index": n,
+                            "chapter_total": total
+                        }
+                    )
 
-        article_chapters.append(outline_block_content_final)
+    async def _run_chapter(i: int, outline_block: Dict[str, Any]):
+        drafts[i] = await _write_chapter(i, outline_block)
+        await _assemble_ready_chapters()
 
-        # Update live preview
-        if progress_tracker:
-            live_article = '\n\n'.join(article_chapters)
-            if outline.get('summary'):
-                live_article = f"> {outline['summary']}\n\n" + live_article
-
-            await progress_tracker.update(
-                progress,
-                f"正在撰写: {outline_block.get('h1', '')} ({n}/{total})",
-                {
-                    "type": "writing",
-                    "live_article": live_article,
-                    "chapter_index": n,
-                    "chapter_total": total
-                }
-            )
+    logger.info(f"Writing {total} chapters with concurrency={max(1, max_concurrent_chapters)}")
+    tasks = [
+        asyncio.create_task(_run_chapter(i, outline_block))
+        for i, outline_block in enumerate(content_outline)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # 任一章节失败时取消其余章节，避免后台继续消耗 LLM 调用
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    # Insert images into all chapters at once (global cross-chapter dedup)
+    logger.info(f"Inserting images into {total} chapters")
+    article_chapters = await _insert_images_to_chapters(
+        chapters=article_chapters,
+        outline_blocks=content_outline,
+        search_results=search_results,
+        user_id=user_id,
+        task_id=task_id,
+        max_images_per_chapter=3,
+        similarity_threshold=0
+    )
 
     # Combine all chapters
     final_content = '\n\n'.join(article_chapters)
@@ -848,6 +866,13 @@ async def save_article_to_database(
         conn.commit()
         logger.info(f"[DB] Article saved successfully: id={article_id}")
 
+        # 文章数量缓存失效（/summaries 的 total）
+        try:
+            from backend.api.core.redis_client import redis_client
+            await redis_client.invalidate_article_count(user_id)
+        except Exception as e:
+            logger.warning(f"[DB] Failed to invalidate article count cache: {e}")
+
         return article_id
 
     except Exception as e:
@@ -860,6 +885,14 @@ async def save_article_to_database(
             conn.close()
 
 
+async def _mark_index_failed(user_id: int, task_id: str) -> None:
+    """标记索引创建失败，并通知等待中的章节立即回退"""
+    try:
+        await faiss_cache.mark_task_status(user_id, task_id, "failed")
+    finally:
+        await faiss_ready.notify(user_id, task_id, None)
+
+
 async def _create_index_background(user_id: int, task_id: str) -> None:
     """
     后台异步创建 FAISS 索引
@@ -872,14 +905,14 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
     """
     # Create progress tracker for FAISS updates
     from backend.api.workers.progress import ProgressTracker
-    progress = ProgressTracker(task_id)
+    progress = ProgressTracker(task_id, user_id=user_id)
 
     # Validate parameters
     if not user_id or not task_id:
         logger.warning("[FAISS] Invalid parameters for background index creation")
         return
 
-    from utils.image_filter import filter_image_urls
+    from utils.image_probe import filter_images_by_header
     from utils.embedding_utils import create_faiss_index
 
     try:
@@ -894,7 +927,7 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
         image_urls = await redis_image_store.get_images(user_id, task_id)
         if not image_urls:
             logger.warning(f"[FAISS] No images found in Redis for indexing: user={user_id}, task={task_id}")
-            await faiss_cache.mark_task_status(user_id, task_id, "failed")
+            await _mark_index_failed(user_id, task_id)
             await progress.update(
                 progress=30,
                 step="没有找到可用的图片",
@@ -905,11 +938,11 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
         logger.info(f"[FAISS] Starting background index creation: user={user_id}, task={task_id}, images={len(image_urls)}")
 
         # 2. 使用维度过滤（非多模态 LLM）
-        # filter_image_urls 会过滤尺寸不合规的图像
-        filtered_urls, _ = filter_image_urls(image_urls, check_url_only=False)
+        # 只读取图片头部获取尺寸，并发过滤图标、小图和不可访问的图片
+        filtered_urls, _ = await filter_images_by_header(image_urls)
         if not filtered_urls:
             logger.warning(f"[FAISS] No images passed dimension filter: user={user_id}, task={task_id}")
-            await faiss_cache.mark_task_status(user_id, task_id, "failed")
+            await _mark_index_failed(user_id, task_id)
             await progress.update(
                 progress=30,
                 step="图片尺寸过滤后无可用图片",
@@ -931,7 +964,7 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
         embeddings = await batch_embed_with_fallback(filtered_urls)
         if not embeddings:
             logger.error(f"[FAISS] Failed to generate embeddings: user={user_id}, task={task_id}")
-            await faiss_cache.mark_task_status(user_id, task_id, "failed")
+            await _mark_index_failed(user_id, task_id)
             await progress.update(
                 progress=30,
                 step="图片 embedding 失败",
@@ -971,6 +1004,7 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
         if success:
             # 6. 标记索引为就绪状态
             await redis_image_store.mark_ready(user_id, task_id, len(filtered_urls))
+            await faiss_ready.notify(user_id, task_id, faiss_index)
             logger.info(f"[FAISS] Index created successfully: user={user_id}, task={task_id}, count={len(filtered_urls)}")
 
             # Update progress: FAISS indexing complete
@@ -981,7 +1015,7 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
             )
         else:
             logger.error(f"[FAISS] Failed to save index: user={user_id}, task={task_id}")
-            await faiss_cache.mark_task_status(user_id, task_id, "failed")
+            await _mark_index_failed(user_id, task_id)
             await progress.update(
                 progress=30,
                 step="图片索引保存失败",
@@ -990,7 +1024,7 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
 
     except Exception as e:
         logger.exception(f"[FAISS] Background index creation failed: user={user_id}, task={task_id}, error={e}")
-        await faiss_cache.mark_task_status(user_id, task_id, "failed")
+        await _mark_index_failed(user_id, task_id)
         try:
             await progress.update(
                 progress=30,
@@ -1001,98 +1035,75 @@ async def _create_index_background(user_id: int, task_id: str) -> None:
             pass  # Don't let progress update errors propagate
 
 
-async def _wait_for_faiss_index(
-    user_id: int,
-    task_id: str,
-    timeout: float = 30.0,
-    poll_interval: float = 2.0
-) -> Optional[Any]:
+async def _probe_faiss_index(user_id: int, task_id: str) -> Any:
     """
-    等待后台 FAISS 索引创建完成
+    检查一次索引当前状态，返回索引、None（创建失败）或 PENDING（尚未就绪）
 
     查找策略（按优先级）：
     1. faiss_cache（Redis 元数据 + 文件系统）— 后台 _create_index_background 创建的索引
     2. 文件系统直接加载 — 搜索阶段 get_streamlit_faiss_index() 已保存的索引
        （搜索阶段通过 searxng_utils → grab_html_content 在处理图片时已创建 FAISS 索引，
         但不会注册到 Redis 元数据中，所以 faiss_cache 找不到）
+    3. Redis 图片状态为 failed 时不再等待
+    """
+    faiss_index = await faiss_cache.get_or_load_index(user_id, task_id)
+    if faiss_index is not None and faiss_index.get_size() > 0:
+        logger.info(f"[FAISS] Index ready (cache): user={user_id}, task={task_id}, size={faiss_index.get_size()}")
+        return faiss_index
+
+    try:
+        from utils.embedding_utils import create_faiss_index
+        disk_index = await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: create_faiss_index(
+                load_from_disk=True,
+                index_dir='data/faiss',
+                username=str(user_id),
+                article_id=task_id
+            )
+        )
+        if disk_index and disk_index.get_size() > 0:
+            logger.info(f"[FAISS] Index loaded from filesystem fallback: user={user_id}, task={task_id}, size={disk_index.get_size()}")
+            # 注册到 faiss_cache 以便后续使用
+            await faiss_cache.save_index(user_id, task_id, disk_index, status="normal")
+            return disk_index
+        logger.debug(f"[FAISS] Filesystem index empty or not found: user={user_id}, task={task_id}")
+    except Exception as e:
+        logger.debug(f"[FAISS] Filesystem fallback failed: user={user_id}, task={task_id}, error={e}")
+
+    status = await redis_image_store.get_status(user_id, task_id)
+    if status.get('status') == 'failed':
+        logger.warning(f"[FAISS] Index creation failed: user={user_id}, task={task_id}")
+        return None
+    return PENDING
+
+
+async def _wait_for_faiss_index(
+    user_id: int,
+    task_id: str,
+    timeout: float = 30.0
+) -> Optional[Any]:
+    """
+    等待后台 FAISS 索引创建完成
+
+    通过 faiss_ready 就绪信号等待（进程内 Future + Redis Pub/Sub），不再轮询。
+    同一任务的所有章节共享一次等待的结果：只在第一次等待时检查当前状态（_probe_faiss_index），
+    超时按任务计算，超时后的章节立即回退到关键词匹配。
 
     Args:
         user_id: 用户 ID
         task_id: 任务 ID（使用 article_id）
-        timeout: 最大等待时间（秒），默认 30 秒
-        poll_interval: 轮询间隔（秒），默认 2 秒
+        timeout: 该任务最长等待时间（秒），默认 30 秒
 
     Returns:
         FAISSIndex 实例如果索引就绪，None 如果超时或失败
     """
-    # Validate poll_interval
-    if poll_interval <= 0:
-        raise ValueError(f"poll_interval must be positive, got {poll_interval}")
-
-    start_time = time.time()
-    filesystem_checked = False
-
     logger.info(f"[FAISS] Waiting for index to be ready: user={user_id}, task={task_id}, timeout={timeout}s")
-
-    while True:
-        elapsed = time.time() - start_time
-
-        # 检查超时
-        if elapsed >= timeout:
-            logger.warning(f"[FAISS] Timeout waiting for index: user={user_id}, task={task_id}, elapsed={elapsed:.1f}s")
-            return None
-
-        # 尝试从 faiss_cache 获取索引（需要 Redis 元数据）
-        faiss_index = await faiss_cache.get_or_load_index(user_id, task_id)
-
-        if faiss_index is not None:
-            # 检查索引是否为空
-            if faiss_index.get_size() > 0:
-                logger.info(f"[FAISS] Index ready (cache): user={user_id}, task={task_id}, size={faiss_index.get_size()}, elapsed={elapsed:.1f}s")
-                return faiss_index
-            else:
-                logger.debug(f"[FAISS] Index exists but empty: user={user_id}, task={task_id}")
-
-        # 文件系统回退：搜索阶段通过 get_streamlit_faiss_index() 已保存索引到磁盘，
-        # 但不会注册到 Redis 元数据中。直接尝试从磁盘加载。
-        if not filesystem_checked:
-            try:
-                from utils.embedding_utils import create_faiss_index
-                disk_index = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: create_faiss_index(
-                        load_from_disk=True,
-                        index_dir='data/faiss',
-                        username=str(user_id),
-                        article_id=task_id
-                    )
-                )
-                if disk_index and disk_index.get_size() > 0:
-                    logger.info(f"[FAISS] Index loaded from filesystem fallback: user={user_id}, task={task_id}, size={disk_index.get_size()}")
-                    # 注册到 faiss_cache 以便后续使用
-                    await faiss_cache.save_index(user_id, task_id, disk_index, status="normal")
-                    return disk_index
-                else:
-                    logger.debug(f"[FAISS] Filesystem index empty or not found: user={user_id}, task={task_id}")
-            except Exception as e:
-                logger.debug(f"[FAISS] Filesystem fallback failed: user={user_id}, task={task_id}, error={e}")
-            filesystem_checked = True
-
-        # 检查 Redis 状态（缓存 status_value 以避免重复调用 .get()）
-        status = await redis_image_store.get_status(user_id, task_id)
-        status_value = status.get('status')
-
-        if status_value == 'failed':
-            logger.warning(f"[FAISS] Index creation failed: user={user_id}, task={task_id}")
-            return None
-
-        # 检查是否已标记为 ready 但索引尚未加载到缓存
-        if status_value == 'ready':
-            logger.debug(f"[FAISS] Index marked ready in Redis, waiting for cache: user={user_id}, task={task_id}")
-
-        # 等待一段时间后重试
-        logger.debug(f"[FAISS] Index not ready, polling in {poll_interval}s: user={user_id}, task={task_id}")
-        await asyncio.sleep(poll_interval)
+    return await faiss_ready.wait(
+        user_id, task_id,
+        probe=lambda: _probe_faiss_index(user_id, task_id),
+        timeout=timeout
+    )
 
 
 async def generate_article_task(
@@ -1116,7 +1127,7 @@ async def generate_article_task(
 
     from backend.api.workers.progress import ProgressTracker
 
-    progress = ProgressTracker(task_id)
+    progress = ProgressTracker(task_id, user_id=user_id)
     # Set status to running immediately
     await progress.update(0, "正在启动任务...", status="running")
 
@@ -1250,3 +1261,6 @@ async def generate_article_task(
             'error': str(e),
             'task_id': task_id
         }
+    finally:
+        # 无论成功与否都释放就绪信号（停止监听 Pub/Sub、释放索引引用）
+        faiss_ready.forget(user_id, task_id)
@@ -1,165 +1,165 @@
 # -*- coding: utf-8 -*-
 """
-图片索引器 - 递归分治Embedding策略
+图片索引器 - 并发自适应批量 Embedding 调度
+
+原先的递归分治策略逐批串行发送（10→5→1），失败时再串行处理两半，
+100 张图片即使全部成功也需要 10 次以上串行往返。现在由 EmbeddingScheduler 调度：
+
+- 最多 EMBED_MAX_INFLIGHT 个批次同时在途，索引创建耗时取决于服务吞吐而不是串行延迟
+- 批次大小按 AIMD 调整：批次成功且耗时低于 EMBED_TARGET_BATCH_LATENCY 时加大，
+  失败或耗时过长时减半（下限 MIN_BATCH_SIZE，上限 MAX_BATCH_SIZE）
+- 失败批次中的图片各自单张重试一次，不再逐层对半拆分
+- 请求通过 Embedding 共享的 HTTP 连接池发送；已成功的向量由 embedding_cache 缓存，重试不会重复请求
 """
 
 import asyncio
 import logging
-from typing import List, Optional
+import os
+import time
+from collections import deque
+from typing import Callable, List, Optional
 
 logger = logging.getLogger(__name__)
 
 # 配置
 INITIAL_BATCH_SIZE = 10  # 初始批次大小
 MIN_BATCH_SIZE = 1       # 最小批次（单张）
+MAX_BATCH_SIZE = int(os.getenv('EMBED_MAX_BATCH_SIZE', '32'))
+EMBED_MAX_INFLIGHT = int(os.getenv('EMBED_MAX_INFLIGHT', '4'))
+EMBED_TARGET_BATCH_LATENCY = float(os.getenv('EMBED_TARGET_BATCH_LATENCY', '20'))  # 秒
+MAX_ATTEMPTS = 2         # 每张图片最多尝试次数（批量一次 + 单张重试一次）
 
 
-async def batch_embed_with_fallback(
-    image_urls: List[str]
-) -> List:
-    """
-    递归分治embedding策略
-
-    策略：
-    1. 初始按10张/批分组
-    2. 批次失败 → 对半拆分（10→5+5）
-    3. 5张批次还失败 → 逐张处理
-    4. 递归直到单张
-
-    Args:
-        image_urls: 图片URL列表
-
-    Returns:
-        embedding结果列表（失败的位置为None）
-    """
-    total = len(image_urls)
+def _embed_images(urls: List[str]) -> List:
+    from utils.embedding_utils import Embedding
+    return Embedding().get_embedding(urls, is_image_url=True)
 
-    if total == 0:
-        return []
 
-    logger.info(f"【递归分治模式】{total}张图片，初始批次={INITIAL_BATCH_SIZE}")
+class AdaptiveBatchSize:
+    """按批次延迟和失败情况调整批次大小（加性增、乘性减）"""
 
-    # 初始分批
-    embeddings = await _process_batches_recursive(
-        image_urls,
-        INITIAL_BATCH_SIZE,
-        level=1
-    )
+    def __init__(self, initial: int = INITIAL_BATCH_SIZE, minimum: int = MIN_BATCH_SIZE,
+                 maximum: int = MAX_BATCH_SIZE, target_latency: float = EMBED_TARGET_BATCH_LATENCY):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.size = min(max(initial, minimum), self.maximum)
+        self.target_latency = target_latency
 
-    success_count = sum(1 for e in embeddings if e and len(e) > 0)
-    logger.info(f"✓ Embedding完成: {success_count}/{total} 张图片成功")
+    def on_success(self, batch_size: int, latency: float) -> None:
+        if latency > self.target_latency:
+            self.size = max(self.minimum, self.size // 2)
+        elif batch_size >= self.size:
+            # 只有满批次的成功才说明当前大小可以继续增加
+            self.size = min(self.maximum, self.size + 2)
 
-    return embeddings
+    def on_failure(self) -> None:
+        self.size = max(self.minimum, self.size // 2)
 
 
-async def _process_batches_recursive(
-    urls: List[str],
-    batch_size: int,
-    level: int
-) -> List:
+class EmbeddingScheduler:
     """
-    递归处理批次
-
-    Args:
-        urls: 图片URL列表
-        batch_size: 当前批次大小
-        level: 递归层级（用于日志）
+    并发批量 embedding 调度器
 
-    Returns:
-        embedding结果列表
+    embed 为同步函数（输入 URL 列表，返回等长的向量列表，下载失败的位置为空列表），
+    在线程池中执行。返回值与输入对齐，失败的位置为 None。
     """
-    from utils.embedding_utils import Embedding
-
-    total = len(urls)
-    indent = "  " * level
-    embeddings = [None] * total
 
-    # 分批
-    batches = [
-        (i, urls[i:i + batch_size])
-        for i in range(0, total, batch_size)
-    ]
-
-    logger.info(f"{indent}层级{level}: {total}张图片 → {len(batches)}批(每批≤{batch_size}张)")
-
-    # 处理每批
-    for start_idx, batch in batches:
-        batch_num = start_idx // batch_size + 1
-
-        # === 尝试批量发送 ===
+    def __init__(self, embed: Callable[[List[str]], List] = _embed_images,
+                 max_inflight: int = EMBED_MAX_INFLIGHT,
+                 batch_size: Optional[AdaptiveBatchSize] = None,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self._embed = embed
+        self.max_inflight = max(1, max_inflight)
+        self.batch_size = batch_size or AdaptiveBatchSize()
+        self.max_attempts = max_attempts
+        self.stats = {'batches': 0, 'failed_batches': 0, 'retried_items': 0}
+
+    async def _send(self, urls: List[str]):
+        start = time.monotonic()
         try:
-            logger.info(f"{indent}  批次[{batch_num}]: 批量发送{len(batch)}张...")
-
-            batch_embeddings = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: Embedding().get_embedding(batch, is_image_url=True)
-            )
-
-            # 验证结果
-            if batch_embeddings and len(batch_embeddings) == len(batch):
-                batch_success = sum(1 for e in batch_embeddings if e and len(e) > 0)
-                logger.info(f"{indent}    ✓ 批次[{batch_num}]成功: {batch_success}/{len(batch)}张")
-
-                # 保存结果
-                for i, emb in enumerate(batch_embeddings):
-                    embeddings[start_idx + i] = emb
-
-                continue  # 该批成功，处理下一批
-
-            else:
-                logger.warning(f"{indent}    ✗ 批次[{batch_num}]返回数量不匹配")
-
+            vectors = await asyncio.get_event_loop().run_in_executor(None, self._embed, urls)
+            error = None
         except Exception as e:
-            logger.warning(f"{indent}    ✗ 批次[{batch_num}]失败: {e}")
+            vectors, error = None, e
+        return vectors, error, time.monotonic() - start
+
+    async def run(self, urls: List[str]) -> List:
+        total = len(urls)
+        results: List = [None] * total
+        attempts = [0] * total
+        pending = deque(range(total))
+        retries = deque()
+        in_flight = {}
+
+        while pending or retries or in_flight:
+            while len(in_flight) < self.max_inflight and (pending or retries):
+                if retries:
+                    batch = [retries.popleft()]
+                else:
+                    size = min(self.batch_size.size, len(pending))
+                    batch = [pending.popleft() for _ in range(size)]
+                for i in batch:
+                    attempts[i] += 1
+                task = asyncio.ensure_future(self._send([urls[i] for i in batch]))
+                in_flight[task] = batch
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                batch = in_flight.pop(task)
+                vectors, error, latency = task.result()
+                self.stats['batches'] += 1
+
+                if vectors and len(vectors) == len(batch):
+                    self.batch_size.on_success(len(batch), latency)
+                    for i, vector in zip(batch, vectors):
+                        results[i] = vector
+                    logger.info(f"  ✓ 批次成功: {len(batch)}张, 耗时{latency:.1f}s, 下一批≤{self.batch_size.size}张")
+                    continue
+
+                reason = error or "返回数量不匹配"
+                self.stats['failed_batches'] += 1
+                self.batch_size.on_failure()
+                logger.warning(f"  ✗ 批次失败: {len(batch)}张, 原因: {reason}, 下一批≤{self.batch_size.size}张")
+                # 失败隔离：批次中的图片各自单张重试
+                for i in batch:
+                    if attempts[i] < self.max_attempts:
+                        retries.append(i)
+                        self.stats['retried_items'] += 1
+
+        return results
 
-        # === 批次失败，递归分治 ===
 
-        # 终止条件：已经是单张了
-        if len(batch) == MIN_BATCH_SIZE:
-            logger.info(f"{indent}    批次[{batch_num}]已达最小批次，逐张处理...")
-
-            single_emb = await _process_single_image(batch[0])
-            embeddings[start_idx] = single_emb
+async def batch_embed_with_fallback(
+    image_urls: List[str]
+) -> List:
+    """
+    并发自适应批量 embedding
 
-            status = "✓" if (single_emb and len(single_emb) > 0) else "✗"
-            logger.info(f"{indent}      [{status}] 单张完成: {batch[0][:40]}...")
-            continue
+    策略：
+    1. 初始按10张/批分组，最多 EMBED_MAX_INFLIGHT 批同时在途
+    2. 根据批次耗时和失败情况调整后续批次大小
+    3. 批次失败 → 其中的图片逐张重试一次
 
-        # 对半拆分
-        half_size = max(MIN_BATCH_SIZE, len(batch) // 2)
-        logger.info(f"{indent}    批次[{batch_num}]对半拆分: {len(batch)} → {half_size} + {len(batch) - half_size}")
+    已成功的图片向量写入 embedding_cache，重试时不会重复请求。
 
-        # 递归处理左半部分
-        left_embeddings = await _process_batches_recursive(
-            batch[:half_size],
-            MIN_BATCH_SIZE,
-            level + 1
-        )
+    Args:
+        image_urls: 图片URL列表
 
-        # 递归处理右半部分
-        right_embeddings = await _process_batches_recursive(
-            batch[half_size:],
-            MIN_BATCH_SIZE,
-            level + 1
-        )
+    Returns:
+        embedding结果列表（失败的位置为None）
+    """
+    total = len(image_urls)
 
-        # 合并结果
-        for i, emb in enumerate(left_embeddings + right_embeddings):
-            embeddings[start_idx + i] = emb
+    if total == 0:
+        return []
 
-    return embeddings
+    logger.info(f"【并发批量模式】{total}张图片，初始批次={INITIAL_BATCH_SIZE}，并发={EMBED_MAX_INFLIGHT}")
 
+    scheduler = EmbeddingScheduler()
+    embeddings = await scheduler.run(image_urls)
 
-async def _process_single_image(url: str) -> List:
-    """处理单张图片"""
-    from utils.embedding_utils import Embedding
+    success_count = sum(1 for e in embeddings if e and len(e) > 0)
+    from utils.embedding_cache import embedding_cache
+    logger.info(f"✓ Embedding完成: {success_count}/{total} 张图片成功, 调度={scheduler.stats}, 缓存命中率={embedding_cache.get_stats()['hit_rate']}")
 
-    try:
-        result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: Embedding().get_embedding([url], is_image_url=True)
-        )
-        return result[0] if result else None
-    except Exception as e:
-        logger.debug(f"单张图片embedding失败: {e}")
-        return None
+    return embeddings
@@ -52,19 +52,13 @@ class RedisImageStore:
         list_key = self._get_list_key(user_id, task_id)
 
         try:
-            # 批量添加（Redis会自动去重）
-            count = 0
-            for url in image_urls:
-                if url and url.strip():
-                    added = await redis_client.async_client.sadd(list_key, url.strip())
-                    count += added
-
-            # 设置过期时间
-            await redis_client.async_client.expire(list_key, IMAGE_TTL)
+            # 一条 SADD 批量添加（Redis会自动去重），过期时间和集合大小在同一事务中返回
+            urls = [url.strip() for url in image_urls if url and url.strip()]
+            count, total = await redis_client.sadd_many(list_key, urls, ttl=IMAGE_TTL)
 
             # 更新元数据
             await self._update_metadata(user_id, task_id, {
-                "total_count": str(await self.get_count(user_id, task_id)),
+                "total_count": str(total),
                 "status": "collecting"
             })
 
@@ -179,8 +173,7 @@ class RedisImageStore:
             meta_key = self._get_meta_key(user_id, task_id)
 
             # Delete image list and metadata
-            await redis_client.async_client.delete(list_key)
-            await redis_client.async_client.delete(meta_key)
+            await redis_client.async_client.delete(list_key, meta_key)
 
             logger.debug(f"Deleted images from Redis: user={user_id}, task={task_id}")
             return True
@@ -199,8 +192,7 @@ class RedisImageStore:
         meta_key = self._get_meta_key(user_id, task_id)
 
         try:
-            await redis_client.async_client.hset(meta_key, mapping=data)
-            await redis_client.async_client.expire(meta_key, IMAGE_TTL)
+            await redis_client.hset_with_ttl(meta_key, data, IMAGE_TTL)
         except Exception as e:
             logger.error(f"Error updating metadata: {e}")
 
@@ -8,7 +8,8 @@ import logging
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from backend.api.core.redis_client import redis_client
+from backend.api.core.progress_events import append_article_segment, load_article, progress_publisher
+from backend.api.core.redis_client import progress_key, redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -16,17 +17,20 @@ logger = logging.getLogger(__name__)
 class ProgressTracker:
     """Track article generation progress in Redis"""
 
-    def __init__(self, task_id: str, ttl: int = 3600):
+    def __init__(self, task_id: str, ttl: int = 3600, user_id: Optional[int] = None):
         """
         Initialize progress tracker
 
         Args:
             task_id: Unique task identifier
             ttl: Time to live in seconds (default 1 hour)
+            user_id: Owner of the task; when set, every write records it in the
+                progress hash so progress subscriptions can check ownership
         """
         self.task_id = task_id
         self.ttl = ttl
-        self.key = f"article:progress:{task_id}"
+        self.user_id = user_id
+        self.key = progress_key(task_id)
 
     async def init(
         self,
@@ -40,25 +44,27 @@ class ProgressTracker:
             user_id: User ID who initiated the task
             topic: Article topic
         """
-        await redis_client.async_client.hset(
-            self.key,
-            mapping={
+        now = datetime.now().isoformat()
+        self.user_id = user_id
+
+        # Progress hash and the user's queue entry written in a single MULTI/EXEC round-trip,
+        # so tasks enqueued straight to the worker (batch / agent) are listed per user too
+        await redis_client.write_task_progress(
+            self.task_id,
+            {
                 "task_id": self.task_id,
                 "status": "queued",
                 "progress": "0",
                 "progress_text": "任务已提交，等待处理...",
                 "user_id": str(user_id),
                 "topic": topic,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }
+                "created_at": now,
+                "updated_at": now
+            },
+            self.ttl,
+            user_id=user_id,
+            index=True
         )
-        await redis_client.async_client.expire(self.key, self.ttl)
-
-        # Add task to user's task set
-        user_tasks_key = f"article:user:{user_id}:tasks"
-        await redis_client.async_client.sadd(user_tasks_key, self.task_id)
-        await redis_client.async_client.expire(user_tasks_key, self.ttl)
 
         logger.debug(f"Progress initialized: {self.task_id}")
 
@@ -90,14 +96,59 @@ class ProgressTracker:
         if data:
             update_data["data"] = json.dumps(data)
 
-        await redis_client.async_client.hset(
-            self.key,
-            mapping=update_data
-        )
-        await redis_client.async_client.expire(self.key, self.ttl)
+        await redis_client.write_task_progress(self.task_id, update_data, self.ttl, user_id=self.user_id)
+
+        # 推送增量事件（live_article 只发送新增章节）
+        await progress_publisher.publish(self.task_id, {
+            "status": status,
+            "progress": progress,
+            "step": step,
+            "data": data,
+        }, self.ttl)
 
         logger.debug(f"Progress updated: {self.task_id} - {progress}% - {step} - status: {status or 'unchanged'}")
 
+    async def append_article(
+        self,
+        progress: int,
+        step: str,
+        text: str,
+        data: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Append a segment (usually one chapter) to the live article
+
+        The segment is pushed to a Redis list and only the new text is published,
+        so each write costs O(chapter) instead of re-serializing the whole article.
+
+        Args:
+            progress: Progress percentage (0-100)
+            step: Current step description
+            text: Text to append to the live article
+            data: Optional additional data (without live_article)
+
+        Returns:
+            Sequence number of the appended segment (1-based)
+        """
+        update_data = {
+            "progress": str(progress),
+            "step": step,
+            "timestamp": datetime.now().isoformat()
+        }
+        if data:
+            update_data["data"] = json.dumps(data)
+
+        seq = await append_article_segment(self.task_id, self.key, update_data, text, self.ttl)
+        await progress_publisher.publish(self.task_id, {
+            "progress": progress,
+            "step": step,
+            "data": data,
+            "article_append": {"seq": seq, "text": text},
+        }, self.ttl)
+
+        logger.debug(f"Article segment appended: {self.task_id} - seq {seq} - {len(text)} chars")
+        return seq
+
     async def get(self) -> Dict[str, Any]:
         """Get current progress from Redis"""
         data = await redis_client.async_client.hgetall(self.key)
@@ -152,6 +203,8 @@ class ProgressTracker:
                     result["outline"] = parsed_data.get("outline")
                 elif parsed_data.get("type") == "writing":
                     result["live_article"] = parsed_data.get("live_article")
+                    if result["live_article"] is None:
+                        _, result["live_article"] = await load_article(self.task_id)
                 elif parsed_data.get("type") == "completed":
                     result["live_article"] = parsed_data.get("article", {}).get("content")
                     result["outline"] = parsed_data.get("article", {}).get("outline")
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+来源摘要索引（Source Digest）
+
+每个写作任务只对抓取到的语料切块并做一次 embedding，
+之后每个章节按大纲块检索最相关的 top-k 片段，
+避免每章都把全部语料重新切块、重新发送给 LLM。
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 配置
+CHUNK_SIZE = 1500        # 单个片段的最大字符数
+CHUNK_OVERLAP = 200      # 超长段落硬切分时的重叠字符数
+EMBED_BATCH_SIZE = 32    # 每次 embedding 请求的片段数
+DEFAULT_TOP_K = 12       # 每个章节检索的片段数
+
+
+def split_into_chunks(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    按段落将文本切分为不超过 chunk_size 的片段，超长段落按固定窗口切分
+
+    Args:
+        text: 原始文本
+        chunk_size: 片段最大字符数
+        overlap: 硬切分时相邻片段的重叠字符数
+
+    Returns:
+        片段列表
+    """
+    chunks = []
+    current = ""
+    for paragraph in (p.strip() for p in text.split('\n')):
+        if not paragraph:
+            continue
+        if len(paragraph) > chunk_size:
+            if current:
+                chunks.append(current)
+                current = ""
+            step = max(1, chunk_size - overlap)
+            for start in range(0, len(paragraph), step):
+                chunks.append(paragraph[start:start + chunk_size])
+                if start + chunk_size >= len(paragraph):
+                    break
+            continue
+        if current and len(current) + len(paragraph) + 1 > chunk_size:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _outline_block_query(outline_block: Any) -> str:
+    """由大纲块构建检索查询文本（h1 + h2 + 内容要点）"""
+    if not isinstance(outline_block, dict):
+        return str(outline_block)
+    h2_list = outline_block.get('h2', [])
+    h2_str = " ".join(h2_list) if isinstance(h2_list, list) else str(h2_list)
+    content = outline_block.get('content', '')
+    return f"{outline_block.get('h1', '')} {h2_str} {content}".strip()
+
+
+class SourceDigest:
+    """任务级语料片段索引"""
+
+    def __init__(self, chunks: List[Dict[str, Any]], index=None):
+        self.chunks = chunks
+        self.index = index
+
+    @property
+    def available(self) -> bool:
+        """索引是否可用于检索"""
+        return self.index is not None and self.index.get_size() > 0
+
+    @classmethod
+    async def build(cls, search_results: List[Dict[str, Any]]) -> 'SourceDigest':
+        """
+        切分并 embedding 全部搜索结果
+
+        embedding 失败的片段会被跳过；全部失败时返回不可用的 digest，
+        调用方应回退为使用完整语料。
+        """
+        from utils.embedding_utils import FAISSIndex
+
+        chunks = []
+        for source_index, item in enumerate(search_results):
+            if not isinstance(item, dict):
+                continue
+            content = item.get('html_content') or item.get('content') or ''
+            for chunk_index, text in enumerate(split_into_chunks(content)):
+                chunks.append({
+                    'title': item.get('title', 'Untitled'),
+                    'url': item.get('url', ''),
+                    'text': text,
+                    'source_index': source_index,
+                    'chunk_index': chunk_index,
+                })
+
+        if not chunks:
+            return cls([])
+
+        logger.info(f"[Digest] Embedding {len(chunks)} chunks from {len(search_results)} sources")
+
+        embedded_chunks = []
+        embeddings = []
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = chunks[start:start + EMBED_BATCH_SIZE]
+            batch_embeddings = await _embed_texts([c['text'] for c in batch])
+            if len(batch_embeddings) != len(batch):
+                logger.warning(f"[Digest] Embedding batch {start // EMBED_BATCH_SIZE + 1} failed, skipping {len(batch)} chunks")
+                continue
+            for chunk, embedding in zip(batch, batch_embeddings):
+                if embedding:
+                    embedded_chunks.append(chunk)
+                    embeddings.append(embedding)
+
+        if not embeddings:
+            logger.warning("[Digest] No chunks embedded, digest unavailable")
+            return cls(chunks)
+
+        index = FAISSIndex()
+        index.add_embeddings(embeddings, embedded_chunks)
+        logger.info(f"[Digest] ✓ Digest ready: {len(embedded_chunks)}/{len(chunks)} chunks indexed")
+        return cls(chunks, index)
+
+    async def select(self, outline_block: Any, top_k: int = DEFAULT_TOP_K) -> Optional[List[Dict[str, Any]]]:
+        """
+        检索与大纲块最相关的片段，并按来源合并为 llm_task 可直接使用的搜索结果格式
+
+        Returns:
+            [{title, url, html_content}, ...]，不可用或检索失败时返回 None
+        """
+        if not self.available:
+            return None
+
+        query_text = _outline_block_query(outline_block)
+        query_embeddings = await _embed_texts([query_text])
+        if not query_embeddings or not query_embeddings[0]:
+            logger.warning("[Digest] Query embedding failed, falling back to full corpus")
+            return None
+
+        loop = asyncio.get_running_loop()
+        _, similarities, matched = await loop.run_in_executor(
+            None, lambda: self.index.search(query_embeddings[0], k=top_k)
+        )
+
+        # 按来源分组，来源顺序取最高相似度，片段保持原文顺序
+        grouped: Dict[int, List[Dict[str, Any]]] = {}
+        for chunk in matched:
+            grouped.setdefault(chunk['source_index'], []).append(chunk)
+
+        selected = []
+        for chunks in grouped.values():
+            chunks.sort(key=lambda c: c['chunk_index'])
+            selected.append({
+                'title': chunks[0]['title'],
+                'url': chunks[0]['url'],
+                'html_content': '\n\n'.join(c['text'] for c in chunks),
+            })
+
+        logger.info(
+            f"[Digest] Selected {len(matched)} chunks from {len(selected)} sources, "
+            f"top similarities: {[round(s, 3) for s in similarities[:3]]}"
+        )
+        return selected
+
+
+async def _embed_texts(texts: List[str]) -> List:
+    """在线程池中调用 Embedding API，失败时返回空列表"""
+    from utils.embedding_utils import Embedding
+
+    loop = asyncio.get_running_loop()
+    try:
+        embeddings = await loop.run_in_executor(None, lambda: Embedding().get_embedding(texts))
+        return embeddings or []
+    except Exception as e:
+        logger.warning(f"[Digest] Embedding request failed: {e}")
+        return []
@@ -3,6 +3,7 @@
 arq Worker Configuration
 """
 
+import asyncio
 import logging
 from pathlib import Path
 from arq import cron
@@ -106,10 +107,16 @@ class WorkerSettings:
         logger.info("  - refresh_all_user_stats: hourly")
         logger.info("  - reset_agent_daily_counters: daily at 00:00")
         logger.info("  - cleanup_hotspot_history: daily at 02:00")
+        from utils.browser_pool import browser_pool
+        logger.info(f"Browser pool: max_contexts={browser_pool.max_contexts}, "
+                    f"context_max_uses={browser_pool.context_max_uses}, per_host_limit={browser_pool.per_host_limit}")
         logger.info("=" * 60)
 
     # Optional: on shutdown
     async def on_shutdown(ctx):
         logger = logging.getLogger(__name__)
         logger.info("Article Generator Worker shutting down...")
+        # 关闭进程级共享浏览器
+        from utils.browser_pool import browser_pool
+        await asyncio.to_thread(browser_pool.close)
         logger.info("=" * 60)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Shared test fixtures."""
+
+import asyncio
+
+import pytest
+
+from backend.api.core.redis_client import redis_client
+
+
+def _stream_id(event_id):
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.channels = set()
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        self.channels.update(channels)
+        if self not in self.redis.subscribers:
+            self.redis.subscribers.append(self)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels or set(self.channels))
+        if not self.channels and self in self.redis.subscribers:
+            self.redis.subscribers.remove(self)
+
+    async def aclose(self):
+        await self.unsubscribe()
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, "_" + name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+        return queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        calls, self.calls = self.calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+class FakeRedis:
+    """内存版 Redis，记录网络往返次数（每条命令或每次 pipeline 执行算一次）"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.sets = {}
+        self.zsets = {}
+        self.lists = {}
+        self.streams = {}
+        self.subscribers = []
+        self.published = []
+        self.round_trips = 0
+        self._stream_counter = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self, "_" + name)
+
+        async def call(*args, **kwargs):
+            self.round_trips += 1
+            return method(*args, **kwargs)
+        return call
+
+    async def scan_iter(self, match=None, count=None):
+        self.round_trips += 1
+        prefix = (match or "").rstrip("*")
+        for key in list(self.hashes) + list(self.sets) + list(self.zsets) + list(self.lists) + list(self.streams):
+            if key.startswith(prefix):
+                yield key
+
+    # pub/sub
+
+    def _publish(self, channel, message):
+        self.published.append((channel, message))
+        receivers = [pubsub for pubsub in self.subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(receivers)
+
+    # keys
+
+    def _expire(self, key, ttl):
+        return True
+
+    def _delete(self, *keys):
+        removed = 0
+        for store in (self.hashes, self.sets, self.zsets, self.lists, self.streams):
+            for key in keys:
+                removed += store.pop(key, None) is not None
+        return removed
+
+    # hashes
+
+    def _hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def _hsetnx(self, key, field, value):
+        return self.hashes.setdefault(key, {}).setdefault(field, value) == value
+
+    def _hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def _hmget(self, key, keys, *args):
+        fields = self.hashes.get(key, {})
+        return [fields.get(name) for name in list(keys) + list(args)]
+
+    def _hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    # sets
+
+    def _sadd(self, key, *members):
+        members_set = self.sets.setdefault(key, set())
+        before = len(members_set)
+        members_set.update(members)
+        return len(members_set) - before
+
+    def _scard(self, key):
+        return len(self.sets.get(key, ()))
+
+    # sorted sets
+
+    def _zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def _zrevrange(self, key, start, end, withscores=False):
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1], reverse=True)
+        members = members[start:end + 1 if end >= 0 else None]
+        return members if withscores else [member for member, _ in members]
+
+    def _zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    # lists
+
+    def _rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def _lrange(self, key, start, end):
+        return list(self.lists.get(key, []))[start:end + 1 if end >= 0 else None]
+
+    # streams
+
+    def _xadd(self, name, fields, maxlen=None, approximate=True):
+        self._stream_counter += 1
+        event_id = f"{1000 + self._stream_counter}-0"
+        self.streams.setdefault(name, []).append((event_id, fields))
+        return event_id
+
+    def _xrange(self, name, min="-", max="+", count=None):
+        entries = self.streams.get(name, [])
+        if min.startswith("("):
+            after = _stream_id(min[1:])
+            entries = [entry for entry in entries if _stream_id(entry[0]) > after]
+        return entries[:count] if count else list(entries)
+
+    def _xrevrange(self, name, count=None):
+        return list(reversed(self.streams.get(name, [])))[:count]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """用内存版 Redis 替换全局 redis_client 的异步客户端"""
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_client, "_async_client", fake)
+    return fake
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Tests for keyset-paginated article summaries."""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.api.repositories.article import ArticleRepository, decode_article_cursor, encode_article_cursor
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class _FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def execute(self, stmt, params=None):
+        self.calls.append((str(stmt), params))
+        return _FakeResult(self.rows[:params["limit"]])
+
+
+def _rows(count):
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "topic": f"topic {i}",
+            "title": f"title {i}",
+            "status": "completed",
+            "model_type": None,
+            "model_name": None,
+            "excerpt": "摘要",
+            "word_count": 100,
+            "created_at": start - timedelta(hours=i),
+            "updated_at": None,
+            "completed_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    created_at = datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+    article_id = uuid.uuid4()
+
+    assert decode_article_cursor(encode_article_cursor(created_at, article_id)) == (created_at, article_id)
+    with pytest.raises(ValueError):
+        decode_article_cursor("not-a-cursor")
+
+
+def test_summaries_page_after_cursor():
+    rows = _rows(3)
+    session = _FakeSession(rows)
+    repo = ArticleRepository(session)
+
+    page, next_cursor = asyncio.run(repo.list_summaries_by_user(7, limit=2))
+    assert [row["title"] for row in page] == ["title 0", "title 1"]
+    assert decode_article_cursor(next_cursor) == (rows[1]["created_at"], rows[1]["id"])
+
+    sql, params = session.calls[0]
+    assert "metadata" not in sql and "AS excerpt" in sql  # 只返回摘要投影
+    assert "OFFSET" not in sql and "(created_at, id) <" not in sql
+    assert params["limit"] == 3
+
+    session.rows = rows[2:]
+    page, next_cursor = asyncio.run(repo.list_summaries_by_user(7, limit=2, cursor=next_cursor, status="completed"))
+    sql, params = session.calls[1]
+    assert "(created_at, id) < (:cursor_created_at, :cursor_id)" in sql
+    assert params["cursor_id"] == rows[1]["id"] and params["status"] == "completed"
+    assert [row["title"] for row in page] == ["title 2"]
+    assert next_cursor is None
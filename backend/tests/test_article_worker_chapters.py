@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Tests for parallel chapter writing in the article worker."""
+
+import asyncio
+
+import backend.api.workers.article_worker as article_worker
+
+
+class _FakeTracker:
+    def __init__(self):
+        self.previews = []
+        self.live_article = ""
+
+    async def update(self, progress, step, data=None, status=None):
+        pass
+
+    async def append_article(self, progress, step, text, data=None):
+        self.live_article += text
+        self.previews.append((data["chapter_index"], self.live_article))
+        return len(self.previews)
+
+
+def test_chapters_run_in_parallel_and_assemble_in_order(monkeypatch):
+    outline = {
+        "summary": "",
+        "content_outline": [{"h1": f"第{i}章"} for i in range(1, 5)],
+    }
+    state = {"active": 0, "peak": 0}
+
+    async def fake_allm_task(search_results, question, output_type, model_type, model_name):
+        return "资料"
+
+    async def fake_achat(prompt, system_prompt, model_type, model_name):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        # 让后面的章节先完成，验证组装顺序
+        block = prompt.split("书写大纲中的以下这部分内容：")[1]
+        index = int(block.split("'h1': '第")[1][0])
+        await asyncio.sleep(0.01 * (5 - index))
+        state["active"] -= 1
+        return f"正文{index}"
+
+    async def fake_insert_images(chapters, **kwargs):
+        return [f"{chapter}[img-{i}]" for i, chapter in enumerate(chapters)]
+
+    monkeypatch.setattr(article_worker, "allm_task", fake_allm_task)
+    monkeypatch.setattr(article_worker, "achat", fake_achat)
+    monkeypatch.setattr(article_worker, "_insert_images_to_chapters", fake_insert_images)
+
+    tracker = _FakeTracker()
+    content = asyncio.run(article_worker.write_article_content(
+        outline, [], "topic", progress_tracker=tracker, max_concurrent_chapters=4
+    ))
+
+    assert state["peak"] == 4
+    assert content == "正文1[img-0]\n\n正文2[img-1]\n\n正文3[img-2]\n\n正文4[img-3]"
+    assert [index for index, _ in tracker.previews] == [1, 2, 3, 4]
+    # 实时预览只包含正文，配图在全部章节完成后统一插入
+    assert tracker.previews[-1][1] == "正文1\n\n正文2\n\n正文3\n\n正文4"
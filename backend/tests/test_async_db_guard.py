@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Tests for the async DB facade and the event-loop guard on utils.database."""
+
+import asyncio
+
+import pytest
+
+import utils.database as database
+from backend.api.repositories import async_queries
+from backend.api.repositories.async_queries import TierQueries
+from utils.database import BlockingDatabaseCallError, Database
+
+
+class _FakeConn:
+    def cursor(self, cursor_factory=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+    def close(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _FakePool:
+    def getconn(self):
+        return _FakeConn()
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+def _query_sync():
+    with Database.get_cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return True
+
+
+def test_sync_db_call_on_event_loop_is_flagged(monkeypatch):
+    monkeypatch.setattr(Database, "get_connection_pool", classmethod(lambda cls: _FakePool()))
+    monkeypatch.setattr(database, "DB_LOOP_GUARD", "raise")
+
+    async def on_loop():
+        return _query_sync()
+
+    async def in_thread():
+        return await asyncio.to_thread(_query_sync)
+
+    with pytest.raises(BlockingDatabaseCallError):
+        asyncio.run(on_loop())
+    # 线程池中和事件循环外的调用不受影响
+    assert asyncio.run(in_thread()) is True
+    assert _query_sync() is True
+
+    monkeypatch.setattr(database, "DB_LOOP_GUARD", "warn")
+    monkeypatch.setattr(database, "_warned_call_sites", set())
+    asyncio.run(on_loop())
+    asyncio.run(on_loop())
+    assert len(database._warned_call_sites) == 1
+    assert "test_async_db_guard.py" in next(iter(database._warned_call_sites))
+
+
+class _FakeAsyncDB:
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    async def fetch_one(self, sql, params=None):
+        self.queries.append((sql, params))
+        return self.row
+
+
+def test_check_user_quota_uses_single_query(monkeypatch):
+    fake = _FakeAsyncDB({"tier": "pro", "article_limit_per_month": 20, "used": 20})
+    monkeypatch.setattr(async_queries, "async_db", fake)
+
+    quota = asyncio.run(TierQueries.check_user_quota(3))
+
+    assert quota == {"allowed": False, "used": 20, "limit": 20, "remaining": 0}
+    assert len(fake.queries) == 1 and fake.queries[0][1] == {"user_id": 3}
+
+    fake.row = {"tier": "superuser", "article_limit_per_month": None, "used": 7}
+    assert asyncio.run(TierQueries.check_user_quota(3))["limit"] == 999999
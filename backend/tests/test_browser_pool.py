@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Tests for the shared browser pool using fake Playwright objects."""
+
+import asyncio
+
+import utils.browser_pool as browser_pool_module
+from utils.browser_pool import BrowserPool
+
+
+class _FakeRequest:
+    def __init__(self, resource_type):
+        self.resource_type = resource_type
+
+
+class _FakeRoute:
+    def __init__(self, resource_type):
+        self.request = _FakeRequest(resource_type)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+class _FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.route_handler = None
+
+    async def route(self, pattern, handler):
+        self.route_handler = handler
+
+    async def close(self):
+        pass
+
+
+class _FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def new_page(self):
+        return _FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **kwargs):
+        context = _FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        pass
+
+
+class _FakePlaywright:
+    def __init__(self):
+        self.chromium = self
+        self.launches = 0
+
+    async def launch(self, **kwargs):
+        self.launches += 1
+        return _FakeBrowser()
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+def _install_fake_playwright(monkeypatch):
+    fake = _FakePlaywright()
+    monkeypatch.setattr(browser_pool_module, "async_playwright", lambda: fake)
+    return fake
+
+
+def test_contexts_are_reused_and_recycled(monkeypatch):
+    fake = _install_fake_playwright(monkeypatch)
+    pool = BrowserPool(max_contexts=2, context_max_uses=2, per_host_limit=2)
+
+    async def handler(page):
+        return page.context
+
+    async def run():
+        return [await pool.run_page(f"https://example.com/{i}", handler) for i in range(3)]
+
+    try:
+        contexts = asyncio.run(run())
+        # 两次调用在 asyncio.run 的不同事件循环中进行，浏览器只启动一次
+        asyncio.run(run())
+    finally:
+        pool.close()
+
+    assert fake.launches == 1
+    assert contexts[0] is contexts[1]
+    assert contexts[0].closed
+    assert contexts[2] is not contexts[0]
+    assert pool.get_stats()["contexts_recycled"] >= 1
+
+
+def test_per_host_limit_and_resource_blocking(monkeypatch):
+    _install_fake_playwright(monkeypatch)
+    pool = BrowserPool(max_contexts=4, context_max_uses=10, per_host_limit=1)
+    active = {"current": 0, "peak": 0}
+
+    async def handler(page):
+        active["current"] += 1
+        active["peak"] = max(active["peak"], active["current"])
+        await asyncio.sleep(0.02)
+        active["current"] -= 1
+        routes = [_FakeRoute("image"), _FakeRoute("font"), _FakeRoute("document")]
+        for route in routes:
+            await page.route_handler(route)
+        return [route.outcome for route in routes]
+
+    async def run():
+        return await asyncio.gather(*[
+            pool.run_page(f"https://same.example.com/{i}", handler) for i in range(3)
+        ])
+
+    try:
+        outcomes = asyncio.run(run())
+        stats = pool.get_stats()
+    finally:
+        pool.close()
+
+    assert active["peak"] == 1
+    # 空闲 host 的并发限制已释放
+    assert stats["active_hosts"] == 0
+    # 只拦截字体和媒体，图片需要懒加载后提取
+    assert outcomes[0] == ["continue", "abort", "continue"]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Tests for micro-batched embedding with deferred index persistence."""
+
+import asyncio
+
+from utils.embedding_batcher import EmbeddingBatcher
+
+
+class _FakeIndex:
+    def __init__(self):
+        self.data = []
+
+    def add_embeddings(self, embeddings, data):
+        self.data.extend(data)
+
+    def get_size(self):
+        return len(self.data)
+
+
+def _make_batcher(**kwargs):
+    calls = {"embed": [], "save": 0}
+
+    def embed(texts, is_image_url):
+        calls["embed"].append((list(texts), is_image_url))
+        # 模拟下载失败的图片：对应位置返回空向量
+        return [[] if "bad" in text else [1.0, 0.0] for text in texts]
+
+    def persist():
+        calls["save"] += 1
+        return True
+
+    index = _FakeIndex()
+    batcher = EmbeddingBatcher(index, persist=persist, embed=embed, **kwargs)
+    return batcher, index, calls
+
+
+def test_concurrent_adds_share_batches_and_save_once():
+    batcher, index, calls = _make_batcher(max_batch_size=4, max_delay=0.01, checkpoint_every=0)
+    urls = [f"https://img.example.com/{i}.png" for i in range(9)] + ["https://img.example.com/bad.png"]
+
+    async def run():
+        results = await asyncio.gather(*[
+            batcher.add(url, {"image_url": url}, is_image_url=True) for url in urls
+        ])
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == [True] * 9 + [False]
+    # 10 张图片 → 4 + 4 + 2，三次 embedding 请求
+    assert [len(texts) for texts, _ in calls["embed"]] == [4, 4, 2]
+    assert index.get_size() == 9
+    assert calls["save"] == 1
+
+
+def test_checkpoint_saves_and_text_batches_separately():
+    batcher, index, calls = _make_batcher(max_batch_size=2, max_delay=0.01, checkpoint_every=2)
+
+    async def run():
+        await asyncio.gather(
+            batcher.add("img-a", {"image_url": "a"}, is_image_url=True),
+            batcher.add("img-b", {"image_url": "b"}, is_image_url=True),
+            batcher.add("图片描述", {"description": "图片描述"}),
+        )
+        await batcher.close()
+
+    asyncio.run(run())
+
+    assert sorted(flag for _, flag in calls["embed"]) == [False, True]
+    # 第一批达到检查点保存一次，结束时保存剩余的一条
+    assert calls["save"] == 2
+    assert index.get_size() == 3
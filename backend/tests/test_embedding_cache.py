@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Tests for the persistent embedding cache."""
+
+from utils.embedding_cache import EmbeddingCache, make_key, make_namespace
+
+
+def test_batch_lookup_returns_hits_in_order_and_persists(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    namespace = make_namespace("gitee", "jina-embeddings-v4", 3)
+    keys = [make_key(namespace, f"https://img.example.com/{i}.png", is_image_url=True) for i in range(3)]
+
+    cache = EmbeddingCache(path=path, memory_items=2)
+    assert cache.put_many(keys[:2] + [keys[2]], [[0.5, 0.25, 1.0], [1.0, 0.0, 0.0], []]) == 2
+
+    # 新实例只能从磁盘读取
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get_many(keys) == [[0.5, 0.25, 1.0], [1.0, 0.0, 0.0], None]
+    stats = reopened.get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+    # 再次查询命中进程内 LRU
+    reopened.get_many(keys[:1])
+    assert reopened.get_stats()["memory_hits"] == 1
+
+
+def test_keys_separate_models_and_kinds():
+    text_key = make_key(make_namespace("gitee", "m1", 2048), "https://a.png")
+    assert text_key != make_key(make_namespace("gitee", "m1", 2048), "https://a.png", is_image_url=True)
+    assert text_key != make_key(make_namespace("gitee", "m2", 2048), "https://a.png")
+    assert text_key != make_key(make_namespace("gitee", "m1", 1024), "https://a.png")
+
+
+def test_evicts_least_recently_used_vectors(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=100, memory_items=0)
+    vector = [0.1] * 10  # 40 字节
+    cache.put_many(["a", "b"], [vector, vector])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [vector])
+
+    assert cache.get_many(["a", "b", "c"])[1] is None
+    assert cache.get_stats()["evictions"] == 1
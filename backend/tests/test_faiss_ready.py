@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Tests for event-driven FAISS index readiness."""
+
+import asyncio
+
+from backend.api.core.faiss_ready import PENDING, READY, FaissReadySignal, ready_channel
+
+
+def _counting_probe(results):
+    calls = []
+
+    async def probe():
+        calls.append(1)
+        return results[len(calls) - 1]
+    return probe, calls
+
+
+def test_chapters_share_one_wait_and_in_process_notify(fake_redis):
+    fake = fake_redis
+    signal = FaissReadySignal()
+    probe, calls = _counting_probe([PENDING])
+
+    async def run():
+        waits = [asyncio.create_task(signal.wait(1, "t1", probe, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await signal.notify(1, "t1", "index")
+        results = await asyncio.gather(*waits)
+        # 后续章节直接复用已解析的索引
+        results.append(await signal.wait(1, "t1", probe, timeout=5))
+        return results
+
+    assert asyncio.run(run()) == ["index"] * 4
+    assert calls == [1]
+    assert fake.published == [(ready_channel(1, "t1"), READY)]
+
+
+def test_ready_message_from_other_process_loads_index(fake_redis):
+    fake = fake_redis
+    waiting = FaissReadySignal()
+    probe, calls = _counting_probe([PENDING, "loaded"])
+
+    async def run():
+        task = asyncio.create_task(waiting.wait(1, "t1", probe, timeout=5))
+        await asyncio.sleep(0.01)
+        # 另一个进程的索引任务完成
+        await fake.publish(ready_channel(1, "t1"), READY)
+        return await task
+
+    assert asyncio.run(run()) == "loaded"
+    assert len(calls) == 2
+
+
+def test_timeout_is_per_task_not_per_chapter(fake_redis):
+    signal = FaissReadySignal()
+    probe, calls = _counting_probe([PENDING])
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        first = await signal.wait(1, "t1", probe, timeout=0.05)
+        start = loop.time()
+        second = await signal.wait(1, "t1", probe, timeout=0.05)
+        elapsed = loop.time() - start
+        # 监听协程仍在后台，索引随后就绪时后续章节可以使用
+        await signal.notify(1, "t1", "late-index")
+        third = await signal.wait(1, "t1", probe, timeout=0.05)
+        signal.forget(1, "t1")
+        return first, second, elapsed, third
+
+    first, second, elapsed, third = asyncio.run(run())
+    assert first is None and second is None and elapsed < 0.02
+    assert third == "late-index"
+    assert calls == [1]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Tests for the FAISS on-disk format and byte-bounded index cache."""
+
+import pickle
+
+import faiss
+import numpy as np
+import pytest
+
+from utils.faiss_store import (
+    FaissLRUCache, load_legacy_metadata, load_metadata, read_index, write_index, write_metadata,
+)
+
+
+def test_metadata_sidecar_reads_rows_lazily(tmp_path):
+    path = str(tmp_path / "index_meta.bin")
+    items = [{"image_url": f"https://img.example.com/{i}.png", "type": "image", "描述": "中文"} for i in range(5)]
+
+    write_metadata(path, items)
+    view = load_metadata(path)
+
+    assert len(view) == 5
+    assert view[3] == items[3] and view[-1] == items[4]
+    assert view[1:3] == items[1:3]
+    assert list(view) == items
+
+
+def test_image_metadata_is_stored_as_columns(tmp_path):
+    path = str(tmp_path / "index_meta.bin")
+    items = [{"image_url": f"https://img.example.com/{i}.png", "task_id": "t1", "type": "image"} for i in range(100)]
+    items.append({"image_url": "https://img.example.com/x.png", "task_id": "t1", "score": 0.5})
+    items.append("纯文本条目")
+
+    size = write_metadata(path, items)
+    view = load_metadata(path)
+
+    assert list(view) == items
+    assert view.column_names == ["image_url", "task_id", "type"]
+    assert view.column("image_url", [0, 100]) == ["https://img.example.com/0.png", "https://img.example.com/x.png"]
+    assert view.column("type", [99, 100, 101]) == ["image", None, None]
+    # task_id / type 按字典编码，文件比逐行 JSON 小
+    assert size < sum(len(str(item)) for item in items)
+
+
+class _Payload:
+    def __reduce__(self):
+        return (print, ("executed",))
+
+
+def test_legacy_pickle_loads_plain_data_but_rejects_objects(tmp_path):
+    path = tmp_path / "index_data.pkl"
+    data = [{"image_url": "https://img.example.com/0.png", "task_id": "t1", "type": "image"}]
+    path.write_bytes(pickle.dumps({"data": data}))
+    assert load_legacy_metadata(str(path)) == data
+
+    path.write_bytes(pickle.dumps({"data": [_Payload()]}))
+    with pytest.raises(pickle.UnpicklingError):
+        load_legacy_metadata(str(path))
+
+
+def test_mmapped_index_survives_atomic_rewrite(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    vectors = np.random.rand(50, 8).astype("float32")
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(8)
+    index.add(vectors)
+    write_index(index, path)
+
+    mapped, is_mmapped = read_index(path)
+    assert is_mmapped and mapped.ntotal == 50
+
+    # 重写文件不影响已映射的旧版本
+    index.add(vectors[:10])
+    write_index(index, path)
+    _, ids = mapped.search(vectors[:1], 1)
+    assert mapped.ntotal == 50 and ids[0][0] == 0
+    assert read_index(path, mmap_enabled=False)[0].ntotal == 60
+
+
+class _Sized:
+    def __init__(self, size):
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+
+def test_lru_cache_evicts_by_bytes():
+    cache = FaissLRUCache(max_bytes=250, max_entries=10)
+    cache["a"] = _Sized(100)
+    cache["b"] = _Sized(100)
+    assert cache["a"].size == 100  # a 变为最近使用
+
+    cache["c"] = _Sized(100)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.evictions == 1
+
+    # 单个超大条目仍然保留
+    cache["huge"] = _Sized(1000)
+    assert list(cache) == ["huge"]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests for the static-vs-browser fetch heuristics."""
+
+import utils.fetch_strategy as fetch_strategy
+from utils.fetch_strategy import DomainFetchLearner, needs_javascript
+
+
+def test_article_page_does_not_need_javascript():
+    text = "这是一篇新闻正文。" * 100
+    html = f"<html><body><article><p>{text}</p></article></body></html>"
+
+    assert needs_javascript(html, text) == (False, "")
+
+
+def test_empty_spa_shell_needs_javascript():
+    html = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+
+    assert needs_javascript(html, "") == (True, "spa_marker")
+
+
+def test_low_text_ratio_needs_javascript():
+    text = "x" * 600
+    html = "<html>" + "<script>var a=1;</script>" * 2000 + f"<p>{text}</p></html>"
+
+    requires_js, reason = needs_javascript(html, text)
+
+    assert requires_js
+    assert reason.startswith("low_text_ratio")
+
+
+def test_domain_learner_prefers_browser_after_failures(monkeypatch):
+    monkeypatch.setattr(fetch_strategy, "DOMAIN_REPROBE_INTERVAL", 3)
+    learner = DomainFetchLearner()
+    url = "https://www.spa.example.com/post/1"
+
+    assert learner.should_try_static(url)
+    learner.record(url, False)
+    learner.record("https://spa.example.com/post/2", False)
+
+    decisions = [learner.should_try_static(url) for _ in range(3)]
+    assert decisions == [False, False, True]
+
+    learner.record(url, True)
+    assert learner.should_try_static(url)
+    assert learner.get_stats()["spa.example.com"]["static_ok"] == 1
+
+
+def test_readiness_profile_matches_parent_domain():
+    profile = fetch_strategy.get_readiness_profile("https://zhuanlan.zhihu.com/p/123")
+
+    assert profile.wait_networkidle
+    assert fetch_strategy.get_readiness_profile("https://www.example.org/a") is fetch_strategy.DEFAULT_READINESS
+
+
+def test_scrape_timings_aggregate_phases():
+    timings = fetch_strategy.ScrapeTimings()
+    timings.record({"goto": 1.0, "settle": 0.5})
+    timings.record({"goto": 3.0})
+
+    stats = timings.get_stats()
+
+    assert stats["goto"] == {"count": 2, "total": 4.0, "avg": 2.0, "max": 3.0}
+    assert stats["settle"]["count"] == 1
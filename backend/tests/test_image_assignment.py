@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Tests for global chapter image assignment."""
+
+from utils.image_assignment import assign_images
+
+
+def test_best_image_goes_to_most_similar_chapter():
+    candidates = [
+        [("a", 0.6), ("b", 0.5)],
+        [("a", 0.9), ("c", 0.4)],
+    ]
+
+    assigned = assign_images(candidates, max_per_chapter=1)
+
+    # 串行贪心会让第 1 章先占用 a；全局分配把 a 给更相关的第 2 章
+    assert assigned == [[("b", 0.5)], [("a", 0.9)]]
+
+
+def test_cap_exclude_and_threshold():
+    candidates = [
+        [("a", 0.9), ("b", 0.8), ("c", 0.7), ("d", 0.1)],
+        [("e", 0.95), ("a", 0.85)],
+    ]
+
+    assigned = assign_images(candidates, max_per_chapter=2, threshold=0.2, exclude={"e"})
+
+    assert assigned == [[("a", 0.9), ("b", 0.8)], []]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Tests for the content-addressed image blob store."""
+
+import os
+
+from utils.image_blob_store import ImageBlobStore
+
+
+def test_roundtrip_and_content_dedup(tmp_path):
+    store = ImageBlobStore(directory=str(tmp_path))
+    payload = b"\x89PNG" + b"x" * 1000
+
+    digest_a = store.put("https://cdn-a.example.com/1.png", payload, "image/png")
+    digest_b = store.put("https://cdn-b.example.com/mirror.png", payload, "image/png")
+
+    assert digest_a == digest_b
+    assert store.get("https://cdn-b.example.com/mirror.png") == (payload, "image/png")
+    assert store.get("https://cdn-a.example.com/missing.png") is None
+    blob_files = [name for _, _, files in os.walk(tmp_path) for name in files if name == digest_a]
+    assert len(blob_files) == 1
+    stats = store.get_stats()
+    assert stats["stores"] == 1 and stats["dedup_stores"] == 1
+    assert stats["bytes_saved"] == len(payload)
+
+
+def test_lru_eviction_removes_least_recently_used(tmp_path):
+    store = ImageBlobStore(directory=str(tmp_path), max_bytes=2500)
+
+    store.put("https://example.com/1.jpg", b"1" * 1000)
+    store.put("https://example.com/2.jpg", b"2" * 1000)
+    store.get("https://example.com/1.jpg")
+    store.put("https://example.com/3.jpg", b"3" * 1000)
+
+    assert store.get("https://example.com/1.jpg") is not None
+    assert store.get("https://example.com/2.jpg") is None
+    assert store.get("https://example.com/3.jpg") is not None
+    assert store.get_stats()["evictions"] == 1
+
+
+def test_expired_url_mapping_is_a_miss(tmp_path):
+    store = ImageBlobStore(directory=str(tmp_path), max_age=-1)
+    store.put("https://example.com/1.jpg", b"1" * 100)
+
+    assert store.get("https://example.com/1.jpg") is None
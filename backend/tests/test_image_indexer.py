@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Tests for the concurrent adaptive-batch embedding scheduler."""
+
+import asyncio
+import threading
+import time
+
+from backend.api.workers.image_indexer import AdaptiveBatchSize, EmbeddingScheduler
+
+
+def test_batches_run_concurrently_and_failures_retry_per_item():
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "calls": []}
+
+    def embed(urls):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["calls"].append(len(urls))
+        time.sleep(0.02)
+        with lock:
+            state["active"] -= 1
+        # 包含坏图的批次整体失败，单张重试时只有坏图本身失败
+        if any("bad" in url for url in urls):
+            raise RuntimeError("provider error")
+        return [[float(url.rsplit("/", 1)[1])] for url in urls]
+
+    urls = [f"https://img.example.com/{i}" for i in range(40)]
+    urls[7] = "https://img.example.com/bad"
+    scheduler = EmbeddingScheduler(embed=embed, max_inflight=4,
+                                   batch_size=AdaptiveBatchSize(initial=10, maximum=10))
+
+    results = asyncio.run(scheduler.run(urls))
+
+    assert state["peak"] == 4
+    assert results[7] is None
+    assert results[:7] + results[8:] == [[float(i)] for i in range(40) if i != 7]
+    # 失败批次的 10 张各单张重试一次，坏图不再继续拆分
+    assert scheduler.stats["failed_batches"] == 2
+    assert scheduler.stats["retried_items"] == 10
+    assert state["calls"].count(1) == 10
+
+
+def test_batch_size_adapts_to_latency_and_errors():
+    sizer = AdaptiveBatchSize(initial=10, minimum=1, maximum=16, target_latency=5)
+    sizer.on_success(10, latency=1)
+    assert sizer.size == 12
+    sizer.on_success(3, latency=1)  # 非满批次不增加
+    assert sizer.size == 12
+    sizer.on_success(12, latency=9)
+    assert sizer.size == 6
+    for _ in range(5):
+        sizer.on_failure()
+    assert sizer.size == 1
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Tests for header-only image dimension probing."""
+
+import asyncio
+import struct
+from io import BytesIO
+
+from PIL import Image
+
+import utils.image_probe as image_probe
+from utils.image_filter import is_low_quality_image, parse_image_header
+
+
+def _encode(fmt, size, **kwargs):
+    buffer = BytesIO()
+    Image.new("RGB", size, (120, 30, 200)).save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def test_parse_header_for_common_formats():
+    assert parse_image_header(_encode("PNG", (640, 360))) == ("PNG", 640, 360)
+    assert parse_image_header(_encode("GIF", (320, 240))) == ("GIF", 320, 240)
+    assert parse_image_header(_encode("WEBP", (800, 600))) == ("WEBP", 800, 600)
+    assert parse_image_header(_encode("WEBP", (801, 601), lossless=True)) == ("WEBP", 801, 601)
+    assert parse_image_header(_encode("BMP", (64, 32))) == ("BMP", 64, 32)
+
+
+def test_parse_jpeg_header_after_app_segments():
+    jpeg = _encode("JPEG", (1024, 768))
+    # 在 SOI 后插入一个较大的 APP1 段，模拟 EXIF
+    app1 = b"\xff\xe1" + struct.pack(">H", 5002) + b"\x00" * 5000
+    data = jpeg[:2] + app1 + jpeg[2:]
+
+    assert parse_image_header(data) == ("JPEG", 1024, 768)
+    assert parse_image_header(data[:1000]) is None
+
+
+def test_small_icon_rejected_from_header_without_decoding(monkeypatch):
+    data = _encode("PNG", (64, 64))
+
+    import utils.image_filter as image_filter
+    monkeypatch.setattr(image_filter, "Image", None)
+    is_filtered, reason, info = is_low_quality_image(data + b"\x00" * 4096, check_url=False)
+
+    assert is_filtered
+    assert reason.startswith("dimensions:")
+    assert info["width"] == 64
+
+
+class _FakeContent:
+    def __init__(self, data, reads):
+        self.data = data
+        self.reads = reads
+
+    async def iter_chunked(self, size):
+        for offset in range(0, len(self.data), size):
+            self.reads.append(size)
+            yield self.data[offset:offset + size]
+
+
+class _FakeResponse:
+    def __init__(self, data, reads, status=200, content_type="image/jpeg"):
+        self.status = status
+        self.headers = {"Content-Type": content_type}
+        self.content = _FakeContent(data, reads)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.reads = []
+        self.range_headers = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.range_headers.append(headers.get("Range"))
+        data, status, content_type = self.responses[url]
+        return _FakeResponse(data, self.reads, status, content_type)
+
+
+def test_batch_filter_aborts_stream_early(monkeypatch):
+    async def _no_blob(url):
+        return None
+
+    monkeypatch.setattr(image_probe.image_blob_store, "aget", _no_blob)
+    big = _encode("JPEG", (1200, 800)) + b"\x00" * 500_000
+    session = _FakeSession({
+        "https://example.com/photo.jpg": (big, 200, "image/jpeg"),
+        "https://example.com/thumb.png": (_encode("PNG", (48, 48)), 200, "image/png"),
+        "https://example.com/page.jpg": (b"<html></html>", 200, "text/html"),
+    })
+
+    valid, filtered = asyncio.run(image_probe.filter_images_by_header(list(session.responses), session=session))
+
+    assert valid == ["https://example.com/photo.jpg"]
+    assert {url for url, _ in filtered} == {"https://example.com/thumb.png", "https://example.com/page.jpg"}
+    assert session.range_headers[0].startswith("bytes=0-")
+    # 只读取了头部附近的数据块，而不是 500KB 全量
+    assert sum(session.reads) <= 4096 * 2
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Tests for the BM25 lexical prefilter in front of the LLM relevance filter."""
+
+from utils.lexical_rank import lexical_prefilter, score_search_results, tokenize
+
+
+def _result(title, content):
+    return {"title": title, "url": f"https://example.com/{title}", "content": content, "score": 1.0}
+
+
+def test_tokenize_handles_mixed_chinese_and_english():
+    tokens = tokenize("GLM4.7 大模型发布了")
+
+    assert "glm4.7" in tokens
+    assert "的" not in tokens
+    assert any("模型" in token for token in tokens)
+
+
+def test_scores_are_normalized_to_top_result():
+    results = [
+        _result("GLM4.7 大模型发布", "智谱发布 GLM4.7 大模型，性能全面提升"),
+        _result("今日天气预报", "明天多云转晴"),
+    ]
+
+    scores = score_search_results(results, "GLM4.7 大模型")
+
+    assert scores[0] == 1.0
+    assert scores[1] == 0.0
+
+
+def test_prefilter_splits_into_bands_and_keeps_minimum():
+    results = [
+        _result("GLM4.7 大模型发布", "智谱发布 GLM4.7 大模型"),
+        _result("大模型行业观察", "各家厂商的新模型"),
+        _result("今日天气预报", "明天多云转晴"),
+        _result("股市收评", "沪指小幅上涨"),
+    ]
+
+    confident, ambiguous, junk = lexical_prefilter(results, "GLM4.7 大模型", min_keep=3)
+
+    assert confident == [results[0]]
+    assert results[1] in ambiguous
+    # 保底补入一条低分结果交给 LLM 审核，其余直接丢弃
+    assert len(ambiguous) == 2
+    assert len(junk) == 1
+    assert all("lexical_score" in item for item in results)
+
+
+def test_prefilter_without_overlap_sends_everything_to_llm():
+    results = [_result("天气", "多云"), _result("股市", "上涨")]
+
+    confident, ambiguous, junk = lexical_prefilter(results, "GLM4.7")
+
+    assert confident == [] and junk == []
+    assert len(ambiguous) == 2
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Tests for the process-wide LLM provider registry."""
+
+from backend.api.services.tier_service import TierService
+from utils.llm_provider_registry import LLMProviderRegistry
+
+
+def _fake_credentials(calls):
+    def fake_get_provider_credentials(provider_id):
+        calls.append(provider_id)
+        return {
+            "provider_id": provider_id,
+            "base_url": f"https://{provider_id}.example.com/v1",
+            "api_key": f"sk-{provider_id}",
+            "models": ["m1"],
+        }
+    return fake_get_provider_credentials
+
+
+def test_credentials_and_client_are_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(TierService, "get_provider_credentials", _fake_credentials(calls))
+    registry = LLMProviderRegistry(ttl=60)
+
+    first = registry.get_client("deepseek")
+    second = registry.get_client("deepseek")
+
+    assert first is second
+    assert calls == ["deepseek"]
+    stats = registry.get_stats()
+    assert stats["credential_hits"] == 1
+    assert stats["client_hits"] == 1
+    assert stats["client_misses"] == 1
+
+
+def test_invalidate_reloads_credentials_and_client(monkeypatch):
+    calls = []
+    monkeypatch.setattr(TierService, "get_provider_credentials", _fake_credentials(calls))
+    registry = LLMProviderRegistry(ttl=60)
+
+    first = registry.get_client("deepseek")
+    registry.invalidate("deepseek")
+    second = registry.get_client("deepseek")
+
+    assert first is not second
+    assert calls == ["deepseek", "deepseek"]
+
+
+def test_expired_credentials_are_reloaded(monkeypatch):
+    calls = []
+    monkeypatch.setattr(TierService, "get_provider_credentials", _fake_credentials(calls))
+    registry = LLMProviderRegistry(ttl=0)
+
+    registry.get_credentials("openai")
+    registry.get_credentials("openai")
+
+    assert calls == ["openai", "openai"]
+
+
+def test_missing_provider_is_not_cached(monkeypatch):
+    monkeypatch.setattr(TierService, "get_provider_credentials", lambda provider_id: None)
+    registry = LLMProviderRegistry(ttl=60)
+
+    assert registry.get_credentials("unknown") is None
+    assert registry.get_stats()["cached_providers"] == 0
+
+
+def test_achat_limits_concurrency_per_provider(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+
+    import utils.llm_chat as llm_chat
+
+    state = {"active": 0, "peak": 0}
+
+    async def fake_create(**kwargs):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        message = SimpleNamespace(content="ok")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create)))
+
+    async def fake_aget_async_client(provider):
+        return client
+
+    monkeypatch.setattr(llm_chat.provider_registry, "aget_async_client", fake_aget_async_client)
+    monkeypatch.setitem(llm_chat.PROVIDER_CONCURRENCY_CONFIG, "test-provider", 2)
+
+    async def run():
+        return await asyncio.gather(*[
+            llm_chat.achat("p", "s", model_type="test-provider", model_name="m")
+            for _ in range(6)
+        ])
+
+    assert asyncio.run(run()) == ["ok"] * 6
+    assert state["peak"] == 2
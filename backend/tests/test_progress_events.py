@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Tests for push-based article progress events."""
+
+import asyncio
+import json
+
+from backend.api.core import progress_events
+from backend.api.core.progress_events import ProgressEventPublisher, stream_progress_events
+from backend.api.core.redis_client import redis_client
+
+
+def test_chapter_appends_are_sequenced_and_snapshot_joins_segments(monkeypatch, fake_redis):
+    fake = fake_redis
+    monkeypatch.setattr(progress_events, "progress_publisher", ProgressEventPublisher())
+
+    async def run():
+        await redis_client.set_article_progress("t1", {"status": "running", "progress_percent": 40})
+        await redis_client.append_article_progress("t1", "# 标题\n\n第一章", {"progress_percent": 50})
+        await redis_client.append_article_progress("t1", "\n\n第二章", {"current_step": "章节 2/2 完成"})
+        return await progress_events.load_snapshot("t1")
+
+    cursor, snapshot = asyncio.run(run())
+
+    events = [json.loads(fields["event"]) for _, fields in fake.streams["article:events:t1"]]
+    assert events[1]["data"]["article_append"] == {"seq": 1, "text": "# 标题\n\n第一章"}
+    assert events[2]["data"]["article_append"] == {"seq": 2, "text": "\n\n第二章"}
+    # 缺失的进度字段沿用上一次的值，进度哈希不保存整篇文章
+    assert events[2]["status"] == "running" and events[2]["progress_percent"] == 50
+    assert "content" not in fake.hashes["article:progress:t1"]
+    assert cursor == fake.streams["article:events:t1"][-1][0]
+    assert snapshot["data"]["live_article"] == "# 标题\n\n第一章\n\n第二章"
+    assert snapshot["data"]["article_seq"] == 2
+
+
+def test_stream_starts_with_snapshot_then_forwards_and_resumes(fake_redis):
+    fake = fake_redis
+    publisher = ProgressEventPublisher()
+
+    async def run():
+        fake.hashes["article:progress:t2"] = {"status": "running", "progress_percent": "40", "content": "第一章"}
+        await publisher.publish("t2", {"status": "running", "progress_percent": 40, "content": "第一章"})
+
+        received = []
+        stream = stream_progress_events("t2", heartbeat_interval=0.05)
+        snapshot_id, snapshot = await stream.__anext__()
+        received.append(snapshot)
+
+        last_id = await publisher.publish("t2", {"progress_percent": 70, "article_append": {"seq": 2, "text": "第二章"}})
+        event_id, event = await stream.__anext__()
+        received.append(event)
+        await stream.aclose()
+
+        # 断线后从快照 ID 续传：补发错过的事件，随后收到完成事件
+        resumed = stream_progress_events("t2", last_event_id=snapshot_id, heartbeat_interval=0.05)
+        replayed_id, replayed = await resumed.__anext__()
+        await publisher.publish("t2", {"status": "completed", "progress_percent": 100})
+        rest = [item async for item in resumed]
+        return received, event_id, last_id, replayed_id, replayed, rest
+
+    received, event_id, last_id, replayed_id, replayed, rest = asyncio.run(run())
+
+    assert received[0]["data"]["live_article"] == "第一章"
+    assert received[1]["data"]["article_append"] == {"seq": 2, "text": "第二章"}
+    assert event_id == last_id == replayed_id
+    assert replayed["progress_percent"] == 70
+    assert [event["status"] for _, event in rest if event] == ["completed"]
+
+
+def test_publisher_seeds_state_from_progress_hash(fake_redis):
+    async def run():
+        fake_redis.hashes["article:progress:t4"] = {"status": "running", "progress": "60", "step": "撰写中"}
+        # 另一个进程（或状态被淘汰后）发布的第一条不带 status 的更新
+        seeded = ProgressEventPublisher()
+        await seeded.publish("t4", {"step": "索引完成"})
+        await ProgressEventPublisher().publish("t5", {"progress": 10})
+        return [json.loads(fields["event"]) for name in ("article:events:t4", "article:events:t5")
+                for _, fields in fake_redis.streams[name]]
+
+    seeded_event, unknown_event = asyncio.run(run())
+
+    assert seeded_event["status"] == "running"
+    assert seeded_event["progress_percent"] == 60
+    assert seeded_event["current_step"] == "索引完成"
+    # 哈希中也没有状态时不假定为 queued
+    assert "status" not in unknown_event
+
+
+def test_task_subscription_requires_owner(monkeypatch, fake_redis):
+    from backend.api.core.websocket import ConnectionManager
+
+    manager = ConnectionManager()
+    sent = []
+
+    async def fake_send(user_id, data):
+        sent.append((user_id, data["type"]))
+        return True
+
+    monkeypatch.setattr(manager, "send_message", fake_send)
+    monkeypatch.setattr(manager, "_ensure_progress_relay", lambda: None)
+
+    async def run():
+        await redis_client.set_article_progress("t3", {"status": "running"}, user_id=7)
+        return [
+            await manager.subscribe_task_progress("8", "t3"),
+            await manager.subscribe_task_progress("8", "missing"),
+            await manager.subscribe_task_progress("7", "t3"),
+        ]
+
+    results = asyncio.run(run())
+
+    assert results == [False, False, True]
+    assert sent == [("8", "error"), ("8", "error"), ("7", "article_progress_event")]
+    assert manager.rooms == {"task:t3": {"7"}}
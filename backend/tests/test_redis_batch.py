@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Tests for pipelined Redis batch operations."""
+
+import asyncio
+
+from backend.api.core.redis_client import redis_client
+from backend.api.workers.image_store import RedisImageStore
+from backend.api.workers.progress import ProgressTracker
+
+
+def test_image_store_adds_urls_in_constant_round_trips(fake_redis):
+    fake = fake_redis
+    store = RedisImageStore()
+    urls = [f"https://img.example.com/{i}.png" for i in range(50)] + [" ", "https://img.example.com/0.png"]
+
+    added = asyncio.run(store.add_images(1, "t1", urls))
+
+    assert added == 50
+    # SADD+EXPIRE+SCARD 一次事务，元数据 HSET+EXPIRE 一次事务
+    assert fake.round_trips == 2
+    assert fake.hashes["faiss:images:meta:1:t1"]["total_count"] == "50"
+
+
+def test_user_listing_reads_queue_not_keyspace(fake_redis):
+    fake = fake_redis
+
+    async def run():
+        for i in range(6):
+            await ProgressTracker(f"task-{i}").init(user_id=i % 3 + 1, topic=f"topic {i}")
+            await redis_client.add_to_user_queue(i % 3 + 1, f"task-{i}", score=i)
+        await ProgressTracker("task-0", user_id=1).update(40, "撰写中", status="running")
+        await redis_client.set_article_progress("task-9", {"status": "queued"}, user_id=1)
+        await redis_client.add_to_user_queue(1, "task-9", score=9)
+        # 进度已过期的任务从队列中移除
+        fake.zsets["user:queue:1"]["task-gone"] = 10
+        trips = fake.round_trips
+        tasks = await redis_client.get_all_article_progress(user_id=1)
+        return fake.round_trips - trips, tasks
+
+    trips, tasks = asyncio.run(run())
+
+    # 进度写入不再维护第二套用户任务索引
+    assert set(fake.zsets) == {"user:queue:1", "user:queue:2", "user:queue:3"}
+    # ZREVRANGE 一次 + 所有 HGETALL 一次 + 清理过期成员一次，不 SCAN 全部进度键
+    assert trips == 3
+    assert [task["task_id"] for task in tasks] == ["task-9", "task-3", "task-0"]
+    assert tasks[2]["status"] == "running"
+    assert "task-gone" not in fake.zsets["user:queue:1"]
+    assert fake.hashes["article:progress:task-9"]["user_id"] == "1"
+
+
+def test_tracker_only_task_is_listed_per_user(fake_redis):
+    async def run():
+        # batch / agent 任务直接进入 worker，不经过 add_to_user_queue
+        await ProgressTracker("batch-1").init(user_id=5, topic="批量任务")
+        await ProgressTracker("batch-1", user_id=5).update(30, "搜索中", status="running")
+        return await redis_client.get_all_article_progress(user_id=5)
+
+    tasks = asyncio.run(run())
+
+    assert [(task["task_id"], task["status"]) for task in tasks] == [("batch-1", "running")]
+    assert "batch-1" in fake_redis.zsets["user:queue:5"]
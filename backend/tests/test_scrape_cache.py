@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Tests for the persistent scrape cache."""
+
+import asyncio
+import time
+
+from utils.scrape_cache import ScrapeCache
+
+
+class _FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    def __init__(self, status):
+        self.status = status
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(headers)
+        return _FakeResponse(self.status)
+
+
+def _result(text):
+    return {"url": "https://example.com/a", "text": text, "images": ["https://example.com/1.jpg"]}
+
+
+def test_fresh_entry_is_served_by_normalized_url(tmp_path):
+    cache = ScrapeCache(path=str(tmp_path / "cache.sqlite3"))
+    session = _FakeSession(200)
+
+    async def run():
+        await cache.store("https://Example.com/a/?utm_source=x", _result("hello"))
+        return await cache.lookup("https://example.com/a", session)
+
+    cached = asyncio.run(run())
+
+    assert cached["text"] == "hello"
+    assert cached["from_cache"] is True
+    assert session.requests == []
+    assert cache.get_stats()["hit_rate"] == 1.0
+
+
+def test_stale_entry_revalidates_with_validators(tmp_path):
+    cache = ScrapeCache(path=str(tmp_path / "cache.sqlite3"), fresh_ttl=0)
+    not_modified = _FakeSession(304)
+    modified = _FakeSession(200)
+
+    async def run():
+        await cache.store("https://example.com/a", _result("hello"), {"ETag": '"v1"'})
+        time.sleep(0.01)
+        first = await cache.lookup("https://example.com/a", not_modified)
+        time.sleep(0.01)
+        second = await cache.lookup("https://example.com/a", modified)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first["text"] == "hello"
+    assert not_modified.requests[0]["If-None-Match"] == '"v1"'
+    assert second is None
+    assert cache.get_stats()["revalidated"] == 1
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ScrapeCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=500)
+
+    cache.put("https://example.com/1", _result("a" * 100))
+    cache.put("https://example.com/2", _result("b" * 100))
+    cache.touch(cache.get_entry("https://example.com/1")["key"])
+    cache.put("https://example.com/3", _result("c" * 100))
+
+    assert cache.get_entry("https://example.com/1") is not None
+    assert cache.get_entry("https://example.com/2") is None
+    assert cache.get_entry("https://example.com/3") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_failed_results_are_not_stored(tmp_path):
+    cache = ScrapeCache(path=str(tmp_path / "cache.sqlite3"))
+
+    asyncio.run(cache.store("https://example.com/a", {"url": "https://example.com/a", "text": "", "error": "timeout"}))
+
+    assert cache.get_entry("https://example.com/a") is None
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Tests for concurrent multi-engine search with per-engine deadlines."""
+
+import time
+
+import utils.search_engines as search_engines
+from utils.search_engines import SearchEngine, SearchEngineMetrics, run_engines
+
+
+class _FakeEngine(SearchEngine):
+    def __init__(self, name, delay, results=None, deadline=5.0, error=None):
+        self.name = name
+        super().__init__(deadline)
+        self.delay = delay
+        self.results = results or []
+        self.error = error
+
+    def search(self, query, max_results):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return list(self.results)
+
+
+def _items(source, count):
+    return [{"title": f"{source}{i}", "url": f"https://{source}.example.com/{i}", "source": source} for i in range(count)]
+
+
+def test_slow_engine_is_abandoned_at_its_deadline(monkeypatch):
+    monkeypatch.setattr(search_engines, "search_metrics", SearchEngineMetrics())
+    merged = []
+    engines = [
+        _FakeEngine("fast", 0.01, _items("fast", 3)),
+        _FakeEngine("slow", 2.0, _items("slow", 3), deadline=0.2),
+    ]
+
+    start = time.monotonic()
+    counts = run_engines(engines, "q", 10, lambda name, results: merged.append(name), enough_results=100)
+    elapsed = time.monotonic() - start
+
+    assert counts == {"fast": 3, "slow": 0}
+    assert merged == ["fast"]
+    assert elapsed < 1.0
+    assert search_engines.search_metrics.get_stats()["slow"]["timeouts"] == 1
+
+
+def test_grace_period_cuts_off_stragglers_once_enough_results(monkeypatch):
+    monkeypatch.setattr(search_engines, "search_metrics", SearchEngineMetrics())
+    engines = [
+        _FakeEngine("fast", 0.01, _items("fast", 20)),
+        _FakeEngine("slow", 2.0, _items("slow", 5)),
+    ]
+
+    start = time.monotonic()
+    counts = run_engines(engines, "q", 10, lambda name, results: None, enough_results=20, grace_period=0.1)
+
+    assert counts["fast"] == 20
+    assert time.monotonic() - start < 1.0
+
+
+def test_errors_and_histograms_are_recorded(monkeypatch):
+    metrics = SearchEngineMetrics()
+    monkeypatch.setattr(search_engines, "search_metrics", metrics)
+    engines = [
+        _FakeEngine("ok", 0.0, _items("ok", 7)),
+        _FakeEngine("broken", 0.0, error=RuntimeError("boom")),
+    ]
+
+    counts = run_engines(engines, "q", 10, lambda name, results: None)
+
+    stats = metrics.get_stats()
+    assert counts == {"ok": 7, "broken": 0}
+    assert stats["broken"]["errors"] == 1
+    assert stats["ok"]["results"]["buckets"]["<=10"] == 1
+    assert stats["ok"]["latency"]["count"] == 1
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Tests for the per-task source digest."""
+
+import asyncio
+
+import backend.api.workers.source_digest as source_digest
+from backend.api.workers.source_digest import SourceDigest, split_into_chunks
+
+_VOCAB = ["python", "rust", "redis"]
+
+
+async def _fake_embed_texts(texts):
+    return [[1.0 + text.lower().count(word) * 10 for word in _VOCAB] for text in texts]
+
+
+def test_split_into_chunks_respects_size_and_overlap():
+    text = "a" * 25 + "\nshort\nparagraph"
+    chunks = split_into_chunks(text, chunk_size=10, overlap=2)
+
+    assert chunks == ["a" * 10, "a" * 10, "a" * 9, "short", "paragraph"]
+
+
+def test_select_returns_relevant_sources_grouped(monkeypatch):
+    monkeypatch.setattr(source_digest, "_embed_texts", _fake_embed_texts)
+    search_results = [
+        {"title": "Py", "url": "https://a", "html_content": "python python python"},
+        {"title": "Rs", "url": "https://b", "html_content": "rust rust rust"},
+        {"title": "Rd", "url": "https://c", "html_content": "redis redis redis"},
+    ]
+
+    async def run():
+        digest = await SourceDigest.build(search_results)
+        return digest, await digest.select({"h1": "rust", "h2": ["rust"]}, top_k=1)
+
+    digest, selected = asyncio.run(run())
+
+    assert digest.available
+    assert selected == [{"title": "Rs", "url": "https://b", "html_content": "rust rust rust"}]
+
+
+def test_unavailable_digest_returns_none(monkeypatch):
+    async def failing_embed(texts):
+        return []
+
+    monkeypatch.setattr(source_digest, "_embed_texts", failing_embed)
+
+    async def run():
+        digest = await SourceDigest.build([{"title": "t", "url": "u", "html_content": "text"}])
+        return digest, await digest.select({"h1": "x"})
+
+    digest, selected = asyncio.run(run())
+
+    assert not digest.available
+    assert selected is None
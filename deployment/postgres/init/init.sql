@@ -134,6 +134,7 @@ CREATE INDEX IF NOT EXISTS idx_articles_topic ON articles(topic);
 CREATE INDEX IF NOT EXISTS idx_articles_model_type ON articles(model_type);
 CREATE INDEX IF NOT EXISTS idx_articles_status ON articles(status);
 CREATE INDEX IF NOT EXISTS idx_articles_title ON articles(title);
+CREATE INDEX IF NOT EXISTS idx_articles_user_created_id ON articles(user_id, created_at DESC, id DESC);  -- 文章列表游标分页
 
 -- 全文搜索索引
 CREATE INDEX IF NOT EXISTS idx_articles_fulltext_topic ON articles
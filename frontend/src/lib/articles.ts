@@ -115,6 +115,10 @@ export async function removeFromQueue(taskId: string): Promise<void> {
 }
 
 // Stream article progress via SSE
+// The first event is a snapshot (live_article + article_seq); later events carry
+// deltas, with new chapters arriving as numbered article_append segments. Appends
+// are folded here so callers always receive the full live_article. Dropped
+// connections resume from the last event id.
 export function streamArticleProgress(
   taskId: string,
   onProgress: (event: ArticleProgressEvent) => void,
@@ -122,8 +126,29 @@ export function streamArticleProgress(
   onComplete?: () => void
 ): () => void {
   let abortController: AbortController | null = null;
+  let lastEventId: string | null = null;
+  let liveArticle = '';
+  let articleSeq = 0;
+  let retries = 0;
+  const maxRetries = 3;
+
+  const handleEvent = (event: ArticleProgressEvent) => {
+    if (event.data?.live_article !== undefined) {
+      liveArticle = event.data.live_article;
+      articleSeq = event.data.article_seq ?? articleSeq;
+    } else if (event.data?.article_append) {
+      const { seq, text } = event.data.article_append;
+      // Segments already contained in the snapshot are skipped
+      if (seq > articleSeq) {
+        liveArticle += text;
+        articleSeq = seq;
+      }
+      event.data.live_article = liveArticle;
+    }
+    onProgress(event);
+  };
 
-  const connect = async () => {
+  const connect = async (): Promise<void> => {
     try {
       const token = await getBackendToken();
       if (!token) {
@@ -132,12 +157,16 @@ export function streamArticleProgress(
 
       abortController = new AbortController();
       const url = `${API_URL}/api/v1/articles/generate/stream/${taskId}`;
-      
+      const headers: Record<string, string> = {
+        'Authorization': `Bearer ${token}`,
+      };
+      if (lastEventId) {
+        headers['Last-Event-ID'] = lastEventId;
+      }
+
       const response = await fetch(url, {
         method: 'GET',
-        headers: {
-          'Authorization': `Bearer ${token}`,
-        },
+        headers,
         signal: abortController.signal,
         cache: 'no-store',
       });
@@ -158,6 +187,11 @@ export function streamArticleProgress(
         const { done, value } = await reader.read();
 
         if (done) {
+          // Stream closed without [DONE]: resume from the last event
+          if (retries < maxRetries) {
+            retries += 1;
+            return connect();
+          }
           onComplete?.();
           break;
         }
@@ -168,7 +202,9 @@ export function streamArticleProgress(
         buffer = lines.pop() || '';
 
         for (const line of lines) {
-          if (line.startsWith('data: ')) {
+          if (line.startsWith('id: ')) {
+            lastEventId = line.slice(4).trim();
+          } else if (line.startsWith('data: ')) {
             const data = line.slice(6).trim();
             
             if (data === '[DONE]') {
@@ -179,7 +215,8 @@ export function streamArticleProgress(
             if (data) {
               try {
                 const event = JSON.parse(data) as ArticleProgressEvent;
-                onProgress(event);
+                retries = 0;
+                handleEvent(event);
               } catch (error) {
                 console.error('Failed to parse SSE data:', error);
               }
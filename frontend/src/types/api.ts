@@ -56,6 +56,10 @@ export interface ArticleProgressEvent {
     images?: ImageItem[];
     outline?: ArticleOutline;
     live_article?: string;
+    // Number of segments included in a snapshot's live_article
+    article_seq?: number;
+    // Incremental live_article update: segment number seq to append
+    article_append?: { seq: number; text: string };
     chapter_index?: number;
     chapter_total?: number;
     references?: ReferenceItem[];
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Redis 批量操作微基准
+
+对比逐条命令与 pipeline 批量接口（RedisClient.sadd_many / hset_with_ttl / scan_hgetall）
+的网络往返次数和耗时。需要可连接的 Redis（使用 backend 配置的 REDIS_HOST/PORT/DB）。
+
+用法:
+    python scripts/tools/bench_redis_batch.py --urls 200 --tasks 200 --rounds 5
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import redis.asyncio as aioredis
+
+from backend.api.core.redis_client import redis_client
+
+PREFIX = f"bench:{uuid.uuid4().hex[:8]}"
+
+
+class RoundTripCounter:
+    """统计网络往返：普通命令每条一次，pipeline 每次 execute 一次"""
+
+    def __init__(self):
+        self.count = 0
+        self._patches = []
+
+    def __enter__(self):
+        counter = self
+        original_command = aioredis.Redis.execute_command
+        original_execute = aioredis.client.Pipeline.execute
+
+        async def execute_command(client, *args, **kwargs):
+            counter.count += 1
+            return await original_command(client, *args, **kwargs)
+
+        async def execute(pipe, *args, **kwargs):
+            counter.count += 1
+            return await original_execute(pipe, *args, **kwargs)
+
+        self._patches = [
+            (aioredis.Redis, 'execute_command', original_command),
+            (aioredis.client.Pipeline, 'execute', original_execute),
+        ]
+        aioredis.Redis.execute_command = execute_command
+        aioredis.client.Pipeline.execute = execute
+        return self
+
+    def __exit__(self, *exc):
+        for owner, name, original in self._patches:
+            setattr(owner, name, original)
+        return False
+
+
+async def legacy_add_images(key, urls, ttl=3600):
+    client = redis_client.async_client
+    for url in urls:
+        await client.sadd(key, url)
+    await client.expire(key, ttl)
+    total = await client.scard(key)
+    await client.hset(f"{key}:meta", mapping={"total_count": str(total)})
+    await client.expire(f"{key}:meta", ttl)
+
+
+async def batch_add_images(key, urls, ttl=3600):
+    _, total = await redis_client.sadd_many(key, urls, ttl=ttl)
+    await redis_client.hset_with_ttl(f"{key}:meta", {"total_count": str(total)}, ttl)
+
+
+async def legacy_list_progress(pattern):
+    client = redis_client.async_client
+    results = []
+    async for key in client.scan_iter(match=pattern, count=100):
+        data = await client.hgetall(key)
+        if data:
+            results.append(data)
+    return results
+
+
+async def batch_list_progress(pattern):
+    return await redis_client.scan_hgetall(pattern)
+
+
+async def measure(name, func, rounds):
+    elapsed = []
+    trips = 0
+    for _ in range(rounds):
+        with RoundTripCounter() as counter:
+            start = time.perf_counter()
+            await func()
+            elapsed.append(time.perf_counter() - start)
+        trips = counter.count
+    best = min(elapsed) * 1000
+    print(f"  {name:<10} 往返 {trips:>5} 次  最佳耗时 {best:8.2f} ms")
+
+
+async def main(args):
+    if not await redis_client.async_ping():
+        print("❌ 无法连接 Redis")
+        return 1
+
+    client = redis_client.async_client
+    urls = [f"https://img.example.com/{i}.png" for i in range(args.urls)]
+    progress_pattern = f"{PREFIX}:progress:*"
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for i in range(args.tasks):
+                pipe.hset(f"{PREFIX}:progress:{i}", mapping={"task_id": str(i), "progress": "50"})
+            await pipe.execute()
+
+        print(f"📊 RedisImageStore.add_images（{args.urls} 个 URL）")
+        await measure("逐条", lambda: legacy_add_images(f"{PREFIX}:legacy", urls), args.rounds)
+        await measure("批量", lambda: batch_add_images(f"{PREFIX}:batch", urls), args.rounds)
+
+        print(f"📊 get_all_article_progress（{args.tasks} 个任务）")
+        await measure("逐条", lambda: legacy_list_progress(progress_pattern), args.rounds)
+        await measure("批量", lambda: batch_list_progress(progress_pattern), args.rounds)
+    finally:
+        keys = [key async for key in client.scan_iter(match=f"{PREFIX}:*", count=500)]
+        if keys:
+            await client.delete(*keys)
+        await redis_client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Redis 批量操作微基准")
+    parser.add_argument("--urls", type=int, default=200, help="每次添加的图片 URL 数量")
+    parser.add_argument("--tasks", type=int, default=200, help="进度哈希数量")
+    parser.add_argument("--rounds", type=int, default=5, help="重复次数（取最佳耗时）")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+进程级 Chromium 浏览器池
+
+get_main_content() 过去每次调用都启动并关闭一个 Chromium，且对所有 URL 不限并发。
+本模块在独立线程的事件循环中维护一个长期存活的浏览器：
+
+- 浏览器只启动一次，崩溃或断开后自动重启
+- 同时打开的上下文（页面）数量有上限，峰值内存可预期
+- 上下文使用 N 次后回收，避免长时间运行的内存膨胀
+- 按 host 限制并发，避免同一站点被同时打开过多页面
+- 拦截字体和媒体请求，减少流量（图片需要懒加载后提取，不拦截）
+
+Playwright 对象绑定创建它的事件循环，而调用方（Search.get_search_result）
+每次都通过 asyncio.run() 新建循环，因此页面处理全部提交到池自己的循环中执行。
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+try:
+    from playwright.async_api import async_playwright
+except ModuleNotFoundError:
+    async_playwright = None
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_MAX_CONTEXTS = int(os.getenv('BROWSER_POOL_MAX_CONTEXTS', '6'))
+BROWSER_POOL_CONTEXT_MAX_USES = int(os.getenv('BROWSER_POOL_CONTEXT_MAX_USES', '20'))
+BROWSER_POOL_PER_HOST_LIMIT = int(os.getenv('BROWSER_POOL_PER_HOST_LIMIT', '2'))
+
+# 拦截的资源类型
+DEFAULT_BLOCKED_RESOURCES = {'font', 'media'}
+
+_CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.uses = 0
+
+
+class _HostLimit:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class BrowserPool:
+    """在专用线程事件循环中运行的共享浏览器池"""
+
+    def __init__(self, max_contexts: int = BROWSER_POOL_MAX_CONTEXTS,
+                 context_max_uses: int = BROWSER_POOL_CONTEXT_MAX_USES,
+                 per_host_limit: int = BROWSER_POOL_PER_HOST_LIMIT):
+        self.max_contexts = max_contexts
+        self.context_max_uses = context_max_uses
+        self.per_host_limit = per_host_limit
+
+        self._thread_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+        # 以下对象只在池的事件循环中访问
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle = []
+        # 只保留当前有页面在使用或等待的 host，空闲后删除，长期运行不会无限增长
+        self._host_limits: Dict[str, _HostLimit] = {}
+        self._stats = {
+            'browser_launches': 0,
+            'contexts_created': 0,
+            'contexts_recycled': 0,
+            'pages_served': 0,
+            'blocked_requests': 0,
+        }
+
+    @property
+    def available(self) -> bool:
+        return async_playwright is not None
+
+    # ------------------------------------------------------------------
+    # 事件循环线程
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._thread_lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    self._browser_lock = asyncio.Lock()
+                    self._slots = asyncio.Semaphore(self.max_contexts)
+                    self._host_limits = {}
+                    ready.set()
+                    loop.run_forever()
+
+                thread = threading.Thread(target=_run, name='browser-pool', daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop = loop
+                self._thread = thread
+                logger.info(f"[BrowserPool] Started: max_contexts={self.max_contexts}, "
+                            f"context_max_uses={self.context_max_uses}, per_host_limit={self.per_host_limit}")
+            return self._loop
+
+    # ------------------------------------------------------------------
+    # 以下方法在池的事件循环中执行
+    # ------------------------------------------------------------------
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                logger.warning("[BrowserPool] Browser disconnected, relaunching")
+                self._idle.clear()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(args=['--no-sandbox'])
+            self._stats['browser_launches'] += 1
+            return self._browser
+
+    async def _acquire_context(self) -> _PooledContext:
+        while self._idle:
+            entry = self._idle.pop()
+            if self._browser is not None and self._browser.is_connected():
+                return entry
+        browser = await self._ensure_browser()
+        context = await browser.new_context(**_CONTEXT_OPTIONS)
+        self._stats['contexts_created'] += 1
+        return _PooledContext(context)
+
+    async def _release_context(self, entry: _PooledContext, healthy: bool):
+        entry.uses += 1
+        if healthy and entry.uses < self.context_max_uses and self._browser is not None and self._browser.is_connected():
+            self._idle.append(entry)
+            return
+        self._stats['contexts_recycled'] += 1
+        try:
+            await entry.context.close()
+        except Exception as e:
+            logger.debug(f"[BrowserPool] Error closing context: {e}")
+
+    @asynccontextmanager
+    async def _host_limit(self, url: str):
+        host = (urlparse(url).hostname or '').lower()
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = _HostLimit(self.per_host_limit)
+            self._host_limits[host] = limit
+        limit.users += 1
+        try:
+            async with limit.semaphore:
+                yield
+        finally:
+            limit.users -= 1
+            if not limit.users:
+                del self._host_limits[host]
+
+    async def _with_page(self, url: str, handler: Callable[[Any], Awaitable[Any]], blocked_resources: set):
+        async with self._host_limit(url), self._slots:
+            entry = await self._acquire_context()
+            page = None
+            healthy = True
+            try:
+                page = await entry.context.new_page()
+
+                async def _route(route):
+                    if route.request.resource_type in blocked_resources:
+                        self._stats['blocked_requests'] += 1
+                        await route.abort()
+                    else:
+                        await route.continue_()
+
+                await page.route("**/*", _route)
+                self._stats['pages_served'] += 1
+                return await handler(page)
+            except Exception:
+                healthy = self._browser is not None and self._browser.is_connected()
+                raise
+            finally:
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        healthy = False
+                await self._release_context(entry, healthy)
+
+    async def _shutdown(self):
+        for entry in self._idle:
+            try:
+                await entry.context.close()
+            except Exception:
+                pass
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    # ------------------------------------------------------------------
+    # 公共接口（可在任意事件循环 / 线程中调用）
+    # ------------------------------------------------------------------
+
+    async def run_page(self, url: str, handler: Callable[[Any], Awaitable[Any]]):
+        """
+        从池中取一个页面执行 handler(page)，并返回其结果
+
+        handler 在池的事件循环中执行，其中创建的 aiohttp 会话等异步资源也应在 handler 内部创建。
+
+        Args:
+            url: 目标 URL（用于 host 并发限制）
+            handler: 接收 Playwright Page 的协程函数
+        """
+        if not self.available:
+            raise RuntimeError("playwright is not installed")
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._with_page(url, handler, DEFAULT_BLOCKED_RESOURCES), loop)
+        return await asyncio.wrap_future(future)
+
+    def close(self, timeout: float = 10):
+        """关闭浏览器和事件循环线程"""
+        with self._thread_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"[BrowserPool] Error during shutdown: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        logger.info("[BrowserPool] Closed")
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取池统计"""
+        stats = dict(self._stats)
+        stats['idle_contexts'] = len(self._idle)
+        stats['active_hosts'] = len(self._host_limits)
+        return stats
+
+
+# 全局实例
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
@@ -5,6 +5,8 @@
 """
 
 import os
+import sys
+import asyncio
 import psycopg2
 from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
@@ -85,6 +87,47 @@ def load_env_file():
 # 自动加载环境变量
 load_env_file()
 
+# 事件循环线程中调用同步数据库的处理方式：off（不检查）/ warn（每个调用位置告警一次）/ raise（直接报错）
+DB_LOOP_GUARD = os.getenv('DB_LOOP_GUARD', 'warn').lower()
+_warned_call_sites = set()
+
+
+class BlockingDatabaseCallError(RuntimeError):
+    """在事件循环线程中调用了同步（阻塞）数据库接口"""
+
+
+def _find_call_site() -> str:
+    """定位调用方（跳过本模块和 contextlib 的栈帧）"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename != __file__ and not filename.endswith('contextlib.py'):
+            return f"{filename}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return '<unknown>'
+
+
+def _check_event_loop_thread():
+    """
+    检查是否在运行中的事件循环线程里获取同步数据库连接
+
+    psycopg2 查询会阻塞整个事件循环，FastAPI 路由应使用 backend.api.db.async_db
+    或 asyncio.to_thread 包装。worker 线程（to_thread / 线程池）中调用不受影响。
+    """
+    if DB_LOOP_GUARD == 'off':
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    call_site = _find_call_site()
+    if DB_LOOP_GUARD == 'raise':
+        raise BlockingDatabaseCallError(f"同步数据库调用阻塞了事件循环: {call_site}")
+    if call_site not in _warned_call_sites:
+        _warned_call_sites.add(call_site)
+        logger.warning(f"[DBLoopGuard] 事件循环中的同步数据库调用: {call_site}，请改用 async_db 或 asyncio.to_thread")
+
 
 class Database:
     """数据库连接池管理器"""
@@ -143,6 +186,7 @@ class Database:
     @contextmanager
     def get_connection(cls):
         """获取数据库连接（上下文管理器）"""
+        _check_event_loop_thread()
         pool_obj = cls.get_connection_pool()
         conn = pool_obj.getconn()
 
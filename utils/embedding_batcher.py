@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+抓取阶段的 embedding 微批处理与延迟持久化
+
+原先 download_image 每张图片调用一次 add_to_faiss_index(..., auto_save=True)：
+每张图片一次 embedding API 请求，并且每次都重写整个 index.faiss 和元数据文件，
+磁盘写入量随图片数平方增长。现在：
+
+- 同一个目标索引（username/article_id）的所有并发页面抓取共享一个 EmbeddingBatcher
+- add() 把待嵌入内容放入队列，凑满 EMBED_BATCH_MAX_SIZE 条或等待 EMBED_BATCH_MAX_DELAY 秒后
+  一次调用 Embedding.get_embedding，向量批量写入索引
+- 索引只在累计新增 EMBED_CHECKPOINT_EVERY 条时做检查点保存，抓取结束时
+  close_embedding_batcher() 刷新剩余队列并保存一次
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_MAX_SIZE = int(os.getenv('EMBED_BATCH_MAX_SIZE', '16'))
+EMBED_BATCH_MAX_DELAY = float(os.getenv('EMBED_BATCH_MAX_DELAY', '0.2'))  # 秒
+EMBED_CHECKPOINT_EVERY = int(os.getenv('EMBED_CHECKPOINT_EVERY', '64'))
+
+EmbedFn = Callable[[List[str], bool], List[List[float]]]
+
+
+def _default_embed(texts: List[str], is_image_url: bool) -> List[List[float]]:
+    from utils.embedding_utils import Embedding
+    return Embedding().get_embedding(texts, is_image_url=is_image_url)
+
+
+class EmbeddingBatcher:
+    """
+    单个 FAISS 索引的 embedding 微批处理器（在事件循环线程中使用）
+
+    图片 URL 与文本分开成批（两者的 embedding 请求不同）。embedding 请求和保存在线程池中执行，
+    写入索引与保存由同一把锁串行化，保存时索引不会被修改。
+    """
+
+    def __init__(self, faiss_index: Any, persist: Optional[Callable[[], Any]] = None,
+                 embed: EmbedFn = _default_embed,
+                 max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+                 max_delay: float = EMBED_BATCH_MAX_DELAY,
+                 checkpoint_every: int = EMBED_CHECKPOINT_EVERY):
+        self.faiss_index = faiss_index
+        self._persist = persist
+        self._embed = embed
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+        self.checkpoint_every = checkpoint_every
+        self._pending: Dict[bool, List[Tuple[str, Any, asyncio.Future]]] = {True: [], False: []}
+        self._timers: Dict[bool, Optional[asyncio.TimerHandle]] = {True: None, False: None}
+        self._flushes: set = set()
+        self._lock = asyncio.Lock()
+        self._unsaved = 0
+        self.stats = {'items': 0, 'added': 0, 'batches': 0, 'saves': 0}
+
+    async def add(self, text: str, data: Any, is_image_url: bool = False) -> bool:
+        """加入队列并等待所在批次写入索引，返回是否成功"""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._pending[is_image_url]
+        queue.append((text, data, future))
+        self.stats['items'] += 1
+        if len(queue) >= self.max_batch_size:
+            self._start_flush(is_image_url)
+        elif self._timers[is_image_url] is None:
+            self._timers[is_image_url] = asyncio.get_running_loop().call_later(
+                self.max_delay, self._start_flush, is_image_url
+            )
+        return await future
+
+    def _start_flush(self, is_image_url: bool) -> None:
+        timer = self._timers[is_image_url]
+        if timer is not None:
+            timer.cancel()
+            self._timers[is_image_url] = None
+        batch, self._pending[is_image_url] = self._pending[is_image_url], []
+        if batch:
+            task = asyncio.ensure_future(self._flush(batch, is_image_url))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, Any, asyncio.Future]], is_image_url: bool) -> None:
+        loop = asyncio.get_running_loop()
+        results = [False] * len(batch)
+        try:
+            texts = [text for text, _, _ in batch]
+            vectors = await loop.run_in_executor(None, self._embed, texts, is_image_url)
+            self.stats['batches'] += 1
+            vectors = vectors or []
+            if len(vectors) != len(batch):
+                # 文本 embedding 返回数量不一致时无法对齐，整批视为失败
+                logger.warning(f"[EmbedBatch] Embedding count mismatch: input={len(batch)}, output={len(vectors)}")
+                vectors = []
+            valid = [(i, vector) for i, vector in enumerate(vectors) if vector]
+            if valid:
+                async with self._lock:
+                    self.faiss_index.add_embeddings([vector for _, vector in valid], [batch[i][1] for i, _ in valid])
+                    self._unsaved += len(valid)
+                    self.stats['added'] += len(valid)
+                for i, _ in valid:
+                    results[i] = True
+            logger.info(f"[EmbedBatch] Embedded batch: size={len(batch)}, added={len(valid)}, image={is_image_url}")
+        except Exception as e:
+            logger.error(f"[EmbedBatch] Batch embedding failed: size={len(batch)}, error={e}")
+        finally:
+            for (_, _, future), ok in zip(batch, results):
+                if not future.done():
+                    future.set_result(ok)
+
+        if self.checkpoint_every and self._unsaved >= self.checkpoint_every:
+            await self.save()
+
+    async def save(self) -> bool:
+        """把尚未保存的新增向量写入磁盘"""
+        if self._persist is None:
+            return True
+        async with self._lock:
+            if not self._unsaved:
+                return True
+            try:
+                ok = await asyncio.get_running_loop().run_in_executor(None, self._persist)
+            except Exception as e:
+                logger.error(f"[EmbedBatch] Failed to save FAISS index: {e}")
+                return False
+            if ok is not False:
+                self._unsaved = 0
+                self.stats['saves'] += 1
+            return ok is not False
+
+    async def close(self) -> bool:
+        """刷新队列中剩余的条目，等待所有批次完成后保存一次"""
+        for is_image_url in (True, False):
+            self._start_flush(is_image_url)
+        if self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+        ok = await self.save()
+        logger.info(f"[EmbedBatch] Closed: {self.stats}")
+        return ok
+
+
+# 按目标索引共享的微批处理器，key 为 (username, article_id)
+_batchers: Dict[Tuple[Optional[str], Optional[str]], EmbeddingBatcher] = {}
+
+
+def get_embedding_batcher(username: Optional[str], article_id: Optional[str],
+                          index_loader: Callable[[], Any]) -> EmbeddingBatcher:
+    """
+    获取目标索引的微批处理器，不存在时用 index_loader 加载索引并创建
+
+    处理器持有索引对象，抓取期间即使该索引被进程内缓存淘汰，新增向量也不会丢失。
+    """
+    key = (username, article_id)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        faiss_index = index_loader()
+
+        def persist():
+            from utils.embedding_utils import save_faiss_index
+            return save_faiss_index(faiss_index, username=username, article_id=article_id)
+
+        batcher = EmbeddingBatcher(faiss_index, persist=persist)
+        _batchers[key] = batcher
+    return batcher
+
+
+async def close_embedding_batcher(username: Optional[str], article_id: Optional[str]) -> bool:
+    """抓取结束时刷新并保存目标索引；没有处理器时直接返回"""
+    batcher = _batchers.pop((username, article_id), None)
+    if batcher is None:
+        return True
+    return await batcher.close()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Embedding 向量持久化缓存
+
+Embedding.get_embedding 过去每次都请求远程服务：章节检索的查询文本、抓取到的图片，
+以及 batch_embed_with_fallback 拆分重试（10→5→1）时已经成功过的图片都会重复计费。
+本模块按 (提供商, 模型, 维度, 内容哈希) 缓存向量：
+
+- 键：sha256(provider | model | dim | text/image | 内容)，图片以 URL 作为内容
+- 向量以 float32 字节保存在 SQLite（BLOB），进程内有一层按条数限制的 LRU
+- get_many / put_many 批量读写，未命中的条目才发送给 API
+- 总大小超过 EMBED_CACHE_MAX_BYTES 时按最近访问时间（LRU）淘汰
+- 统计命中率（get_stats），安装了 prometheus_client 时同时导出计数器
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBED_CACHE_PATH = os.getenv('EMBED_CACHE_PATH', 'data/embedding_cache/cache.sqlite3')
+EMBED_CACHE_MAX_BYTES = int(os.getenv('EMBED_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))  # 1GB
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv('EMBED_CACHE_MEMORY_ITEMS', '4096'))
+EMBED_CACHE_ENABLED = os.getenv('EMBED_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+# SQLite 单条语句的参数上限
+_SQL_CHUNK = 500
+
+try:
+    from prometheus_client import Counter
+    embedding_cache_lookups = Counter(
+        'embedding_cache_lookups_total',
+        'Embedding cache lookups',
+        ['kind', 'result']
+    )
+except Exception:  # prometheus_client 未安装或指标已注册
+    embedding_cache_lookups = None
+
+
+def make_namespace(provider: str, model: str, dimension: int) -> str:
+    return f"{provider}|{model}|{dimension}"
+
+
+def make_key(namespace: str, content: str, is_image_url: bool = False) -> str:
+    kind = 'image' if is_image_url else 'text'
+    return hashlib.sha256(f"{namespace}|{kind}|{content}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """按内容哈希索引的 embedding 向量缓存（线程安全）"""
+
+    def __init__(self, path: str = EMBED_CACHE_PATH,
+                 max_bytes: int = EMBED_CACHE_MAX_BYTES,
+                 memory_items: int = EMBED_CACHE_MEMORY_ITEMS,
+                 enabled: bool = EMBED_CACHE_ENABLED):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stats = {
+            'hits': 0,
+            'memory_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+        }
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Sequence[str], kind: str = 'text') -> List[Optional[List[float]]]:
+        """批量读取，未命中的位置为 None；出错时全部视为未命中"""
+        if not self.enabled or not keys:
+            return [None] * len(keys)
+        try:
+            results = self._get_many(keys)
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] Read failed: {e}")
+            results = [None] * len(keys)
+        if embedding_cache_lookups is not None:
+            hits = sum(1 for vector in results if vector is not None)
+            embedding_cache_lookups.labels(kind=kind, result='hit').inc(hits)
+            embedding_cache_lookups.labels(kind=kind, result='miss').inc(len(keys) - hits)
+        return results
+
+    def _get_many(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            memory_hits = len(found)
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing:
+                conn = self._get_conn()
+                for start in range(0, len(missing), _SQL_CHUNK):
+                    chunk = missing[start:start + _SQL_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    for key, blob in conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ):
+                        vector = np.frombuffer(blob, dtype='<f4')
+                        found[key] = vector
+                        self._remember(key, vector)
+                disk_hits = [key for key in missing if key in found]
+                if disk_hits:
+                    now = time.time()
+                    conn.executemany("UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                                     [(now, key) for key in disk_hits])
+            results = [found[key].tolist() if key in found else None for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self._stats['hits'] += hits
+            self._stats['memory_hits'] += memory_hits
+            self._stats['misses'] += len(keys) - hits
+        return results
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Any]) -> int:
+        """批量写入非空向量，返回写入条数"""
+        if not self.enabled:
+            return 0
+        rows = []
+        for key, vector in zip(keys, vectors):
+            if vector is None or len(vector) == 0:
+                continue
+            rows.append((key, np.asarray(vector, dtype='<f4')))
+        if not rows:
+            return 0
+        try:
+            now = time.time()
+            with self._lock:
+                conn = self._get_conn()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                    [(key, vector.tobytes(), now) for key, vector in rows]
+                )
+                for key, vector in rows:
+                    self._remember(key, vector)
+                self._stats['stores'] += len(rows)
+                self._evict_locked(conn)
+            return len(rows)
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] Write failed: {e}")
+            return 0
+
+    def _evict_locked(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(length(vector)), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次写入都触发淘汰
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for key, size in conn.execute(
+            "SELECT key, length(vector) FROM embeddings ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= target:
+                break
+            evicted.append((key,))
+            self._memory.pop(key, None)
+            total -= size
+        conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._stats['evictions'] += len(evicted)
+        logger.info(f"[EmbeddingCache] Evicted {len(evicted)} vectors (LRU), size now {total} bytes")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计（含命中率）"""
+        stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['memory_items'] = len(self._memory)
+        return stats
+
+
+# 全局实例
+embedding_cache = EmbeddingCache()
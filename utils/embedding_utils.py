@@ -5,11 +5,15 @@ import numpy as np
 import faiss
 from typing import List, Dict, Any, Tuple, Optional, Union
 import base64
+import threading
 import time
 from urllib.parse import urlparse
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from settings import get_embedding_type, get_embedding_config, get_embedding_dimension, DEFAULT_IMAGE_EMBEDDING_METHOD
 import requests
+from utils.image_blob_store import image_blob_store
+from utils import faiss_store
+from utils.embedding_cache import embedding_cache, make_key as make_cache_key, make_namespace as make_cache_namespace
 
 # Configure logging
 logging.basicConfig(
@@ -24,8 +28,67 @@ logger = logging.getLogger(__name__)
 # Jina 官方 API 支持直接 URL，但 Gitee AI 托管版不支持，必须用 base64
 USE_DIRECT_IMAGE_URL = False
 
+# embedding API 请求和图片下载共享的 HTTP 连接池，多个批次并发请求时复用 TCP/TLS 连接
+EMBED_HTTP_POOL_SIZE = int(os.getenv('EMBED_HTTP_POOL_SIZE', '32'))
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """获取共享的 requests.Session（线程安全的延迟初始化）"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=EMBED_HTTP_POOL_SIZE, pool_maxsize=EMBED_HTTP_POOL_SIZE
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _http_session = session
+    return _http_session
+
+
 class Embedding:
     def get_embedding(self, data, is_image_url=False):
+        """
+        获取文本或图片 URL 的 embedding 向量
+
+        先按 (提供商, 模型, 维度, 内容哈希) 批量查询 embedding_cache，只把未命中的条目发送给 API，
+        新获取的向量写回缓存。返回格式与 _request_embedding 一致：图片模式下失败位置为空列表。
+        """
+        data = list(data)
+        if not data or not embedding_cache.enabled:
+            return self._request_embedding(data, is_image_url)
+
+        embedding_type = get_embedding_type()
+        model = get_embedding_config().get(embedding_type, {}).get('model', '')
+        namespace = make_cache_namespace(embedding_type, model, get_embedding_dimension())
+        keys = [make_cache_key(namespace, str(item), is_image_url) for item in data]
+        kind = 'image' if is_image_url else 'text'
+        results = embedding_cache.get_many(keys, kind=kind)
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if not missing:
+            logger.info(f"Embedding 缓存全部命中: {len(data)} 条 ({kind})")
+            return results
+
+        fetched = self._request_embedding([data[i] for i in missing], is_image_url)
+        if len(fetched) != len(missing):
+            if len(missing) == len(data):
+                return fetched
+            if not (is_image_url and not fetched):
+                # 文本返回数量不一致时无法对齐，与未使用缓存时一样视为失败
+                return []
+            fetched = [[] for _ in missing]
+
+        for i, vector in zip(missing, fetched):
+            results[i] = vector
+        embedding_cache.put_many([keys[i] for i in missing], fetched)
+        logger.info(f"Embedding 缓存命中 {len(data) - len(missing)}/{len(data)} 条 ({kind})")
+        return results
+
+    def _request_embedding(self, data, is_image_url=False):
         # Get the latest embedding configuration
         embedding_type = get_embedding_type()
         embedding_config = get_embedding_config()
@@ -125,21 +188,29 @@ class Embedding:
                         'Sec-Fetch-Site': 'cross-site',
                     }
                     
+                    def _to_data_image(content: bytes, mime: Optional[str]) -> Dict[str, str]:
+                        if not mime or not mime.startswith('image/'):
+                            mime = 'image/jpeg'
+                        b64 = base64.b64encode(content).decode('utf-8')
+                        # 添加 data URL 前缀，格式: data:image/jpeg;base64,{base64_string}
+                        return {"image": f"data:{mime};base64,{b64}"}
+
+                    # 抓取阶段已下载过的图片直接从本地图片存储读取
+                    blob = image_blob_store.get(url)
+                    if blob is not None:
+                        return _to_data_image(*blob)
+
                     # 尝试下载，失败后用不同 Referer 重试一次
                     for attempt in range(2):
                         try:
-                            resp = requests.get(url, timeout=timeout, headers=headers, verify=False, allow_redirects=True)
+                            resp = get_http_session().get(url, timeout=timeout, headers=headers, verify=False, allow_redirects=True)
                             resp.raise_for_status()
                             mime = resp.headers.get('Content-Type', 'image/jpeg')
-                            if not mime or not mime.startswith('image/'):
-                                mime = 'image/jpeg'
                             if len(resp.content) < 100:
                                 logger.debug(f"图片内容过小({len(resp.content)}B), 跳过: {url[:80]}")
                                 return None
-                            b64 = base64.b64encode(resp.content).decode('utf-8')
-                            # 添加 data URL 前缀，格式: data:image/jpeg;base64,{base64_string}
-                            data_url = f"data:{mime};base64,{b64}"
-                            return {"image": data_url}
+                            image_blob_store.put(url, resp.content, mime)
+                            return _to_data_image(resp.content, mime)
                         except Exception as e:
                             if attempt == 0:
                                 # 第一次失败，换用 Google 作为 Referer 重试
@@ -242,7 +313,7 @@ class Embedding:
         for attempt in range(max_retries):
             try:
                 logger.info(f"尝试第 {attempt + 1}/{max_retries} 次调用 embedding API: {url}")
-                response = requests.post(url, headers=headers, json=request_data, timeout=actual_timeout)
+                response = get_http_session().post(url, headers=headers, json=request_data, timeout=actual_timeout)
                 logger.info(
                     f"已发送请求到 {url}，提供商: {embedding_type}，模型: {config.get('model', 'unknown')}，"
                     f"输入数量: {input_count}，状态码: {response.status_code}，成功: {response.ok}"
@@ -352,7 +423,30 @@ class FAISSIndex:
         """
         self.index = None
         self.data = []  # Store original data corresponding to embeddings
+        # mmap 加载时索引向量和元数据都是只读映射，写入前需复制（见 _ensure_writable）
+        self.mmapped = False
+        self._data_bytes = 0
         logger.debug("FAISS index initialized")
+
+    def _ensure_writable(self) -> None:
+        """把 mmap 加载的只读索引和元数据复制为可写的内存副本"""
+        if self.mmapped and self.index is not None:
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+            index = faiss.IndexFlatIP(self.index.d)
+            index.add(vectors)
+            self.index = index
+            self.mmapped = False
+        if not isinstance(self.data, list):
+            self.data = list(self.data)
+
+    def memory_bytes(self) -> int:
+        """
+        估算索引占用的字节数（向量 + 元数据），用于缓存按字节淘汰
+
+        mmap 加载的部分按映射大小计入，它们由页缓存承载并在进程间共享。
+        """
+        vector_bytes = self.index.ntotal * self.index.d * 4 if self.index is not None else 0
+        return vector_bytes + self._data_bytes
     
     def add_embeddings(self, embeddings: List[List[float]], data: List[Any]) -> None:
         """
@@ -368,6 +462,8 @@ class FAISSIndex:
             
         # Convert embeddings to numpy array
         embeddings_np = np.array(embeddings).astype('float32')
+
+        self._ensure_writable()
         
         # Initialize the index if it's not already initialized
         if self.index is None:
@@ -384,6 +480,7 @@ class FAISSIndex:
         
         # Store corresponding data
         self.data.extend(data)
+        self._data_bytes += sum(len(str(item)) for item in data)
         logger.debug(f"Added {len(embeddings)} embeddings to FAISS index. Total: {len(self.data)}")
     
     def add_embedding(self, embedding: List[float], data_item: Any) -> None:
@@ -434,6 +531,30 @@ class FAISSIndex:
         
         return indices, similarities, result_data
         
+    def search_batch(self, query_embeddings: List[List[float]], k: int = 5) -> Tuple[List[List[int]], List[List[float]], List[List[Any]]]:
+        """
+        一次矩阵检索多个查询向量
+
+        Args:
+            query_embeddings: 查询向量列表
+            k: 每个查询返回的最相似项目数量
+
+        Returns:
+            每个查询各自的 (索引, 相似度, 数据) 列表，顺序与 query_embeddings 一致
+        """
+        k = min(k, len(self.data))
+        if k == 0 or not query_embeddings:
+            return [[] for _ in query_embeddings], [[] for _ in query_embeddings], [[] for _ in query_embeddings]
+
+        query_np = np.array(query_embeddings).astype('float32')
+        faiss.normalize_L2(query_np)
+        similarities, indices = self.index.search(query_np, k)
+
+        indices = [[i for i in row if i >= 0] for row in indices.tolist()]
+        similarities = [row[:len(ids)] for row, ids in zip(similarities.tolist(), indices)]
+        result_data = [[self.data[i] for i in row] for row in indices]
+        return indices, similarities, result_data
+
     def get_size(self) -> int:
         """
         Get the number of items in the FAISS index.
@@ -455,6 +576,8 @@ class FAISSIndex:
         self.index = faiss.IndexFlatIP(embedding_dim)
         # 清空数据
         self.data = []
+        self.mmapped = False
+        self._data_bytes = 0
         logger.debug(f"FAISS索引已清空，使用维度: {embedding_dim}")
             
         # 将空索引保存到磁盘
@@ -462,7 +585,7 @@ class FAISSIndex:
             # 默认索引路径
             index_dir = 'data/faiss'
             index_path = f"{index_dir}/index.faiss"
-            data_path = f"{index_dir}/index_data.pkl"
+            data_path = f"{index_dir}/{faiss_store.META_FILENAME}"
                 
             # 确保目录存在
             import os
@@ -480,30 +603,23 @@ class FAISSIndex:
     def save_to_disk(self, index_path: str, data_path: str) -> bool:
         """
         Save the index and data to disk.
+
+        Both files are written to a temp file and atomically renamed, so other
+        processes that have the previous version memory-mapped are unaffected.
         
         Args:
             index_path: Path to save the index.
-            data_path: Path to save the data.
+            data_path: Path to save the metadata sidecar (index_meta.bin).
             
         Returns:
             True if successful, False otherwise.
         """
-        import pickle
-        import os
-            
         try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(index_path), exist_ok=True)
-            
             # 保存索引
-            faiss.write_index(self.index, index_path)
+            faiss_store.write_index(self.index, index_path)
             
-            # 保存数据
-            data_dict = {
-                'data': self.data
-            }
-            with open(data_path, 'wb') as f:
-                pickle.dump(data_dict, f)
+            # 保存数据（列式元数据，不再使用 pickle）
+            faiss_store.write_metadata(data_path, self.data)
                 
             logger.debug(f"Successfully saved FAISS index to {index_path} and data to {data_path} (items: {len(self.data)})")
             return True
@@ -512,18 +628,22 @@ class FAISSIndex:
             logger.error(f"Failed to save FAISS index to disk: {str(e)}")
             return False
             
-    def load_from_disk(self, index_path: str, data_path: str) -> bool:
+    def load_from_disk(self, index_path: str, data_path: str, mmap: bool = False) -> bool:
         """
         Load a FAISS index and associated data from disk.
         
         Args:
             index_path: Path from where to load the FAISS index
             data_path: Path from where to load the associated data
+                (index_meta.bin, or a legacy index_data.pkl, which is read
+                with a restricted unpickler and converted to index_meta.bin)
+            mmap: Memory-map the index read-only instead of copying it into
+                the process; the first add() makes a private writable copy.
+                The metadata sidecar is always memory-mapped and decoded lazily
             
         Returns:
             bool: True if successful, False otherwise
         """
-        import pickle
         import os
         
         try:
@@ -533,15 +653,21 @@ class FAISSIndex:
                 return False
                 
             # Load FAISS index
-            self.index = faiss.read_index(index_path)
+            self.index, self.mmapped = faiss_store.read_index(index_path, mmap_enabled=mmap)
             
             # Load associated data
-            with open(data_path, 'rb') as f:
-                data_dict = pickle.load(f)
-                self.data = data_dict['data']
-                # 兼容旧版本数据，忽略dimension字段
+            if data_path.endswith('.pkl'):
+                # 旧版 pickle 数据：受限读取后转换为列式元数据，之后不再读取 pickle
+                legacy_data = faiss_store.load_legacy_metadata(data_path)
+                data_path = os.path.join(os.path.dirname(data_path), faiss_store.META_FILENAME)
+                faiss_store.write_metadata(data_path, legacy_data)
+                logger.info(f"Migrated legacy FAISS metadata to {data_path} ({len(legacy_data)} items)")
+
+            # 元数据总是以只读 mmap 惰性加载，访问某一行时才解码；首次 add() 时复制为列表
+            self.data = faiss_store.load_metadata(data_path)
+            self._data_bytes = self.data.nbytes
             
-            logger.debug(f"Successfully loaded FAISS index from {index_path} with {len(self.data)} items")
+            logger.debug(f"Successfully loaded FAISS index from {index_path} with {len(self.data)} items (mmap={self.mmapped})")
             return True
             
         except Exception as e:
@@ -549,10 +675,22 @@ class FAISSIndex:
             return False
 
 
-# 全局FAISS索引缓存，避免循环导入
-global_faiss_index_cache = {}
+def _index_data_path(index_dir: str) -> str:
+    """元数据文件路径：优先 index_meta.bin，只有旧版 index_data.pkl 时使用旧文件"""
+    import os
+
+    meta_path = os.path.join(index_dir, faiss_store.META_FILENAME)
+    legacy_path = os.path.join(index_dir, faiss_store.LEGACY_DATA_FILENAME)
+    if not os.path.exists(meta_path) and os.path.exists(legacy_path):
+        return legacy_path
+    return meta_path
+
 
-def create_faiss_index(load_from_disk: bool = False, index_dir: str = 'data/faiss', username: str = None, article_id: str = None) -> FAISSIndex:
+# 全局FAISS索引缓存（按字节数限制的 LRU），避免循环导入
+global_faiss_index_cache = faiss_store.FaissLRUCache()
+
+def create_faiss_index(load_from_disk: bool = False, index_dir: str = 'data/faiss', username: str = None, article_id: str = None,
+                       mmap: bool = False) -> FAISSIndex:
     """
     创建一个新的FAISS索引实例，可选从磁盘加载。
     维度将在添加第一个embedding时自动设置。
@@ -562,6 +700,7 @@ def create_faiss_index(load_from_disk: bool = False, index_dir: str = 'data/fais
         index_dir: FAISS索引文件的存储目录
         username: 用户名，用于创建用户特定的索引路径
         article_id: 文章ID，用于创建文章特定的索引路径
+        mmap: 以只读 mmap 方式加载（多进程共享页缓存，首次写入时复制）
         
     Returns:
         FAISSIndex: 新创建的或从磁盘加载的FAISS索引实例
@@ -599,7 +738,7 @@ def create_faiss_index(load_from_disk: bool = False, index_dir: str = 'data/fais
     
     # 设置索引文件路径
     index_path = os.path.join(actual_index_dir, 'index.faiss')
-    data_path = os.path.join(actual_index_dir, 'index_data.pkl')
+    data_path = _index_data_path(actual_index_dir)
     
     # 如果指定从磁盘加载且文件存在，尝试加载
     if load_from_disk:
@@ -611,7 +750,7 @@ def create_faiss_index(load_from_disk: bool = False, index_dir: str = 'data/fais
         data_exists = os.path.exists(data_path)
         
         if index_exists and data_exists:
-            success = faiss_index.load_from_disk(index_path, data_path)
+            success = faiss_index.load_from_disk(index_path, data_path, mmap=mmap)
             if success:
                 logger.debug(f"Loaded existing FAISS index from {index_path} with {faiss_index.get_size()} items")
                 # 更新全局缓存
@@ -660,9 +799,9 @@ def save_faiss_index(faiss_index: FAISSIndex, index_dir: str = 'data/faiss', use
     # 创建目录（如果不存在）
     Path(actual_index_dir).mkdir(parents=True, exist_ok=True)
     
-    # 设置索引文件路径 - 统一使用index.faiss和index_data.pkl命名
+    # 设置索引文件路径 - 统一使用index.faiss和index_meta.bin命名
     index_path = os.path.join(actual_index_dir, 'index.faiss')
-    data_path = os.path.join(actual_index_dir, 'index_data.pkl')
+    data_path = os.path.join(actual_index_dir, faiss_store.META_FILENAME)
     
     # 保存索引和数据
     logger.debug(f"保存FAISS索引到: {index_path}")
@@ -838,6 +977,32 @@ def search_similar_text(query_text: str, faiss_index: FAISSIndex, k: int = 5, is
     return search_similar(embedding_vectors[0], faiss_index, k)
 
 
+def search_similar_texts(query_texts: List[str], faiss_index: FAISSIndex, k: int = 5,
+                         is_image_url: bool = False) -> Tuple[List[List[int]], List[List[float]], List[List[Any]]]:
+    """
+    批量检索：所有查询一次 embedding 请求、一次矩阵检索
+
+    Returns:
+        每个查询各自的 (索引, 相似度, 数据) 列表；embedding 失败的查询结果为空列表
+    """
+    empty = ([[] for _ in query_texts], [[] for _ in query_texts], [[] for _ in query_texts])
+    if not query_texts:
+        return empty
+
+    embedding_vectors = Embedding().get_embedding(query_texts, is_image_url=is_image_url)
+    if not embedding_vectors or len(embedding_vectors) != len(query_texts):
+        logger.warning(f"Failed to create embeddings for {len(query_texts)} queries")
+        return empty
+
+    valid = [i for i, vector in enumerate(embedding_vectors) if vector]
+    indices, similarities, data = empty
+    if valid:
+        batch = faiss_index.search_batch([embedding_vectors[i] for i in valid], k)
+        for position, i in enumerate(valid):
+            indices[i], similarities[i], data[i] = batch[0][position], batch[1][position], batch[2][position]
+    return indices, similarities, data
+
+
 def search_similar(query_embedding: List[float], faiss_index: FAISSIndex, k: int = 5) -> Tuple[List[int], List[float], List[Any]]:
     """
     Search for similar items in the provided FAISS index.
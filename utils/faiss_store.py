@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+FAISS 索引的磁盘格式与进程内缓存
+
+- 索引文件 index.faiss 通过 FAISS mmap（IO_FLAG_MMAP / IO_FLAG_MMAP_IFC）只读加载，
+  向量数据留在页缓存中，同一节点上的多个 worker / uvicorn 进程共享同一份物理内存
+- 元数据 index_meta.bin 是列式格式：值全部为字符串的字段各存一列（低基数的 task_id、type
+  按字典编码为 int32），其余字段以 JSON 存在 extra 列。加载时只 mmap 文件并建立 NumPy 视图，
+  访问某一行时才解码该行，也可按列批量读取（column）
+- 旧版 index_data.pkl 只用受限的 Unpickler 读取（仅允许基础容器和标量类型，不会执行任意代码），
+  读取后转换为 index_meta.bin
+- 写入时先写临时文件再 os.replace，其他进程已映射的旧文件不受影响（避免 SIGBUS）
+- FaissLRUCache 按字节数限制进程内缓存的索引，超出时淘汰最久未使用的条目
+
+元数据文件格式（小端）：
+    b'SWFAISM2' | uint64 头部长度 | 头部 JSON | 按 8 字节对齐的各列缓冲区
+    头部记录行数、各列编码及其缓冲区在文件中的位置
+"""
+
+import io
+import json
+import logging
+import mmap
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+META_FILENAME = 'index_meta.bin'
+LEGACY_DATA_FILENAME = 'index_data.pkl'
+META_MAGIC = b'SWFAISM2'
+
+FAISS_MMAP_ENABLED = os.getenv('FAISS_MMAP_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+FAISS_CACHE_MAX_BYTES = int(os.getenv('FAISS_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))  # 512MB
+FAISS_CACHE_MAX_ENTRIES = int(os.getenv('FAISS_CACHE_MAX_ENTRIES', '64'))
+
+_HEADER_SIZE = len(META_MAGIC) + 8
+# 不同取值数不超过行数的该比例时按字典编码
+_DICT_ENCODING_RATIO = 0.5
+
+
+def _atomic_write(path: str, write: Callable[[str], None]) -> None:
+    """写入同目录临时文件后原子替换"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _string_table(values: List[str]) -> Tuple[bytes, bytes]:
+    """字符串列表编码为 (uint64 偏移表, 拼接的 UTF-8 字节)"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    if encoded:
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return offsets.tobytes(), b''.join(encoded)
+
+
+def _plan_columns(items: List[Any]) -> List[str]:
+    """选出所有取值都是字符串的字段作为独立列（按首次出现顺序）"""
+    candidates: Dict[str, bool] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for key, value in item.items():
+            if isinstance(key, str):
+                candidates[key] = candidates.get(key, True) and isinstance(value, str)
+    return [key for key, ok in candidates.items() if ok]
+
+
+def write_metadata(path: str, items: Iterable[Any]) -> int:
+    """写入列式元数据文件，返回文件字节数"""
+    items = list(items)
+    count = len(items)
+    buffers: List[bytes] = []
+
+    def add_buffer(data: bytes) -> int:
+        buffers.append(data)
+        return len(buffers) - 1
+
+    columns = []
+    for name in _plan_columns(items):
+        values = [item.get(name) if isinstance(item, dict) else None for item in items]
+        distinct = list(dict.fromkeys(value for value in values if value is not None))
+        if len(distinct) <= max(1, int(count * _DICT_ENCODING_RATIO)):
+            lookup = {value: code for code, value in enumerate(distinct)}
+            codes = np.array([lookup.get(value, -1) for value in values], dtype='<i4')
+            offsets, data = _string_table(distinct)
+            columns.append({'name': name, 'encoding': 'dict', 'size': len(distinct),
+                            'codes': add_buffer(codes.tobytes()),
+                            'offsets': add_buffer(offsets), 'data': add_buffer(data)})
+        else:
+            present = np.array([value is not None for value in values], dtype='u1')
+            offsets, data = _string_table([value or '' for value in values])
+            columns.append({'name': name, 'encoding': 'str',
+                            'present': add_buffer(present.tobytes()),
+                            'offsets': add_buffer(offsets), 'data': add_buffer(data)})
+
+    # extra 列：其余字段的 JSON；非字典的条目整体以 JSON 保存并在 kind 中标记
+    names = {column['name'] for column in columns}
+    kinds = np.zeros(count, dtype='u1')
+    extras = []
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            rest = {key: value for key, value in item.items() if key not in names}
+            extras.append(json.dumps(rest, ensure_ascii=False, separators=(',', ':')) if rest else '')
+        else:
+            kinds[i] = 1
+            extras.append(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+    extra_offsets, extra_data = _string_table(extras)
+    extra = {'kind': add_buffer(kinds.tobytes()),
+             'offsets': add_buffer(extra_offsets), 'data': add_buffer(extra_data)}
+
+    def layout(header_size: int) -> List[Tuple[int, int]]:
+        position = _HEADER_SIZE + header_size
+        spans = []
+        for data in buffers:
+            position += -position % 8
+            spans.append((position, len(data)))
+            position += len(data)
+        return spans
+
+    # 头部长度影响缓冲区位置，迭代到长度稳定
+    header = b''
+    while True:
+        spans = layout(len(header))
+        encoded = json.dumps({'rows': count, 'columns': columns, 'extra': extra, 'buffers': spans},
+                             separators=(',', ':')).encode('utf-8')
+        stable = len(encoded) == len(header)
+        header = encoded
+        if stable:
+            break
+
+    def write(tmp_path: str):
+        with open(tmp_path, 'wb') as f:
+            f.write(META_MAGIC)
+            f.write(np.array([len(header)], dtype='<u8').tobytes())
+            f.write(header)
+            for (start, _), data in zip(spans, buffers):
+                f.write(b'\0' * (start - f.tell()))
+                f.write(data)
+
+    _atomic_write(path, write)
+    return spans[-1][0] + spans[-1][1] if spans else _HEADER_SIZE + len(header)
+
+
+class _StringColumn:
+    """偏移表 + UTF-8 字节构成的字符串序列（基于映射内存，按需解码）"""
+
+    def __init__(self, mm: mmap.mmap, offsets: np.ndarray, base: int):
+        self._mm = mm
+        self._offsets = offsets
+        self._base = base
+
+    def get(self, i: int) -> str:
+        start = self._base + int(self._offsets[i])
+        end = self._base + int(self._offsets[i + 1])
+        return self._mm[start:end].decode('utf-8')
+
+
+class MetadataView(Sequence):
+    """
+    mmap 的只读列式元数据序列
+
+    各列都是映射内存上的 NumPy 视图，访问某一行时只解码这一行；
+    字典编码列的字典在加载时解码（取值很少）。
+    """
+
+    def __init__(self, mm: mmap.mmap, size: int):
+        self._mm = mm
+        header_size = int(np.frombuffer(mm, dtype='<u8', count=1, offset=len(META_MAGIC))[0])
+        header = json.loads(mm[_HEADER_SIZE:_HEADER_SIZE + header_size])
+        spans = header['buffers']
+        self._count = header['rows']
+        self.nbytes = size
+
+        def view(index: int, dtype: str) -> np.ndarray:
+            start, length = spans[index]
+            return np.frombuffer(mm, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=start)
+
+        def strings(spec: Dict[str, Any]) -> _StringColumn:
+            return _StringColumn(mm, view(spec['offsets'], '<u8'), spans[spec['data']][0])
+
+        self._columns = []
+        for spec in header['columns']:
+            if spec['encoding'] == 'dict':
+                table = strings(spec)
+                values = [table.get(i) for i in range(spec['size'])]
+                self._columns.append((spec['name'], 'dict', view(spec['codes'], '<i4'), values))
+            else:
+                self._columns.append((spec['name'], 'str', view(spec['present'], 'u1'), strings(spec)))
+        self._kinds = view(header['extra']['kind'], 'u1')
+        self._extra = strings(header['extra'])
+        self.column_names = [name for name, *_ in self._columns]
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _cell(encoding: str, index: np.ndarray, values, i: int) -> Optional[str]:
+        if encoding == 'dict':
+            code = int(index[i])
+            return values[code] if code >= 0 else None
+        return values.get(i) if index[i] else None
+
+    def _row(self, i: int) -> Any:
+        extra = self._extra.get(i)
+        if self._kinds[i]:
+            return json.loads(extra)
+        row = {}
+        for name, encoding, index, values in self._columns:
+            value = self._cell(encoding, index, values, i)
+            if value is not None:
+                row[name] = value
+        if extra:
+            row.update(json.loads(extra))
+        return row
+
+    def _check(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('metadata index out of range')
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._count))]
+        return self._row(self._check(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._count):
+            yield self._row(i)
+
+    def column(self, name: str, indices: Optional[Iterable[int]] = None) -> List[Optional[str]]:
+        """按列读取（只解码该列），indices 为空时读取全部行；不存在的列返回 None"""
+        rows = range(self._count) if indices is None else [self._check(i) for i in indices]
+        for column_name, encoding, index, values in self._columns:
+            if column_name == name:
+                return [self._cell(encoding, index, values, i) for i in rows]
+        return [None for _ in rows]
+
+
+def load_metadata(path: str):
+    """mmap 方式打开元数据文件，返回只读的惰性序列"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER_SIZE:
+            raise ValueError(f"metadata file too small: {path}")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(META_MAGIC)] == META_MAGIC:
+        return MetadataView(mm, size)
+    mm.close()
+    raise ValueError(f"invalid metadata file: {path}")
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    """只还原基础容器和标量：任何全局对象引用（类、函数）都拒绝，不会执行任意代码"""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"global '{module}.{name}' is not allowed in FAISS metadata")
+
+
+def load_legacy_metadata(path: str) -> List[Any]:
+    """安全读取旧版 index_data.pkl（{'data': [...]}），返回条目列表"""
+    with open(path, 'rb') as f:
+        payload = _SafeUnpickler(io.BytesIO(f.read())).load()
+    if not isinstance(payload, dict) or not isinstance(payload.get('data'), list):
+        raise ValueError(f"unexpected legacy metadata layout: {path}")
+    return payload['data']
+
+
+def write_index(index, path: str) -> None:
+    """原子写入 FAISS 索引文件"""
+    import faiss
+
+    _atomic_write(path, lambda tmp_path: faiss.write_index(index, tmp_path))
+
+
+def read_index(path: str, mmap_enabled: bool = FAISS_MMAP_ENABLED):
+    """
+    读取 FAISS 索引，返回 (index, 是否为 mmap 只读)
+
+    mmap 加载的 Flat 索引向量直接引用映射内存，不能再 add；
+    需要写入时由调用方复制为普通索引（见 FAISSIndex._ensure_writable）。
+    """
+    import faiss
+
+    if mmap_enabled:
+        flags = faiss.IO_FLAG_MMAP | getattr(faiss, 'IO_FLAG_MMAP_IFC', 0) | getattr(faiss, 'IO_FLAG_READ_ONLY', 0)
+        try:
+            return faiss.read_index(path, flags), True
+        except Exception as e:
+            logger.debug(f"[FaissStore] mmap load failed for {path}, falling back to read: {e}")
+    return faiss.read_index(path), False
+
+
+class FaissLRUCache(MutableMapping):
+    """
+    按字节数限制的 FAISS 索引 LRU 缓存（线程安全）
+
+    条目大小在淘汰时通过 size_of 重新计算，缓存中的索引追加向量后也能正确计入。
+    超出 max_bytes 或 max_entries 时淘汰最久未使用的条目，最新写入的条目总是保留。
+    """
+
+    def __init__(self, max_bytes: int = FAISS_CACHE_MAX_BYTES,
+                 max_entries: int = FAISS_CACHE_MAX_ENTRIES,
+                 size_of: Optional[Callable[[Any], int]] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._size_of = size_of or (lambda value: value.memory_bytes())
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            value = self._items[key]
+            self._items.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._evict()
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            del self._items[key]
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._items))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def _entry_size(self, value: Any) -> int:
+        try:
+            return int(self._size_of(value))
+        except Exception:
+            return 0
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._entry_size(value) for value in self._items.values())
+
+    def _evict(self) -> None:
+        total = sum(self._entry_size(value) for value in self._items.values())
+        while len(self._items) > 1 and (total > self.max_bytes or len(self._items) > self.max_entries):
+            key, value = self._items.popitem(last=False)
+            total -= self._entry_size(value)
+            self.evictions += 1
+            logger.debug(f"[FaissStore] Evicted {key} from cache, total={total} bytes")
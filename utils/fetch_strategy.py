@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+分层抓取策略
+
+大多数来源是静态新闻/博客页面，直接 HTTP 获取的 HTML 已包含正文，
+无需启动 Chromium。本模块提供：
+
+1. needs_javascript(): 根据原始 HTML 判断页面是否依赖 JS 渲染
+   （正文长度、文本占比、SPA 空容器 / noscript 提示等特征）
+2. DomainFetchLearner: 按域名记录静态抓取的成败，
+   多次失败的域名直接走浏览器，并定期重新探测
+3. ReadinessProfile: 浏览器渲染时的自适应就绪判定参数（可按域名覆盖）
+4. ScrapeTimings: 按阶段汇总抓取耗时，定位时间花在哪里
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+STATIC_FETCH_ENABLED = os.getenv('STATIC_FETCH_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+# 静态抓取结果判定阈值
+STATIC_MIN_TEXT_LENGTH = 500     # 可见正文最少字符数
+STATIC_MIN_TEXT_RATIO = 0.02     # 可见正文 / HTML 长度的最低比例
+STATIC_RATIO_EXEMPT_LENGTH = 3000  # 正文足够长时不再检查比例（大型页面模板常导致比例偏低）
+
+# 依赖 JS 渲染的典型特征
+JS_REQUIRED_PATTERNS = [
+    re.compile(r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.IGNORECASE),
+    re.compile(r'<noscript>[^<]*(?:enable javascript|javascript is (?:disabled|required)|启用\s*javascript|开启\s*javascript)', re.IGNORECASE),
+]
+
+# 域名学习参数
+DOMAIN_FAILURE_THRESHOLD = 2   # 静态抓取连续失败次数达到该值后直接使用浏览器
+DOMAIN_REPROBE_INTERVAL = 20   # 对偏好浏览器的域名，每隔多少次请求重新尝试一次静态抓取
+MAX_TRACKED_DOMAINS = 4096
+
+
+def needs_javascript(html: str, visible_text: str) -> Tuple[bool, str]:
+    """
+    判断原始 HTML 是否需要浏览器渲染
+
+    Args:
+        html: HTTP 直接获取的 HTML
+        visible_text: 从 HTML 中提取的可见文本
+
+    Returns:
+        (needs_js, reason)
+    """
+    if not html:
+        return True, "empty_html"
+
+    text_length = len(visible_text.strip())
+    if text_length < STATIC_MIN_TEXT_LENGTH:
+        for pattern in JS_REQUIRED_PATTERNS:
+            if pattern.search(html):
+                return True, "spa_marker"
+        return True, f"short_text:{text_length}"
+
+    if text_length < STATIC_RATIO_EXEMPT_LENGTH:
+        ratio = text_length / len(html)
+        if ratio < STATIC_MIN_TEXT_RATIO:
+            return True, f"low_text_ratio:{ratio:.3f}"
+
+    return False, ""
+
+
+def _domain_of(url: str) -> str:
+    try:
+        host = (urlparse(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+    except Exception:
+        return ''
+
+
+class DomainFetchLearner:
+    """按域名记录静态抓取是否可行（进程内，线程安全）"""
+
+    def __init__(self, max_domains: int = MAX_TRACKED_DOMAINS):
+        self._lock = threading.Lock()
+        self._max_domains = max_domains
+        # domain -> {static_ok, static_fail, consecutive_fail, skipped}
+        self._domains: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def _get(self, domain: str) -> Dict[str, int]:
+        stats = self._domains.get(domain)
+        if stats is None:
+            stats = {'static_ok': 0, 'static_fail': 0, 'consecutive_fail': 0, 'skipped': 0}
+            self._domains[domain] = stats
+            if len(self._domains) > self._max_domains:
+                self._domains.popitem(last=False)
+        else:
+            self._domains.move_to_end(domain)
+        return stats
+
+    def should_try_static(self, url: str) -> bool:
+        """是否应先尝试静态抓取"""
+        if not STATIC_FETCH_ENABLED:
+            return False
+        domain = _domain_of(url)
+        if not domain:
+            return True
+        with self._lock:
+            stats = self._get(domain)
+            if stats['consecutive_fail'] < DOMAIN_FAILURE_THRESHOLD:
+                return True
+            stats['skipped'] += 1
+            # 定期重新探测，网站改版后可以恢复静态抓取
+            return stats['skipped'] % DOMAIN_REPROBE_INTERVAL == 0
+
+    def record(self, url: str, static_ok: bool):
+        """记录一次静态抓取结果"""
+        domain = _domain_of(url)
+        if not domain:
+            return
+        with self._lock:
+            stats = self._get(domain)
+            if static_ok:
+                stats['static_ok'] += 1
+                stats['consecutive_fail'] = 0
+            else:
+                stats['static_fail'] += 1
+                stats['consecutive_fail'] += 1
+                if stats['consecutive_fail'] == DOMAIN_FAILURE_THRESHOLD:
+                    logger.info(f"[FetchStrategy] Domain {domain} marked as browser-only")
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取各域名统计"""
+        with self._lock:
+            return {domain: dict(stats) for domain, stats in self._domains.items()}
+
+
+@dataclass(frozen=True)
+class ReadinessProfile:
+    """
+    浏览器渲染就绪判定参数
+
+    加载后轮询 DOM 正文长度和图片数量，连续 stable_polls 次不变即视为就绪；
+    懒加载滚动受时间和距离双重预算限制。
+    """
+    poll_interval: float = 0.25      # 轮询间隔（秒）
+    stable_polls: int = 2            # 连续多少次不变视为稳定
+    min_settle: float = 0.3          # 至少等待（秒）
+    max_settle: float = 3.0          # 最多等待（秒）
+    scroll: bool = True              # 是否滚动触发懒加载
+    scroll_max_time: float = 2.5     # 滚动时间预算（秒）
+    scroll_max_distance: int = 15000  # 滚动距离预算（像素）
+    post_scroll_settle: float = 1.5  # 滚动后最多再等待（秒）
+    wait_networkidle: bool = False   # 是否额外等待 networkidle（重度依赖异步请求的站点）
+
+
+DEFAULT_READINESS = ReadinessProfile()
+
+# 按域名覆盖就绪参数（子域名同样生效），可通过 READINESS_DOMAIN_OVERRIDES 环境变量（JSON）追加，
+# 例如 {"example.com": {"max_settle": 6, "wait_networkidle": true}}
+DOMAIN_READINESS_OVERRIDES: Dict[str, Dict[str, Any]] = {
+    # 微信公众号正文直出，图片使用 data-src 懒加载，无需滚动
+    'mp.weixin.qq.com': {'scroll': False, 'max_settle': 1.5},
+    # 知乎、头条等内容由接口异步渲染
+    'zhihu.com': {'max_settle': 5.0, 'wait_networkidle': True},
+    'toutiao.com': {'max_settle': 5.0, 'wait_networkidle': True},
+}
+
+
+def _load_readiness_overrides() -> Dict[str, ReadinessProfile]:
+    overrides = dict(DOMAIN_READINESS_OVERRIDES)
+    raw = os.getenv('READINESS_DOMAIN_OVERRIDES')
+    if raw:
+        try:
+            overrides.update(json.loads(raw))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"[FetchStrategy] Invalid READINESS_DOMAIN_OVERRIDES: {e}")
+    profiles = {}
+    for domain, values in overrides.items():
+        try:
+            profiles[domain.lower()] = replace(DEFAULT_READINESS, **values)
+        except TypeError as e:
+            logger.warning(f"[FetchStrategy] Invalid readiness override for {domain}: {e}")
+    return profiles
+
+
+_READINESS_PROFILES = _load_readiness_overrides()
+
+
+def get_readiness_profile(url: str) -> ReadinessProfile:
+    """获取 URL 对应的就绪判定参数，按域名后缀匹配覆盖配置"""
+    domain = _domain_of(url)
+    while domain:
+        profile = _READINESS_PROFILES.get(domain)
+        if profile is not None:
+            return profile
+        if '.' not in domain:
+            break
+        domain = domain.split('.', 1)[1]
+    return DEFAULT_READINESS
+
+
+class ScrapeTimings:
+    """按阶段汇总抓取耗时（进程内，线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # phase -> {count, total, max}
+        self._phases: Dict[str, Dict[str, float]] = {}
+
+    def record(self, timings: Dict[str, float]):
+        """记录一次抓取的各阶段耗时（秒）"""
+        with self._lock:
+            for phase, seconds in timings.items():
+                stats = self._phases.setdefault(phase, {'count': 0, 'total': 0.0, 'max': 0.0})
+                stats['count'] += 1
+                stats['total'] += seconds
+                stats['max'] = max(stats['max'], seconds)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各阶段统计：次数、总耗时、平均耗时、最大耗时"""
+        with self._lock:
+            return {
+                phase: {
+                    'count': int(stats['count']),
+                    'total': round(stats['total'], 3),
+                    'avg': round(stats['total'] / stats['count'], 3) if stats['count'] else 0.0,
+                    'max': round(stats['max'], 3),
+                }
+                for phase, stats in self._phases.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+
+
+# 全局实例
+domain_learner = DomainFetchLearner()
+scrape_timings = ScrapeTimings()
@@ -7,6 +7,7 @@ import aiohttp
 import hashlib
 import logging
 import json
+import time
 from bs4 import BeautifulSoup
 from bs4.element import Comment
 from pathlib import Path
@@ -21,8 +22,13 @@ import re
 import hashlib
 from typing import List, Dict
 from pathlib import Path
-from utils.embedding_utils import add_to_faiss_index, create_faiss_index
+from utils.embedding_utils import create_faiss_index
+from utils.embedding_batcher import get_embedding_batcher, close_embedding_batcher
 from utils.image_embedding import get_image_embedding_processor
+from utils.scrape_cache import scrape_cache, SCRAPE_CACHE_ENABLED
+from utils.fetch_strategy import needs_javascript, domain_learner, get_readiness_profile, scrape_timings
+from utils.browser_pool import browser_pool
+from utils.image_blob_store import image_blob_store
 from utils.image_filter import (
     should_skip_image_url,
     is_likely_icon_by_dimensions,
@@ -33,10 +39,6 @@ from utils.image_filter import (
 import concurrent.futures
 import threading
 
-try:
-    from playwright.async_api import async_playwright
-except ModuleNotFoundError:
-    async_playwright = None
 
 # 配置日志
 logging.basicConfig(
@@ -320,6 +322,14 @@ def tag_visible(element) -> bool:
         return False
     return True
 
+def _index_batcher(username: str = None, article_id: str = None):
+    """获取目标 FAISS 索引的 embedding 微批处理器（同一抓取任务的所有页面共享）"""
+    return get_embedding_batcher(
+        username, article_id,
+        lambda: get_streamlit_faiss_index(username=username, article_id=article_id)
+    )
+
+
 async def download_image(session: aiohttp.ClientSession, img_src: str, image_hash_cache: dict, task_id: str, is_multimodal: bool = False, use_direct_image_embedding: bool = False, theme: str = "", stats: dict = None, base_url: str = None, username: str = None, article_id: str = None) -> Union[str, dict]:
     """
     异步下载图片，使用MD5哈希确保每张图片只下载一次
@@ -403,9 +413,11 @@ async def download_image(session: aiohttp.ClientSession, img_src: str, image_has
     # 直接URL嵌入模式：下载图片内容进行尺寸筛选，合格则收集URL
     # 注意：这里不再逐张做 embedding，避免与 searxng_utils.py 的批量处理重复
     if use_direct_image_embedding:
+        # 本地图片存储中的图片已通过过校验，命中时跳过 HEAD 校验和下载
+        blob = await image_blob_store.aget(normalized_img_src)
         try:
             # 先做基本的URL校验
-            valid = await is_valid_image_url_for_model(session, normalized_img_src)
+            valid = blob is not None or await is_valid_image_url_for_model(session, normalized_img_src)
         except Exception:
             valid = False
         if not valid:
@@ -415,31 +427,38 @@ async def download_image(session: aiohttp.ClientSession, img_src: str, image_has
             image_hash_cache[normalized_img_src] = None
             return None
         
-        # 下载图片内容进行尺寸筛选
+        # 下载图片内容进行尺寸筛选（优先读取本地图片存储，合格图片写入存储供 embedding 和转存复用）
         try:
-            timeout = aiohttp.ClientTimeout(total=15, connect=10)
-            async with session.get(normalized_img_src, ssl=False, timeout=timeout, allow_redirects=True) as resp:
-                if resp.status != 200:
-                    stats['failed'] = stats.get('failed', 0) + 1
-                    image_hash_cache[normalized_img_src] = None
-                    return None
-                content = await resp.read()
-                
-                # 使用增强的图片筛选逻辑
-                is_filtered, filter_reason, image_info = is_low_quality_image(
-                    content=content,
-                    url=normalized_img_src,
-                    check_url=False,  # URL已在前面检查过
-                    check_dimensions=True,
-                    check_file_size=True,
-                    check_content=True,
-                )
-                
-                if is_filtered:
-                    stats['skipped'] = stats.get('skipped', 0) + 1
-                    logger.debug(f"Direct embedding filtered: {filter_reason} - {normalized_img_src[:60]}...")
-                    image_hash_cache[normalized_img_src] = None
-                    return None
+            if blob is not None:
+                content, content_type = blob
+            else:
+                timeout = aiohttp.ClientTimeout(total=15, connect=10)
+                async with session.get(normalized_img_src, ssl=False, timeout=timeout, allow_redirects=True) as resp:
+                    if resp.status != 200:
+                        stats['failed'] = stats.get('failed', 0) + 1
+                        image_hash_cache[normalized_img_src] = None
+                        return None
+                    content = await resp.read()
+                    content_type = resp.headers.get('Content-Type')
+
+            # 使用增强的图片筛选逻辑
+            is_filtered, filter_reason, image_info = is_low_quality_image(
+                content=content,
+                url=normalized_img_src,
+                check_url=False,  # URL已在前面检查过
+                check_dimensions=True,
+                check_file_size=True,
+                check_content=True,
+            )
+
+            if is_filtered:
+                stats['skipped'] = stats.get('skipped', 0) + 1
+                logger.debug(f"Direct embedding filtered: {filter_reason} - {normalized_img_src[:60]}...")
+                image_hash_cache[normalized_img_src] = None
+                return None
+
+            if blob is None:
+                await image_blob_store.aput(normalized_img_src, content, content_type)
         except Exception as e:
             logger.debug(f"Error downloading image for filtering: {e}")
             stats['failed'] = stats.get('failed', 0) + 1
@@ -513,11 +532,7 @@ async def download_image(session: aiohttp.ClientSession, img_src: str, image_has
                     if description and len(description) > 10:
                         data = {"image_url": normalized_img_src, "task_id": task_id, "description": description}
                         try:
-                            current_faiss_index = get_streamlit_faiss_index(username=username, article_id=article_id)
-                            before_size = current_faiss_index.get_size()
-                            add_to_faiss_index(description, data, current_faiss_index, username=username, article_id=article_id, auto_save=True)
-                            after_size = current_faiss_index.get_size()
-                            if after_size > before_size:
+                            if await _index_batcher(username, article_id).add(description, data):
                                 logger.debug(f"已添加图片描述到FAISS索引: {normalized_img_src}")
                         except Exception as e:
                             logger.error(f"记录图片描述到FAISS索引失败: {str(e)}")
@@ -560,26 +575,14 @@ async def download_image(session: aiohttp.ClientSession, img_src: str, image_has
                     "type": "image"
                 }
 
-                # 获取 FAISS 索引
-                current_faiss_index = get_streamlit_faiss_index(username=username, article_id=article_id)
-                before_size = current_faiss_index.get_size()
-
-                # 直接添加图片 URL 到 FAISS 索引（is_image_url=True）
-                # add_to_faiss_index 内部会调用 Embedding().get_embedding([url], is_image_url=True)
-                logger.info(f"[IMAGE_EMBEDDING] Calling add_to_faiss_index for {normalized_img_src[:60]}...")
-                success = add_to_faiss_index(
-                    text=normalized_img_src,
-                    data=data,
-                    faiss_index=current_faiss_index,
-                    auto_save=True,
-                    username=username,
-                    article_id=article_id,
-                    is_image_url=True  # 关键：启用图片 embedding
+                # 图片 URL 进入微批队列，与其他页面的图片一起调用 Embedding().get_embedding(urls, is_image_url=True)
+                # 索引在检查点和抓取结束时保存，不再每张图片重写一次
+                logger.info(f"[IMAGE_EMBEDDING] Queueing image for batched embedding: {normalized_img_src[:60]}...")
+                success = await _index_batcher(username, article_id).add(
+                    normalized_img_src, data, is_image_url=True  # 关键：启用图片 embedding
                 )
 
-                after_size = current_faiss_index.get_size()
-
-                if success and after_size > before_size:
+                if success:
                     logger.info(f"[IMAGE_EMBEDDING] ✓ Successfully indexed: {normalized_img_src[:60]}")
                     # 返回图片 URL 数据（替代原来的描述文本）
                     result = {
@@ -592,7 +595,7 @@ async def download_image(session: aiohttp.ClientSession, img_src: str, image_has
                     stats['success'] += 1 if stats else 0
                     return result
                 else:
-                    logger.warning(f"[IMAGE_EMBEDDING] ✗ Failed to index: {normalized_img_src[:60]}, success={success}, before={before_size}, after={after_size}")
+                    logger.warning(f"[IMAGE_EMBEDDING] ✗ Failed to index: {normalized_img_src[:60]}")
                     image_hash_cache[normalized_img_src] = None
                     stats['failed'] += 1 if stats else 0
                     return None
@@ -878,25 +881,12 @@ async def download_image(session: aiohttp.ClientSession, img_src: str, image_has
                         
                         # 添加到FAISS索引
                         try:
-                            # 获取用户和文章特定的FAISS索引实例
-                            logger.debug(f"正在获取FAISS索引实例: {username}/{article_id}")
-                            current_faiss_index = get_streamlit_faiss_index(username=username, article_id=article_id)
-                            
-                            # 记录添加前的索引大小
-                            before_size = current_faiss_index.get_size()
-                            logger.debug(f"添加图片前FAISS索引大小: {before_size}")
-                            
-                            # 添加到索引
-                            add_to_faiss_index(description, data, current_faiss_index, username=username, article_id=article_id, auto_save=True)
-                            
-                            # 记录添加后的索引大小
-                            after_size = current_faiss_index.get_size()
-                            logger.debug(f"添加图片后FAISS索引大小: {after_size}，增加: {after_size - before_size}")
-                            
-                            if after_size > before_size:
-                                logger.info(f"成功添加图片到FAISS索引 {username}/{article_id}: 数量：{after_size}")
+                            # 加入用户和文章特定索引的微批队列，批量 embedding 后写入索引
+                            batcher = _index_batcher(username, article_id)
+                            if await batcher.add(description, data):
+                                logger.info(f"成功添加图片到FAISS索引 {username}/{article_id}: 数量：{batcher.faiss_index.get_size()}")
                             else:
-                                logger.warning(f"图片似乎未成功添加到FAISS索引: {after_size}...")
+                                logger.warning(f"图片未成功添加到FAISS索引: {img_src[:80]}...")
                                 
                         except Exception as e:
                             logger.error(f"添加图片到FAISS索引失败: {str(e)}")
@@ -1431,101 +1421,265 @@ async def text_from_html(body: str, session: aiohttp.ClientSession, task_id: str
         logger.error(f"Error processing HTML content: {str(e)}")
         return {'text': '', 'images': []}
 
-async def fetch(browser, url, task_id=None, is_multimodal=False, use_direct_image_embedding=False, theme="", username=None, article_id=None) -> Dict[str, any]:
+def _use_scrape_cache(is_multimodal: bool, use_direct_image_embedding: bool) -> bool:
+    """
+    仅在直接嵌入模式下使用抓取缓存：该模式的图片结果是 URL，可安全复用；
+    多模态模式有写入 FAISS 的副作用，本地下载模式的结果是临时文件路径
+    """
+    return SCRAPE_CACHE_ENABLED and use_direct_image_embedding and not is_multimodal
+
+
+# 单个页面渲染超时（秒），从拿到浏览器池页面后开始计时
+PAGE_RENDER_TIMEOUT = 60
+
+
+# 就绪轮询：正文长度、图片数量、页面高度
+_READINESS_PROBE_JS = """
+() => [
+    document.body ? document.body.innerText.length : 0,
+    document.images.length,
+    document.body ? document.body.scrollHeight : 0,
+]
+"""
+
+# 受时间和距离预算限制的懒加载滚动，返回实际滚动距离
+_BUDGETED_SCROLL_JS = """
+async ([maxTimeMs, maxDistance]) => {
+    const start = Date.now();
+    const step = Math.max(window.innerHeight, 600);
+    let scrolled = 0;
+    while (scrolled < maxDistance && Date.now() - start < maxTimeMs) {
+        const scrollHeight = document.body ? document.body.scrollHeight : 0;
+        if (scrolled + window.innerHeight >= scrollHeight) break;
+        window.scrollBy(0, step);
+        scrolled += step;
+        await new Promise((resolve) => setTimeout(resolve, 100));
+    }
+    return scrolled;
+}
+"""
+
+
+async def _wait_until_stable(page, profile, max_wait: float) -> None:
+    """轮询 DOM，直到正文长度和图片数量连续若干次不变或超过 max_wait"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
+    earliest = loop.time() + profile.min_settle
+    last = None
+    stable = 0
+    while True:
+        try:
+            probe = tuple(await page.evaluate(_READINESS_PROBE_JS))
+        except Exception:
+            # 页面仍在跳转等情况下 evaluate 会失败，视为未稳定
+            probe = None
+        if probe is not None and probe == last:
+            stable += 1
+        else:
+            stable = 0
+        last = probe
+        now = loop.time()
+        if (stable >= profile.stable_polls and now >= earliest) or now >= deadline:
+            return
+        await asyncio.sleep(profile.poll_interval)
+
+
+async def _render_page(page, url: str) -> Dict[str, any]:
+    """
+    在浏览器池页面中加载 URL，返回渲染后的 HTML 和各阶段耗时（在浏览器池的事件循环中执行）
+
+    不再固定等待，而是轮询 DOM 直到内容稳定；懒加载滚动受时间和距离预算限制，
+    参数可按域名覆盖（见 fetch_strategy.get_readiness_profile）。
+    """
+    profile = get_readiness_profile(url)
+    loop = asyncio.get_running_loop()
+    timings = {}
+    phase_start = loop.time()
+
+    def _mark(phase):
+        nonlocal phase_start
+        now = loop.time()
+        timings[phase] = round(now - phase_start, 3)
+        phase_start = now
+
+    # 访问 URL，并等待完成所有重定向
+    # 使用 domcontentloaded 而不是 networkidle，因为很多网站有持续的网络请求导致 networkidle 永远不会触发
+    timeout = 30000  # 固定超时时间，毫秒
+    try:
+        response = await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+        if profile.wait_networkidle:
+            # 仅对配置的站点等待 networkidle，并设置较短超时
+            try:
+                await page.wait_for_load_state("networkidle", timeout=10000)
+            except Exception:
+                logger.debug(f"networkidle timeout for {url}, continuing with domcontentloaded")
+    except Exception as goto_error:
+        # 如果 domcontentloaded 也失败，尝试使用 commit （最快的等待策略）
+        logger.warning(f"domcontentloaded failed for {url}: {goto_error}, trying with commit")
+        response = await page.goto(url, timeout=timeout, wait_until="commit")
+    _mark('goto')
+
+    # 获取最终 URL（重定向后）
+    final_url = page.url
+
+    if final_url != url:
+        logger.debug(f"URL redirected: {url} -> {final_url}")
+
+    # 等待动态内容稳定
+    await _wait_until_stable(page, profile, profile.max_settle)
+    _mark('settle')
+
+    # 滚动触发懒加载图片
+    if profile.scroll:
+        try:
+            scrolled = await page.evaluate(
+                _BUDGETED_SCROLL_JS, [int(profile.scroll_max_time * 1000), profile.scroll_max_distance]
+            )
+            _mark('scroll')
+            if scrolled:
+                await _wait_until_stable(page, profile, profile.post_scroll_settle)
+                _mark('post_scroll')
+        except Exception as scroll_error:
+            logger.warning(f"Error during page scrolling: {str(scroll_error)}")
+
+    content = await page.content()
+    _mark('extract')
+
+    return {
+        'content': content,
+        'final_url': final_url,
+        'headers': dict(response.headers) if response else None,
+        'timings': timings,
+    }
+
+
+async def fetch(url, task_id=None, is_multimodal=False, use_direct_image_embedding=False, theme="", username=None, article_id=None) -> Dict[str, any]:
     """
     获取页面内容
+
+    页面渲染在共享浏览器池中完成，拿到 HTML 后立即归还页面，
+    正文与图片的处理在调用方的事件循环中进行。
     """
     # 早期检查：跳过空URL
     if not url or not url.strip():
         logger.warning("Skipping empty URL")
         return {"url": url, "text": "", "images": [], "error": "Empty URL"}
-    
+
     logger.debug(f"开始抓取URL: {url[:80]}...")
-    
+
+    async def _handler(page):
+        return await asyncio.wait_for(_render_page(page, url), timeout=PAGE_RENDER_TIMEOUT)
+
+    try:
+        rendered = await browser_pool.run_page(url, _handler)
+    except asyncio.TimeoutError:
+        logger.warning(f"抓取超时 ({PAGE_RENDER_TIMEOUT}s): {url[:80]}")
+        return {"url": url, "text": "", "images": [], "error": "timeout"}
+    except Exception as e:
+        error_message = str(e)
+        # 过滤掉PDF下载的错误日志
+        if "Download is starting" in error_message:
+            # 对于PDF下载，使用debug级别记录，而不是error
+            logger.debug(f"Skipping PDF download for {url}: {error_message}")
+        else:
+            # 其他错误仍然使用error级别记录
+            logger.error(f"Error fetching {url}: {error_message}")
+        return {"url": url, "text": "", "images": [], "error": error_message}
+
+    final_url = rendered['final_url']
+    timings = rendered['timings']
+    process_start = time.monotonic()
     async with aiohttp.ClientSession() as session:
-        # 创建一个新的浏览器上下文
-        try:
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},  # 更大的视口以加载更多内容
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            )
-            
-            # 创建一个新页面
-            page = await context.new_page()
-            
-            # 设置请求拦截器，允许所有请求通过
-            await page.route("**/*", lambda route: route.continue_())
-            
-            # 访问 URL，并等待完成所有重定向
-            # 使用 domcontentloaded 而不是 networkidle，因为很多网站有持续的网络请求导致 networkidle 永远不会触发
-            timeout = 30000  # 固定超时时间，毫秒
-            try:
-                response = await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
-                # 尝试等待 networkidle，但设置较短超时
-                try:
-                    await page.wait_for_load_state("networkidle", timeout=10000)
-                except Exception:
-                    # networkidle 超时不是致命错误，继续处理
-                    logger.debug(f"networkidle timeout for {url}, continuing with domcontentloaded")
-            except Exception as goto_error:
-                # 如果 domcontentloaded 也失败，尝试使用 commit （最快的等待策略）
-                logger.warning(f"domcontentloaded failed for {url}: {goto_error}, trying with commit")
-                response = await page.goto(url, timeout=timeout, wait_until="commit")
-            
-            # 获取最终 URL（重定向后）
-            final_url = page.url
-            
-            if final_url != url:
-                logger.debug(f"URL redirected: {url} -> {final_url}")
-                
-            # 等待页面完全加载，包括动态内容
-            await asyncio.sleep(2)  # 给JavaScript一些时间来加载内容
-            
-            # 尝试滚动页面以加载懒加载图片
-            try:
-                await page.evaluate("""
-                    async () => {
-                        await new Promise((resolve) => {
-                            let totalHeight = 0;
-                            const distance = 300;
-                            const timer = setInterval(() => {
-                                const scrollHeight = document.body.scrollHeight;
-                                window.scrollBy(0, distance);
-                                totalHeight += distance;
-                                
-                                if(totalHeight >= scrollHeight){
-                                    clearInterval(timer);
-                                    resolve();
-                                }
-                            }, 100);
-                        });
-                    }
-                """)
-                await asyncio.sleep(1)  # 给懒加载图片一些时间来加载
-            except Exception as scroll_error:
-                logger.warning(f"Error during page scrolling: {str(scroll_error)}")
-            
-            # 获取页面内容
-            content = await page.content()
-            
-            # 处理页面内容
-            result = await text_from_html(content, session, task_id, is_multimodal, use_direct_image_embedding, theme, final_url, username, article_id)  # 使用最终URL，传递用户名和文章ID
-            result['url'] = final_url  # 使用最终URL而不是原始URL
-            result['original_url'] = url  # 保存原始URL以便跟踪
-            return result
-        except Exception as e:
-            error_message = str(e)
-            # 过滤掉PDF下载的错误日志
-            if "Download is starting" in error_message:
-                # 对于PDF下载，使用debug级别记录，而不是error
-                logger.debug(f"Skipping PDF download for {url}: {error_message}")
-            else:
-                # 其他错误仍然使用error级别记录
-                logger.error(f"Error fetching {url}: {error_message}")
-            return {"url": url, "text": "", "images": [], "error": error_message}
-        finally:
-            await page.close()
-            await context.close()
+        # 处理页面内容
+        result = await text_from_html(rendered['content'], session, task_id, is_multimodal, use_direct_image_embedding, theme, final_url, username, article_id)  # 使用最终URL，传递用户名和文章ID
+    timings['process'] = round(time.monotonic() - process_start, 3)
+    scrape_timings.record(timings)
+    logger.debug(f"[ScrapeTimings] {url[:80]}: {timings}")
+    result['url'] = final_url  # 使用最终URL而不是原始URL
+    result['original_url'] = url  # 保存原始URL以便跟踪
+    result['timings'] = timings
+
+    # 写入抓取缓存，保存主文档的 ETag / Last-Modified 以便后续条件验证
+    if _use_scrape_cache(is_multimodal, use_direct_image_embedding):
+        await scrape_cache.store(url, result, rendered['headers'])
+    return result
+
+# 静态抓取快速路径配置
+STATIC_FETCH_TIMEOUT = 10              # 秒
+STATIC_FETCH_CONCURRENCY = 16          # 静态抓取并发数
+STATIC_FETCH_MAX_BYTES = 5 * 1024 * 1024
+STATIC_FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_\-]+)', re.IGNORECASE)
+
+
+def _decode_html(raw: bytes, header_charset: Optional[str]) -> str:
+    """按 Content-Type / <meta charset> 解码 HTML，国内站点常只在 meta 中声明 gbk"""
+    charset = header_charset
+    if not charset:
+        match = _META_CHARSET_RE.search(raw[:4096])
+        if match:
+            charset = match.group(1).decode('ascii', errors='ignore')
+    try:
+        return raw.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return raw.decode('utf-8', errors='replace')
+
+
+async def fetch_static(session: aiohttp.ClientSession, url: str, task_id=None, is_multimodal=False, use_direct_image_embedding=False, theme="", username=None, article_id=None) -> Optional[Dict[str, any]]:
+    """
+    静态 HTTP 抓取（快速路径）
+
+    页面需要 JS 渲染、非 HTML 或请求失败时返回 None，由调用方升级到浏览器抓取
+    """
+    if not url or not url.strip():
+        return None
+
+    try:
+        async with session.get(
+            url,
+            headers=STATIC_FETCH_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=STATIC_FETCH_TIMEOUT),
+            ssl=False,
+            allow_redirects=True
+        ) as response:
+            if response.status >= 400:
+                logger.debug(f"[StaticFetch] HTTP {response.status}, escalating: {url[:80]}")
+                domain_learner.record(url, False)
+                return None
+            if 'html' not in response.headers.get('Content-Type', '').lower():
+                return None
+            raw = await response.content.read(STATIC_FETCH_MAX_BYTES)
+            html = _decode_html(raw, response.charset)
+            final_url = str(response.url)
+            headers = dict(response.headers)
+    except Exception as e:
+        logger.debug(f"[StaticFetch] Request failed, escalating: {url[:80]}: {e}")
+        domain_learner.record(url, False)
+        return None
+
+    soup = BeautifulSoup(html, 'html.parser')
+    visible_text = " ".join(t.strip() for t in filter(tag_visible, soup.findAll(text=True)) if t.strip())
+    requires_js, reason = needs_javascript(html, visible_text)
+    domain_learner.record(url, not requires_js)
+    if requires_js:
+        logger.info(f"[StaticFetch] Needs browser ({reason}): {url[:80]}")
+        return None
+
+    result = await text_from_html(html, session, task_id, is_multimodal, use_direct_image_embedding, theme, final_url, username, article_id)
+    if not result.get('text'):
+        return None
+    result['url'] = final_url
+    result['original_url'] = url
+    result['fetch_tier'] = 'static'
+
+    if _use_scrape_cache(is_multimodal, use_direct_image_embedding):
+        await scrape_cache.store(url, result, headers)
+    return result
+
 
 async def get_main_content(url_list: List[str], task_id: str = None, is_multimodal: bool = False, use_direct_image_embedding: bool = False, theme: str = "", progress_callback: Optional[callable] = None, username: str = None, article_id: str = None) -> List[Dict[str, any]]:
     """
@@ -1533,63 +1687,106 @@ async def get_main_content(url_list: List[str], task_id: str = None, is_multimod
     :param url_list: URL列表
     :param task_id: 任务ID，如果未提供则使用时间戳
     :param progress_callback: 进度回调函数，接收 (completed_count, total_count)
+
+    抓取过程中加入 FAISS 索引的图片按微批 embedding，结束时刷新剩余队列并保存一次索引。
     """
+    try:
+        return await _get_main_content(url_list, task_id, is_multimodal, use_direct_image_embedding, theme, progress_callback, username, article_id)
+    finally:
+        await close_embedding_batcher(username, article_id)
+
+
+async def _get_main_content(url_list: List[str], task_id: str, is_multimodal: bool, use_direct_image_embedding: bool, theme: str, progress_callback: Optional[callable], username: str, article_id: str):
     get_executor()
 
     logger.info(f"[DEBUG] get_main_content called with: is_multimodal={is_multimodal}, use_direct_image_embedding={use_direct_image_embedding}, url_list={len(url_list)} items")
     logger.info(f"开始抓取 {len(url_list)} 个URL的内容...")
 
-    if async_playwright is None:
+    if task_id is None:
+        task_id = f"task_{int(asyncio.get_event_loop().time())}"
+
+    # 先查抓取缓存，命中的 URL 不再启动浏览器
+    cached_results = []
+    if _use_scrape_cache(is_multimodal, use_direct_image_embedding) and url_list:
+        async with aiohttp.ClientSession() as session:
+            lookups = await asyncio.gather(
+                *[scrape_cache.lookup(url, session) for url in url_list],
+                return_exceptions=True
+            )
+        pending_urls = []
+        for url, cached in zip(url_list, lookups):
+            if isinstance(cached, dict):
+                cached_results.append(cached)
+            else:
+                pending_urls.append(url)
+        logger.info(f"[ScrapeCache] {len(cached_results)}/{len(url_list)} URLs served from cache, stats={scrape_cache.get_stats()}")
+        url_list = pending_urls
+
+    total_count = len(cached_results) + len(url_list)
+    results = list(cached_results)
+    completed_count = len(results)
+
+    def _report_progress():
+        if progress_callback:
+            try:
+                progress_callback(completed_count, total_count)
+            except Exception as e:
+                logger.error(f"Error in progress_callback: {e}")
+
+    if cached_results:
+        _report_progress()
+
+    # 静态抓取快速路径：无需 JS 渲染的页面不启动浏览器
+    static_candidates = [url for url in url_list if domain_learner.should_try_static(url)]
+    if static_candidates:
+        semaphore = asyncio.Semaphore(STATIC_FETCH_CONCURRENCY)
+        static_done = set()
+
+        async with aiohttp.ClientSession() as session:
+            async def _try_static(url):
+                async with semaphore:
+                    return url, await fetch_static(session, url, task_id, is_multimodal=is_multimodal, use_direct_image_embedding=use_direct_image_embedding, theme=theme, username=username, article_id=article_id)
+
+            for future in asyncio.as_completed([_try_static(url) for url in static_candidates]):
+                url, result = await future
+                if result is not None:
+                    results.append(result)
+                    static_done.add(url)
+                    completed_count += 1
+                    _report_progress()
+
+        url_list = [url for url in url_list if url not in static_done]
+        logger.info(f"[StaticFetch] {len(static_done)}/{len(static_candidates)} URLs fetched without browser, {len(url_list)} escalated")
+
+    if not url_list:
+        return results, task_id
+
+    if not browser_pool.available:
         logger.error("Playwright is not installed; skipping page content extraction")
-        if task_id is None:
-            task_id = f"task_{int(asyncio.get_event_loop().time())}"
-        return [
+        return results + [
             {"url": url, "text": "", "images": [], "error": "playwright is not installed"}
             for url in url_list
         ], task_id
-    
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(args=['--no-sandbox'])
+
+    # 浏览器由进程级浏览器池统一管理，并发由池的页面数和单 host 上限控制
+    tasks = [fetch(url, task_id, is_multimodal=is_multimodal, use_direct_image_embedding=use_direct_image_embedding, theme=theme, username=username, article_id=article_id) for url in url_list]
+
+    for future in asyncio.as_completed(tasks):
         try:
-            if task_id is None:
-                task_id = f"task_{int(asyncio.get_event_loop().time())}"
-            
-            tasks = [fetch(browser, url, task_id, is_multimodal=is_multimodal, use_direct_image_embedding=use_direct_image_embedding, theme=theme, username=username, article_id=article_id) for url in url_list]
-            
-            results = []
-            completed_count = 0
-            total_count = len(tasks)
-            
-            # 设置单个任务的超时时间（秒）
-            TASK_TIMEOUT = 60
+            result = await future
+            results.append(result)
+            completed_count += 1
+            logger.info(f"抓取进度: {completed_count}/{total_count} - URL: {result.get('url', 'unknown')[:50]}...")
+        except Exception as e:
+            completed_count += 1
+            logger.error(f"抓取异常: {str(e)}")
+            results.append({"url": "error", "text": "", "images": [], "error": str(e)})
 
-            for future in asyncio.as_completed(tasks):
-                try:
-                    # 为每个任务设置超时
-                    result = await asyncio.wait_for(future, timeout=TASK_TIMEOUT)
-                    results.append(result)
-                    completed_count += 1
-                    logger.info(f"抓取进度: {completed_count}/{total_count} - URL: {result.get('url', 'unknown')[:50]}...")
-                except asyncio.TimeoutError:
-                    completed_count += 1
-                    logger.warning(f"抓取超时 ({TASK_TIMEOUT}s): 任务 {completed_count}/{total_count}")
-                    results.append({"url": "timeout", "text": "", "images": [], "error": "timeout"})
-                except Exception as e:
-                    completed_count += 1
-                    logger.error(f"抓取异常: {str(e)}")
-                    results.append({"url": "error", "text": "", "images": [], "error": str(e)})
-                
-                if progress_callback:
-                    try:
-                        progress_callback(completed_count, total_count)
-                    except Exception as e:
-                        logger.error(f"Error in progress_callback: {e}")
-
-            logger.info(f"抓取完成: 成功 {len([r for r in results if r.get('text')])} / 总计 {total_count}")
-            return results, task_id
-        finally:
-            await asyncio.sleep(0.5)
-            await browser.close()
+        _report_progress()
+
+    logger.info(f"抓取完成: 成功 {len([r for r in results if r.get('text')])} / 总计 {total_count}, browser_pool={browser_pool.get_stats()}")
+    logger.info(f"[ScrapeTimings] Phase stats: {scrape_timings.get_stats()}")
+    return results, task_id
 
 if __name__ == '__main__':
     url_list = ['http://news.china.com.cn/2024-11/18/content_117554263.shtml']
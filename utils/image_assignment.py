@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+章节配图的全局分配
+
+原先每个章节单独检索，再按章节顺序贪心挑选未使用的图片：靠前的章节会先占用
+其实与后面章节更相关的图片。这里把所有章节的候选图片和相似度放在一起，
+按相似度从高到低全局贪心分配（带容量的加权匹配的贪心解）：
+
+- 每张图片最多分配给一个章节
+- 每个章节最多 max_per_chapter 张
+- 相似度低于 threshold 的候选不参与分配
+"""
+
+import logging
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def assign_images(
+    candidates: Sequence[Sequence[Tuple[str, float]]],
+    max_per_chapter: int = 3,
+    threshold: float = 0.0,
+    exclude: Optional[Iterable[str]] = None,
+) -> List[List[Tuple[str, float]]]:
+    """
+    为各章节分配不重复的图片
+
+    Args:
+        candidates: 每个章节的候选列表 [(image_url, similarity), ...]
+        max_per_chapter: 每个章节最多分配的图片数
+        threshold: 相似度阈值
+        exclude: 不参与分配的图片（已使用或不可用）
+
+    Returns:
+        每个章节分配到的 [(image_url, similarity), ...]，按相似度从高到低排列
+    """
+    excluded = set(exclude or ())
+    pairs = []
+    for chapter, chapter_candidates in enumerate(candidates):
+        for image_url, similarity in chapter_candidates:
+            if image_url and image_url not in excluded and similarity >= threshold:
+                pairs.append((similarity, chapter, image_url))
+    # 相似度相同时靠前的章节优先，结果稳定
+    pairs.sort(key=lambda pair: (-pair[0], pair[1]))
+
+    assigned: List[List[Tuple[str, float]]] = [[] for _ in candidates]
+    used = set()
+    for similarity, chapter, image_url in pairs:
+        if image_url in used or len(assigned[chapter]) >= max_per_chapter:
+            continue
+        assigned[chapter].append((image_url, similarity))
+        used.add(image_url)
+
+    logger.debug(f"[ImageAssign] Assigned {len(used)} images to {len(candidates)} chapters from {len(pairs)} candidates")
+    return assigned
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+图片字节内容寻址存储
+
+同一张图片在一次文章生成中最多会被下载三次：
+download_image 下载后做尺寸/质量筛选，Embedding._url_to_data_image 再下载一次转 base64，
+qiniu_utils.upload_image_from_url 转存时又下载一次。本模块把下载到的图片字节
+按内容哈希保存到本地磁盘，三个阶段都先读这里，每张图片只经过一次网络。
+
+- 图片文件：<IMAGE_BLOB_DIR>/<sha256[:2]>/<sha256>，相同内容的不同 URL 共享一个文件
+- 索引：SQLite，记录 URL -> 内容哈希，以及每个文件的大小、类型和最近访问时间
+- 总大小超过 IMAGE_BLOB_MAX_BYTES 时按最近访问时间（LRU）淘汰，
+  超过 IMAGE_BLOB_MAX_AGE 的 URL 映射视为过期
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMAGE_BLOB_DIR = os.getenv('IMAGE_BLOB_DIR', 'data/image_blobs')
+IMAGE_BLOB_MAX_BYTES = int(os.getenv('IMAGE_BLOB_MAX_BYTES', str(1024 * 1024 * 1024)))   # 1GB
+IMAGE_BLOB_MAX_AGE = int(os.getenv('IMAGE_BLOB_MAX_AGE', str(7 * 24 * 3600)))           # 7 天
+IMAGE_BLOB_MAX_ITEM_BYTES = int(os.getenv('IMAGE_BLOB_MAX_ITEM_BYTES', str(20 * 1024 * 1024)))  # 单张 20MB
+IMAGE_BLOB_ENABLED = os.getenv('IMAGE_BLOB_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.strip().encode('utf-8')).hexdigest()
+
+
+class ImageBlobStore:
+    """按 URL 和内容哈希索引的本地图片存储（线程安全）"""
+
+    def __init__(self, directory: str = IMAGE_BLOB_DIR,
+                 max_bytes: int = IMAGE_BLOB_MAX_BYTES,
+                 max_age: int = IMAGE_BLOB_MAX_AGE,
+                 enabled: bool = IMAGE_BLOB_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'dedup_stores': 0,
+            'bytes_saved': 0,
+            'evictions': 0,
+        }
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'),
+                                   check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    url_key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_digest ON urls (digest)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    content_type TEXT,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_accessed ON blobs (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """读取 URL 对应的图片字节和 Content-Type，未命中或出错返回 None"""
+        if not self.enabled or not url:
+            return None
+        try:
+            return self._get(url)
+        except Exception as e:
+            logger.warning(f"[ImageBlobStore] Read failed for {url[:80]}: {e}")
+            return None
+
+    def put(self, url: str, content: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        """保存图片字节，返回内容哈希；相同内容只保存一份，出错返回 None"""
+        if not self.enabled or not url or not content or len(content) > IMAGE_BLOB_MAX_ITEM_BYTES:
+            return None
+        try:
+            return self._put(url, content, content_type)
+        except Exception as e:
+            logger.warning(f"[ImageBlobStore] Write failed for {url[:80]}: {e}")
+            return None
+
+    def _get(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        key = _url_key(url)
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute(
+                "SELECT u.digest, u.stored_at, b.content_type FROM urls u JOIN blobs b ON u.digest = b.digest "
+                "WHERE u.url_key = ?", (key,)
+            ).fetchone()
+            if row and time.time() - row[1] > self.max_age:
+                conn.execute("DELETE FROM urls WHERE url_key = ?", (key,))
+                row = None
+            if not row:
+                self._stats['misses'] += 1
+                return None
+            digest, _, content_type = row
+            try:
+                with open(self._blob_path(digest), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                # 文件被外部删除，清理索引
+                conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+                conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._stats['misses'] += 1
+                return None
+            conn.execute("UPDATE blobs SET accessed_at = ? WHERE digest = ?", (time.time(), digest))
+            self._stats['hits'] += 1
+            self._stats['bytes_saved'] += len(content)
+        return content, content_type
+
+    def _put(self, url: str, content: bytes, content_type: Optional[str]) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            exists = conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if exists:
+                self._stats['dedup_stores'] += 1
+                conn.execute("UPDATE blobs SET accessed_at = ? WHERE digest = ?", (now, digest))
+            else:
+                path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO blobs (digest, size, content_type, accessed_at) VALUES (?, ?, ?, ?)",
+                    (digest, len(content), content_type, now)
+                )
+                self._stats['stores'] += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO urls (url_key, digest, stored_at) VALUES (?, ?, ?)",
+                (_url_key(url), digest, now)
+            )
+            if not exists:
+                self._evict_locked(conn)
+        return digest
+
+    def _evict_locked(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次写入都触发淘汰
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for digest, size in conn.execute("SELECT digest, size FROM blobs ORDER BY accessed_at ASC").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+            total -= size
+            evicted += 1
+        self._stats['evictions'] += evicted
+        logger.info(f"[ImageBlobStore] Evicted {evicted} blobs (LRU), size now {total} bytes")
+
+    async def aget(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """异步读取（在线程中执行文件和 SQLite 操作）"""
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get, url)
+
+    async def aput(self, url: str, content: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        """异步写入"""
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.put, url, content, content_type)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计（含命中率和节省的下载字节数）"""
+        stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 全局实例
+image_blob_store = ImageBlobStore()
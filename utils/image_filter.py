@@ -9,6 +9,7 @@
 """
 
 import re
+import struct
 import logging
 from typing import Optional, Tuple, Dict, List
 from urllib.parse import urlparse, parse_qs
@@ -282,6 +283,94 @@ def is_likely_icon_by_dimensions(width: int, height: int) -> Tuple[bool, str]:
     return False, ""
 
 
+# ============== 容器头解析 ==============
+
+# JPEG SOF 标记（排除 DHT=C4、JPG=C8、DAC=CC）
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def parse_image_header(data: bytes) -> Optional[Tuple[str, int, int]]:
+    """
+    只根据容器头解析图片格式和尺寸，无需完整解码
+
+    支持 PNG (IHDR)、GIF、WebP (VP8 / VP8L / VP8X)、JPEG (SOF)、BMP。
+    数据不足或格式不支持时返回 None，调用方可继续读取更多字节后重试。
+
+    Returns:
+        (format, width, height) 或 None
+    """
+    if len(data) < 10:
+        return None
+
+    # PNG: 8 字节签名 + IHDR 块（宽高位于 16..24）
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        if len(data) >= 24 and data[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', data[16:24])
+            return 'PNG', width, height
+        return None
+
+    # GIF: 逻辑屏幕宽高（小端）
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', data[6:10])
+        return 'GIF', width, height
+
+    # WebP: RIFF....WEBP + 首个块
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        if len(data) < 30:
+            return None
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            # 关键帧起始码 9d 01 2a 后为 14 位宽高
+            if data[23:26] != b'\x9d\x01\x2a':
+                return None
+            width, height = struct.unpack('<HH', data[26:30])
+            return 'WEBP', width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            if data[20] != 0x2F:
+                return None
+            bits = int.from_bytes(data[21:25], 'little')
+            return 'WEBP', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            width = int.from_bytes(data[24:27], 'little') + 1
+            height = int.from_bytes(data[27:30], 'little') + 1
+            return 'WEBP', width, height
+        return None
+
+    # BMP: BITMAPINFOHEADER 宽高
+    if data[:2] == b'BM' and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return 'BMP', abs(width), abs(height)
+
+    # JPEG: 顺序扫描段，直到遇到 SOF
+    if data[:2] == b'\xff\xd8':
+        pos = 2
+        length = len(data)
+        while pos + 4 <= length:
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            # 填充字节
+            if marker == 0xFF:
+                pos += 1
+                continue
+            # 无长度字段的独立标记
+            if marker in (0x01,) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            segment_length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            if marker in _JPEG_SOF_MARKERS:
+                if pos + 9 > length:
+                    return None
+                height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+                return 'JPEG', width, height
+            if marker == 0xDA:  # SOS 之后是图像数据，不会再有 SOF
+                return None
+            pos += 2 + segment_length
+        return None
+
+    return None
+
+
 def is_low_quality_image(
     content: bytes,
     url: str = "",
@@ -329,7 +418,18 @@ def is_low_quality_image(
             logger.debug(f"Image filtered by file size: {file_size} bytes > {MAX_FILE_SIZE} bytes")
             return True, f"file_too_large:{file_size}", image_info
     
-    # 3. 图片尺寸和内容检查
+    # 3. 先根据容器头检查尺寸，大部分图标/小图无需解码即可排除
+    header = parse_image_header(content) if check_dimensions else None
+    if header:
+        image_info['format'], image_info['width'], image_info['height'] = header
+        is_filtered, reason = is_likely_icon_by_dimensions(header[1], header[2])
+        if is_filtered:
+            logger.debug(f"Image filtered by header dimensions: {reason}")
+            return True, f"dimensions:{reason}", image_info
+        if not check_content:
+            return False, "", image_info
+
+    # 4. 图片尺寸和内容检查（仅对通过头部检查的图片解码）
     if (check_dimensions or check_content) and Image:
         try:
             img = Image.open(BytesIO(content))
@@ -370,6 +470,16 @@ def _check_image_content(img: 'Image.Image') -> Tuple[bool, str]:
         (is_filtered, reason)
     """
     try:
+        # 先缩成小图再分析像素，避免对大图做全尺寸解码和逐像素遍历
+        # JPEG 可通过 draft 在解码时直接按 DCT 缩放
+        if img.format == 'JPEG':
+            try:
+                img.draft('RGB', (200, 200))
+            except Exception:
+                pass
+        if img.size[0] * img.size[1] > 200 * 200:
+            img.thumbnail((200, 200))
+
         # 转换为 RGB 模式进行分析
         if img.mode != 'RGB':
             if img.mode == 'RGBA':
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+图片尺寸探测（只读取容器头）
+
+判断图标 / 小图只需要宽高，而宽高就在文件开头的几 KB 中。
+本模块用 HTTP Range 请求（服务器不支持时流式读取并提前中止）读取图片头部，
+通过 image_filter.parse_image_header 解析尺寸，不下载完整图片也不解码像素。
+
+- probe_image(): 探测单张图片
+- probe_images(): 并发探测 URL 列表
+- filter_images_by_header(): URL 特征 + 头部尺寸的批量筛选，供建索引前过滤大量候选图片
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from utils.image_blob_store import image_blob_store
+from utils.image_filter import is_likely_icon_by_dimensions, is_likely_logo_or_icon_by_url, parse_image_header
+
+logger = logging.getLogger(__name__)
+
+PROBE_RANGE_BYTES = 16 * 1024       # 首次 Range 请求的字节数
+PROBE_MAX_BYTES = 128 * 1024        # 最多读取字节数（JPEG 的 EXIF 可能较大）
+PROBE_TIMEOUT = 8                   # 秒
+PROBE_CONCURRENCY = int(os.getenv('IMAGE_PROBE_CONCURRENCY', '32'))
+
+PROBE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+}
+
+
+async def probe_image(session: aiohttp.ClientSession, url: str) -> Dict:
+    """
+    探测图片格式和尺寸
+
+    Returns:
+        {url, format, width, height, bytes_read, error}；无法解析尺寸时 width/height 为 None
+    """
+    result = {'url': url, 'format': None, 'width': None, 'height': None, 'bytes_read': 0, 'error': None}
+
+    # 已下载过的图片直接从本地存储解析
+    blob = await image_blob_store.aget(url)
+    if blob is not None:
+        header = parse_image_header(blob[0][:PROBE_MAX_BYTES])
+        if header:
+            result['format'], result['width'], result['height'] = header
+            return result
+
+    headers = dict(PROBE_HEADERS)
+    headers['Range'] = f"bytes=0-{PROBE_RANGE_BYTES - 1}"
+    try:
+        timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT, connect=5)
+        async with session.get(url, headers=headers, ssl=False, timeout=timeout, allow_redirects=True) as resp:
+            if resp.status not in (200, 206):
+                result['error'] = f"http_{resp.status}"
+                return result
+            content_type = resp.headers.get('Content-Type', '').lower()
+            if content_type and not content_type.startswith('image/') and 'octet-stream' not in content_type:
+                result['error'] = f"not_image:{content_type.split(';')[0]}"
+                return result
+
+            # 服务器忽略 Range 时返回 200 和完整内容，流式读取并在解析出尺寸后中止
+            buffer = bytearray()
+            async for chunk in resp.content.iter_chunked(4096):
+                buffer.extend(chunk)
+                header = parse_image_header(bytes(buffer))
+                if header or len(buffer) >= PROBE_MAX_BYTES:
+                    break
+            result['bytes_read'] = len(buffer)
+            header = parse_image_header(bytes(buffer))
+            if header:
+                result['format'], result['width'], result['height'] = header
+            else:
+                result['error'] = 'unparsed_header'
+    except Exception as e:
+        result['error'] = f"request_failed:{type(e).__name__}"
+    return result
+
+
+async def probe_images(urls: List[str], concurrency: int = PROBE_CONCURRENCY,
+                       session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+    """并发探测多张图片，结果顺序与输入一致"""
+    if not urls:
+        return []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _probe(s, url):
+        async with semaphore:
+            return await probe_image(s, url)
+
+    if session is not None:
+        return list(await asyncio.gather(*[_probe(session, url) for url in urls]))
+    connector = aiohttp.TCPConnector(limit=concurrency, ssl=False)
+    async with aiohttp.ClientSession(connector=connector) as own_session:
+        return list(await asyncio.gather(*[_probe(own_session, url) for url in urls]))
+
+
+async def filter_images_by_header(urls: List[str], concurrency: int = PROBE_CONCURRENCY,
+                                  session: Optional[aiohttp.ClientSession] = None) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    批量筛选图片：URL 特征 + 头部尺寸
+
+    请求失败或不是图片的 URL 被过滤；能访问但头部无法解析（少见格式）的图片保留，
+    交给后续完整解码阶段判断。
+
+    Returns:
+        (valid_urls, filtered_urls_with_reasons)
+    """
+    candidates = []
+    filtered = []
+    for url in urls:
+        is_filtered, reason = is_likely_logo_or_icon_by_url(url)
+        if is_filtered:
+            filtered.append((url, f"url:{reason}"))
+        else:
+            candidates.append(url)
+
+    valid = []
+    for probe in await probe_images(candidates, concurrency, session):
+        url = probe['url']
+        if probe['width'] is not None:
+            is_filtered, reason = is_likely_icon_by_dimensions(probe['width'], probe['height'])
+            if is_filtered:
+                filtered.append((url, f"dimensions:{reason}"))
+                continue
+        elif probe['error'] and probe['error'] != 'unparsed_header':
+            filtered.append((url, probe['error']))
+            continue
+        valid.append(url)
+
+    logger.info(f"[ImageProbe] Header filter: {len(valid)}/{len(urls)} images passed, {len(filtered)} filtered")
+    return valid, filtered
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+搜索结果词法预筛选（BM25）
+
+Search.get_search_result() 原先把全部搜索结果交给大模型判断相关性。
+本模块先对 标题 + 摘要 做 BM25 打分（中文使用 jieba 分词，未安装时退化为字二元组），
+按相对分数把结果分为三档：
+
+- 高分：明显相关，直接保留
+- 中间带：交给 LLM 相关性审核
+- 低分：明显无关，直接丢弃
+
+LLM 只需处理中间带，既减少 token 和延迟，也让 LLM 超时或失败时有确定性的回退结果。
+"""
+
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import jieba
+    jieba.setLogLevel(logging.WARNING)
+except ModuleNotFoundError:
+    jieba = None
+
+logger = logging.getLogger(__name__)
+
+# 相对分数（score / 最高分）阈值
+LEXICAL_HIGH_THRESHOLD = float(os.getenv('LEXICAL_HIGH_THRESHOLD', '0.6'))
+LEXICAL_LOW_THRESHOLD = float(os.getenv('LEXICAL_LOW_THRESHOLD', '0.15'))
+# 预筛选后至少保留的结果数，避免查询词与摘要用词差异较大时误删过多
+LEXICAL_MIN_KEEP = int(os.getenv('LEXICAL_MIN_KEEP', '10'))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r'[a-z0-9][a-z0-9.\-_+]*|[一-鿿]+')
+_CJK_RE = re.compile(r'[一-鿿]')
+
+_STOPWORDS = {
+    '的', '了', '和', '是', '在', '与', '及', '或', '等', '对', '为', '中', '上', '下', '也', '就', '都', '而',
+    '请问', '怎么', '如何', '什么', '哪些', '为什么', '一个', '我们', '你们', '他们', '这个', '那个', '可以',
+    'the', 'a', 'an', 'of', 'to', 'in', 'on', 'for', 'and', 'or', 'is', 'are', 'with', 'how', 'what', 'why',
+}
+
+
+def _cjk_bigrams(text: str) -> List[str]:
+    if len(text) == 1:
+        return [text]
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """中英文混合分词：英文/数字按词，中文使用 jieba 搜索模式或字二元组"""
+    tokens = []
+    for word in _WORD_RE.findall((text or '').lower()):
+        if _CJK_RE.match(word):
+            pieces = jieba.lcut_for_search(word) if jieba is not None else _cjk_bigrams(word)
+        else:
+            pieces = [word]
+        tokens.extend(piece for piece in pieces if piece.strip() and piece not in _STOPWORDS)
+    return tokens
+
+
+class BM25:
+    """Okapi BM25，语料为一次搜索返回的结果"""
+
+    def __init__(self, documents: Sequence[List[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.doc_lens = [len(doc) for doc in documents]
+        self.avg_len = (sum(self.doc_lens) / len(documents)) if documents else 0.0
+        doc_freq = Counter()
+        for freqs in self.term_freqs:
+            doc_freq.update(freqs.keys())
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def score(self, query: List[str]) -> List[float]:
+        """返回每个文档对查询的 BM25 分数"""
+        query_terms = set(query)
+        scores = []
+        for freqs, length in zip(self.term_freqs, self.doc_lens):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_len) if self.avg_len else self.k1
+            total = 0.0
+            for term in query_terms:
+                tf = freqs.get(term)
+                if tf:
+                    total += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(total)
+        return scores
+
+
+def score_search_results(results: List[Dict], query: str) -> List[float]:
+    """
+    计算每条结果（标题 + 摘要）相对于查询的归一化 BM25 分数（0~1，最高分为 1）
+
+    标题词重复一次以提高权重。
+    """
+    if not results:
+        return []
+    documents = []
+    for item in results:
+        title_tokens = tokenize(item.get('title', ''))
+        documents.append(title_tokens * 2 + tokenize(item.get('content', '')))
+    raw_scores = BM25(documents).score(tokenize(query))
+    top = max(raw_scores) if raw_scores else 0.0
+    if top <= 0:
+        return [0.0] * len(results)
+    return [score / top for score in raw_scores]
+
+
+def lexical_prefilter(results: List[Dict], query: str,
+                      high: float = LEXICAL_HIGH_THRESHOLD,
+                      low: float = LEXICAL_LOW_THRESHOLD,
+                      min_keep: int = LEXICAL_MIN_KEEP) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    按 BM25 相对分数将搜索结果分为 (明显相关, 待 LLM 审核, 明显无关)
+
+    每条结果会写入 lexical_score 字段；三组内部均按分数降序排列。
+    查询与所有结果都没有词重叠时，全部交给 LLM 审核。
+    """
+    scores = score_search_results(results, query)
+    for item, score in zip(results, scores):
+        item['lexical_score'] = round(score, 4)
+
+    ranked = sorted(results, key=lambda item: item['lexical_score'], reverse=True)
+    if not ranked or ranked[0]['lexical_score'] <= 0:
+        return [], ranked, []
+
+    confident = [item for item in ranked if item['lexical_score'] >= high]
+    ambiguous = [item for item in ranked if low <= item['lexical_score'] < high]
+    junk = [item for item in ranked if item['lexical_score'] < low]
+
+    # 保底：保留数不足时，从低分组中按分数补入待审核组
+    shortfall = min_keep - len(confident) - len(ambiguous)
+    if shortfall > 0 and junk:
+        ambiguous.extend(junk[:shortfall])
+        junk = junk[shortfall:]
+
+    logger.info(f"[LexicalRank] {len(results)} results -> confident {len(confident)}, "
+                f"ambiguous {len(ambiguous)}, dropped {len(junk)} (jieba={'on' if jieba is not None else 'off'})")
+    return confident, ambiguous, junk
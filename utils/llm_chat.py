@@ -1,11 +1,15 @@
 import openai
+import asyncio
 import time
 import json
+import weakref
 import re
 import uuid
 import logging
 from typing import AsyncGenerator, Optional, Dict, Any, List
 
+from utils.llm_provider_registry import provider_registry
+
 openai.log_level = "warning"
 
 # 需要触发备用模型的错误关键词
@@ -30,25 +34,29 @@ MODEL_TEMPERATURE_CONFIG = {
 # 默认 temperature 值
 DEFAULT_TEMPERATURE = 0.7
 
+# 异步调用时每个提供商的最大并发请求数（与 llm_task 的线程数保持一致）
+PROVIDER_CONCURRENCY_CONFIG = {
+    'glm': 10,
+}
+DEFAULT_PROVIDER_CONCURRENCY = 20
+
+# loop -> {provider: asyncio.Semaphore}，信号量不能跨事件循环使用
+_provider_semaphores = weakref.WeakKeyDictionary()
+
 
 def _get_db_llm_providers() -> Dict[str, Dict[str, Any]]:
     """
-    从数据库获取所有 LLM 提供商配置
+    从数据库获取所有 LLM 提供商配置（经 provider_registry 缓存）
 
     Returns:
         Dict: {provider_id: {api_key, base_url, models: [...]}}
     """
-    try:
-        from backend.api.services.tier_service import TierService
-        return TierService.get_all_provider_credentials()
-    except Exception as e:
-        logging.error(f"从数据库获取 LLM 提供商配置失败: {e}")
-        return {}
+    return provider_registry.get_all_credentials()
 
 
 def _get_db_provider_credentials(provider: str) -> tuple:
     """
-    从数据库获取单个提供商的凭据
+    从数据库获取单个提供商的凭据（经 provider_registry 缓存）
 
     Args:
         provider: 提供商名称
@@ -56,17 +64,13 @@ def _get_db_provider_credentials(provider: str) -> tuple:
     Returns:
         tuple: (api_key, base_url, models) 或 (None, None, None)
     """
-    try:
-        from backend.api.services.tier_service import TierService
-        credentials = TierService.get_provider_credentials(provider)
-        if credentials:
-            return (
-                credentials.get('api_key'),
-                credentials.get('base_url'),
-                credentials.get('models', [])
-            )
-    except Exception as e:
-        logging.debug(f"从数据库获取 {provider} 凭据失败: {e}")
+    credentials = provider_registry.get_credentials(provider)
+    if credentials:
+        return (
+            credentials.get('api_key'),
+            credentials.get('base_url'),
+            credentials.get('models', [])
+        )
     return None, None, None
 
 
@@ -165,29 +169,6 @@ def _call_llm(client, model_name, system_prompt, prompt, max_tokens=8192):
             raise
 
 
-def _get_provider_credentials(provider: str) -> tuple:
-    """
-    获取提供商的凭据（API key 和 base URL）
-
-    仅从数据库获取
-
-    Args:
-        provider: 提供商名称
-
-    Returns:
-        tuple: (api_key, base_url)
-
-    Raises:
-        ValueError: 如果找不到配置
-    """
-    api_key, base_url, _ = _get_db_provider_credentials(provider)
-
-    if not api_key:
-        raise ValueError(f"找不到提供商 {provider} 的配置，请在系统设置中配置 API Key")
-
-    return api_key, base_url
-
-
 def chat(prompt, system_prompt, model_type='deepseek', model_name='deepseek-chat', max_retries=3, max_tokens=8192):
     """
     与LLM模型进行对话，支持备用模型自动切换
@@ -205,11 +186,8 @@ def chat(prompt, system_prompt, model_type='deepseek', model_name='deepseek-chat
 
     while retries < max_retries:
         try:
-            # 获取凭据（从数据库）
-            api_key, base_url = _get_provider_credentials(model_type)
-
-            # 创建API客户端
-            client = openai.OpenAI(api_key=api_key, base_url=base_url)
+            # 获取复用的API客户端（凭据与连接均已缓存）
+            client = provider_registry.get_client(model_type)
 
             # 调用 LLM
             return _call_llm(client, model_name, system_prompt, prompt, max_tokens=max_tokens)
@@ -244,13 +222,8 @@ def chat(prompt, system_prompt, model_type='deepseek', model_name='deepseek-chat
                     logging.warning(f"检测到需要切换备用模型的错误，尝试使用备用模型: {fallback_provider}/{fallback_model}")
 
                     try:
-                        # 获取备用模型凭据
-                        fallback_api_key, fallback_base_url = _get_provider_credentials(fallback_provider)
                         # 使用备用模型重试
-                        fallback_client = openai.OpenAI(
-                            api_key=fallback_api_key,
-                            base_url=fallback_base_url
-                        )
+                        fallback_client = provider_registry.get_client(fallback_provider)
                         result = _call_llm(fallback_client, fallback_model, system_prompt, prompt, max_tokens=max_tokens)
                         logging.info(f"备用模型调用成功: {fallback_provider}/{fallback_model}")
                         return result
@@ -270,6 +243,122 @@ def chat(prompt, system_prompt, model_type='deepseek', model_name='deepseek-chat
     raise ConnectionError(error_message)
 
 
+def _get_provider_semaphore(provider: str) -> asyncio.Semaphore:
+    """获取当前事件循环中提供商的并发限制信号量"""
+    loop = asyncio.get_running_loop()
+    semaphores = _provider_semaphores.setdefault(loop, {})
+    semaphore = semaphores.get(provider)
+    if semaphore is None:
+        limit = PROVIDER_CONCURRENCY_CONFIG.get(provider, DEFAULT_PROVIDER_CONCURRENCY)
+        semaphore = asyncio.Semaphore(limit)
+        semaphores[provider] = semaphore
+    return semaphore
+
+
+async def _acall_llm(client, model_name, system_prompt, prompt, max_tokens=8192):
+    """
+    调用 LLM API 的内部函数（异步版本，逻辑与 _call_llm 一致）
+    """
+    temperature = MODEL_TEMPERATURE_CONFIG.get(model_name, DEFAULT_TEMPERATURE)
+
+    try:
+        response = await client.chat.completions.create(
+            model=model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=temperature,
+            stream=False,
+            extra_body={"thinking": {"type": "disabled"}}
+        )
+        return response.choices[0].message.content
+    except Exception as e:
+        if "'messages[0].role' does not support 'system'" in str(e) or "role" in str(e):
+            combined_prompt = f"{system_prompt}\n\n{prompt}"
+            response = await client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {"role": "user", "content": combined_prompt},
+                ],
+                temperature=temperature,
+                stream=False,
+                extra_body={"thinking": {"type": "disabled"}}
+            )
+            return response.choices[0].message.content
+        else:
+            raise
+
+
+async def _achat_once(provider, model_name, system_prompt, prompt, max_tokens=8192):
+    """在提供商并发限制内发起一次异步调用"""
+    client = await provider_registry.aget_async_client(provider)
+    async with _get_provider_semaphore(provider):
+        return await _acall_llm(client, model_name, system_prompt, prompt, max_tokens=max_tokens)
+
+
+async def achat(prompt, system_prompt, model_type='deepseek', model_name='deepseek-chat', max_retries=3, max_tokens=8192):
+    """
+    chat() 的异步版本，基于 AsyncOpenAI，可在事件循环中直接 await
+    重试、备用模型切换和异常语义与 chat() 保持一致
+    :param prompt: 用户提示词
+    :param system_prompt: 系统提示词
+    :param model_type: 模型类型
+    :param model_name: 模型名称
+    :param max_retries: 最大重试次数
+    :param max_tokens: 最大生成token数
+    :return: 模型回复内容
+    """
+    retries = 0
+    last_error = None
+    used_fallback = False
+
+    while retries < max_retries:
+        try:
+            return await _achat_once(model_type, model_name, system_prompt, prompt, max_tokens=max_tokens)
+
+        except openai.APIError as e:
+            last_error = e
+            logging.error(f"API错误 (尝试 {retries+1}/{max_retries}): {str(e)}")
+        except openai.APIConnectionError as e:
+            last_error = e
+            logging.error(f"API连接错误 (尝试 {retries+1}/{max_retries}): {str(e)}")
+        except openai.RateLimitError as e:
+            last_error = e
+            logging.error(f"API速率限制错误 (尝试 {retries+1}/{max_retries}): {str(e)}")
+            await asyncio.sleep(2 * (retries + 1))
+        except json.JSONDecodeError as e:
+            last_error = e
+            logging.error(f"JSON解析错误 (尝试 {retries+1}/{max_retries}): {str(e)}")
+        except Exception as e:
+            last_error = e
+            logging.error(f"未知错误 (尝试 {retries+1}/{max_retries}): {str(e)}")
+
+        if retries == 0 and not used_fallback and _should_use_fallback(last_error):
+            fallback_config = _get_fallback_config()
+            if fallback_config:
+                fallback_provider = fallback_config['provider']
+                fallback_model = fallback_config['model_name']
+
+                if fallback_provider != model_type or fallback_model != model_name:
+                    logging.warning(f"检测到需要切换备用模型的错误，尝试使用备用模型: {fallback_provider}/{fallback_model}")
+
+                    try:
+                        result = await _achat_once(fallback_provider, fallback_model, system_prompt, prompt, max_tokens=max_tokens)
+                        logging.info(f"备用模型调用成功: {fallback_provider}/{fallback_model}")
+                        return result
+                    except Exception as fallback_error:
+                        logging.error(f"备用模型也失败了: {str(fallback_error)}")
+                        used_fallback = True
+
+        retries += 1
+        if retries < max_retries:
+            await asyncio.sleep(1 * retries)
+
+    error_message = f"LLM模型连接失败: {str(last_error)}"
+    raise ConnectionError(error_message)
+
+
 # =============================================================================
 # LLMChat 类：支持流式响应和思考过程的聊天封装
 # =============================================================================
@@ -350,8 +439,8 @@ class LLMChat:
         if not base_url:
             raise ValueError(f"提供商 {provider} 没有配置 base_url")
 
-        # 创建 OpenAI 客户端
-        client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        # 复用已缓存的 OpenAI 客户端
+        client = provider_registry.get_client(provider)
 
         logging.info(f"LLMChat 初始化: {provider}/{model_name}")
 
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 提供商注册表
+
+进程级缓存，避免每次 chat() 调用都：
+1. 查询 global_llm_providers 表并解密 API key
+2. 新建 openai.OpenAI 客户端（冷启动 HTTP 连接 + TLS 握手）
+
+- 凭据在内存中按 TTL 缓存，管理员修改/删除提供商时主动失效
+- 每个 (provider, base_url, api_key) 复用一个长连接的 OpenAI / AsyncOpenAI 客户端
+- AsyncOpenAI 客户端与事件循环绑定，按 loop 分别缓存
+- 记录命中/未命中计数，便于观察缓存效果
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# 凭据缓存有效期（秒）。本进程内的管理员修改会立即失效，
+# 其他进程（如 arq worker）最多在 TTL 后读到新配置
+PROVIDER_CREDENTIALS_TTL = 60.0
+
+
+class LLMProviderRegistry:
+    """LLM 提供商凭据与客户端的进程级缓存"""
+
+    def __init__(self, ttl: float = PROVIDER_CREDENTIALS_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        # provider -> (expires_at, {api_key, base_url, models})
+        self._credentials: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # (expires_at, {provider_id: {...}})
+        self._all_credentials: Optional[Tuple[float, Dict[str, Dict[str, Any]]]] = None
+        # (provider, base_url, api_key) -> openai.OpenAI
+        self._clients: Dict[Tuple[str, str, str], openai.OpenAI] = {}
+        # loop -> {(provider, base_url, api_key): openai.AsyncOpenAI}
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._stats = {
+            'credential_hits': 0,
+            'credential_misses': 0,
+            'client_hits': 0,
+            'client_misses': 0,
+            'invalidations': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 凭据
+    # ------------------------------------------------------------------
+
+    def get_credentials(self, provider: str) -> Optional[Dict[str, Any]]:
+        """
+        获取提供商凭据（带 TTL 缓存）
+
+        Returns:
+            {api_key, base_url, models} 或 None（未配置/未启用）
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._credentials.get(provider)
+            if cached and cached[0] > now:
+                self._stats['credential_hits'] += 1
+                return cached[1]
+            self._stats['credential_misses'] += 1
+
+        credentials = self._load_credentials(provider)
+
+        # 未找到的提供商不缓存，管理员配置后可立即生效
+        if credentials:
+            with self._lock:
+                self._credentials[provider] = (now + self.ttl, credentials)
+        return credentials
+
+    def get_all_credentials(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有已启用提供商的凭据（带 TTL 缓存）"""
+        now = time.monotonic()
+        with self._lock:
+            if self._all_credentials and self._all_credentials[0] > now:
+                self._stats['credential_hits'] += 1
+                return self._all_credentials[1]
+            self._stats['credential_misses'] += 1
+
+        providers = self._load_all_credentials()
+
+        if providers:
+            with self._lock:
+                self._all_credentials = (now + self.ttl, providers)
+        return providers
+
+    @staticmethod
+    def _load_credentials(provider: str) -> Optional[Dict[str, Any]]:
+        try:
+            from backend.api.services.tier_service import TierService
+            credentials = TierService.get_provider_credentials(provider)
+            if credentials:
+                return {
+                    'api_key': credentials.get('api_key'),
+                    'base_url': credentials.get('base_url'),
+                    'models': credentials.get('models', []),
+                }
+        except Exception as e:
+            logger.debug(f"从数据库获取 {provider} 凭据失败: {e}")
+        return None
+
+    @staticmethod
+    def _load_all_credentials() -> Dict[str, Dict[str, Any]]:
+        try:
+            from backend.api.services.tier_service import TierService
+            return TierService.get_all_provider_credentials()
+        except Exception as e:
+            logger.error(f"从数据库获取 LLM 提供商配置失败: {e}")
+            return {}
+
+    # ------------------------------------------------------------------
+    # 客户端
+    # ------------------------------------------------------------------
+
+    def _client_key(self, provider: str) -> Tuple[str, str, str]:
+        credentials = self.get_credentials(provider)
+        api_key = credentials.get('api_key') if credentials else None
+        if not api_key:
+            raise ValueError(f"找不到提供商 {provider} 的配置，请在系统设置中配置 API Key")
+        return provider, credentials.get('base_url') or '', api_key
+
+    def get_client(self, provider: str) -> openai.OpenAI:
+        """
+        获取提供商的同步客户端（复用连接池）
+
+        Raises:
+            ValueError: 如果找不到配置
+        """
+        key = self._client_key(provider)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._stats['client_hits'] += 1
+                return client
+            self._stats['client_misses'] += 1
+            client = openai.OpenAI(api_key=key[2], base_url=key[1] or None)
+            self._clients[key] = client
+            return client
+
+    def get_async_client(self, provider: str) -> openai.AsyncOpenAI:
+        """
+        获取提供商的异步客户端（复用连接池）
+
+        httpx 的异步连接不能跨事件循环使用，因此按当前运行的 loop 分别缓存。
+
+        Raises:
+            ValueError: 如果找不到配置
+            RuntimeError: 如果不在事件循环中调用
+        """
+        key = self._client_key(provider)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            loop_clients = self._async_clients.setdefault(loop, {})
+            client = loop_clients.get(key)
+            if client is not None:
+                self._stats['client_hits'] += 1
+                return client
+            self._stats['client_misses'] += 1
+            client = openai.AsyncOpenAI(api_key=key[2], base_url=key[1] or None)
+            loop_clients[key] = client
+            return client
+
+    async def aget_async_client(self, provider: str) -> openai.AsyncOpenAI:
+        """
+        在事件循环中获取异步客户端
+
+        凭据未命中缓存时，数据库查询放到线程中执行，避免阻塞事件循环。
+        """
+        with self._lock:
+            cached = self._credentials.get(provider)
+            fresh = cached is not None and cached[0] > time.monotonic()
+        if not fresh:
+            await asyncio.to_thread(self.get_credentials, provider)
+        return self.get_async_client(provider)
+
+    # ------------------------------------------------------------------
+    # 失效与统计
+    # ------------------------------------------------------------------
+
+    def invalidate(self, provider: Optional[str] = None):
+        """
+        使缓存失效
+
+        Args:
+            provider: 提供商标识，为 None 时清空全部缓存
+
+        旧客户端只从缓存中移除而不主动关闭，正在进行的请求可以正常完成。
+        """
+        with self._lock:
+            self._stats['invalidations'] += 1
+            self._all_credentials = None
+            if provider is None:
+                self._credentials.clear()
+                self._clients.clear()
+                self._async_clients.clear()
+            else:
+                self._credentials.pop(provider, None)
+                for key in [k for k in self._clients if k[0] == provider]:
+                    del self._clients[key]
+                for loop_clients in self._async_clients.values():
+                    for key in [k for k in loop_clients if k[0] == provider]:
+                        del loop_clients[key]
+        logger.info(f"LLM 提供商缓存已失效: {provider or 'all'}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_providers'] = len(self._credentials)
+            stats['sync_clients'] = len(self._clients)
+            stats['async_clients'] = sum(len(c) for c in self._async_clients.values())
+        return stats
+
+
+# 全局实例
+provider_registry = LLMProviderRegistry()
@@ -23,6 +23,8 @@ from urllib.parse import urlparse
 
 import requests
 
+from utils.image_blob_store import image_blob_store
+
 try:
     import streamlit as st  # type: ignore
 except Exception:  # pragma: no cover
@@ -201,9 +203,15 @@ def upload_image_from_url(image_url: str) -> Optional[str]:
             'Connection': 'keep-alive',
         }
         
-        resp = requests.get(image_url, timeout=15, stream=True, headers=headers, verify=False)
-        resp.raise_for_status()
-        content = resp.content
+        # Reuse bytes already downloaded during scraping/embedding when available
+        blob = image_blob_store.get(image_url)
+        if blob is not None:
+            content = blob[0]
+        else:
+            resp = requests.get(image_url, timeout=15, stream=True, headers=headers, verify=False)
+            resp.raise_for_status()
+            content = resp.content
+            image_blob_store.put(image_url, content, resp.headers.get('Content-Type'))
 
         # Decide key
         ext = _guess_ext_from_url(image_url)
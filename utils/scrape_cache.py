@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+网页抓取结果持久化缓存
+
+Playwright 抓取一个页面通常需要数秒（新建上下文、等待加载、滚动懒加载），
+而相同主题的文章会反复抓取同一批热门 URL。本模块将抓取结果（正文 + 图片列表）
+按规范化 URL 的哈希持久化到 SQLite，命中时完全跳过浏览器。
+
+- 键：sha256(normalize_url(url))，与 searxng_utils 使用同一规范化规则
+- 新鲜期（SCRAPE_CACHE_FRESH_TTL）内直接返回
+- 超过新鲜期但未超过最长保留期（SCRAPE_CACHE_MAX_AGE）时，
+  使用 ETag / Last-Modified 发起条件请求，304 则续期并返回
+- 总大小超过 SCRAPE_CACHE_MAX_BYTES 时按最近访问时间（LRU）淘汰
+- 记录命中、未命中、重新验证等统计
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from utils.url_utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_CACHE_PATH = os.getenv('SCRAPE_CACHE_PATH', 'data/scrape_cache/cache.sqlite3')
+SCRAPE_CACHE_FRESH_TTL = int(os.getenv('SCRAPE_CACHE_FRESH_TTL', str(6 * 3600)))     # 6 小时内无需验证
+SCRAPE_CACHE_MAX_AGE = int(os.getenv('SCRAPE_CACHE_MAX_AGE', str(7 * 24 * 3600)))    # 最长保留 7 天
+SCRAPE_CACHE_MAX_BYTES = int(os.getenv('SCRAPE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))  # 512MB
+SCRAPE_CACHE_ENABLED = os.getenv('SCRAPE_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+# 条件请求超时（秒）
+REVALIDATE_TIMEOUT = 8
+
+_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def _cache_key(url: str) -> str:
+    """规范化 URL 后取哈希作为缓存键"""
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class ScrapeCache:
+    """基于 SQLite 的抓取结果缓存（线程安全）"""
+
+    def __init__(self, path: str = SCRAPE_CACHE_PATH,
+                 fresh_ttl: int = SCRAPE_CACHE_FRESH_TTL,
+                 max_age: int = SCRAPE_CACHE_MAX_AGE,
+                 max_bytes: int = SCRAPE_CACHE_MAX_BYTES):
+        self.path = path
+        self.fresh_ttl = fresh_ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'stale': 0,
+            'stores': 0,
+            'evictions': 0,
+        }
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    # ------------------------------------------------------------------
+    # 同步存取（在线程中执行）
+    # ------------------------------------------------------------------
+
+    def get_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目，超过最长保留期的条目视为不存在"""
+        key = _cache_key(url)
+        with self._lock:
+            row = self._get_conn().execute(
+                "SELECT url, etag, last_modified, payload, fetched_at FROM pages WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if not row:
+                return None
+            if time.time() - row[4] > self.max_age:
+                self._get_conn().execute("DELETE FROM pages WHERE key = ?", (key,))
+                return None
+        return {
+            'key': key,
+            'url': row[0],
+            'etag': row[1],
+            'last_modified': row[2],
+            'result': json.loads(row[3]),
+            'fetched_at': row[4],
+        }
+
+    def touch(self, key: str, refreshed: bool = False):
+        """更新访问时间；refreshed=True 时同时续期新鲜期"""
+        now = time.time()
+        with self._lock:
+            if refreshed:
+                self._get_conn().execute(
+                    "UPDATE pages SET accessed_at = ?, fetched_at = ? WHERE key = ?", (now, now, key)
+                )
+            else:
+                self._get_conn().execute(
+                    "UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+
+    def put(self, url: str, result: Dict[str, Any], etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        """写入抓取结果并按 LRU 控制总大小"""
+        payload = json.dumps({
+            'text': result.get('text', ''),
+            'images': result.get('images', []),
+            'url': result.get('url', url),
+        }, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (key, url, etag, last_modified, payload, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (_cache_key(url), url, etag, last_modified, payload, size, now, now)
+            )
+            self._stats['stores'] += 1
+            self._evict_locked(conn)
+
+    def _evict_locked(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次写入都触发淘汰
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM pages ORDER BY accessed_at ASC").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._stats['evictions'] += evicted
+        logger.info(f"[ScrapeCache] Evicted {evicted} entries (LRU), size now {total} bytes")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._get_conn().execute("DELETE FROM pages")
+
+    # ------------------------------------------------------------------
+    # 异步接口
+    # ------------------------------------------------------------------
+
+    async def lookup(self, url: str, session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存，必要时通过条件请求重新验证
+
+        Returns:
+            与 fetch() 返回格式一致的结果字典，未命中返回 None
+        """
+        try:
+            entry = await asyncio.to_thread(self.get_entry, url)
+        except Exception as e:
+            logger.warning(f"[ScrapeCache] Lookup failed for {url[:80]}: {e}")
+            return None
+
+        if entry is None:
+            self._stats['misses'] += 1
+            return None
+
+        age = time.time() - entry['fetched_at']
+        if age <= self.fresh_ttl:
+            self._stats['hits'] += 1
+            await asyncio.to_thread(self.touch, entry['key'])
+            logger.info(f"[ScrapeCache] Hit (age={int(age)}s): {url[:80]}")
+            return self._to_result(url, entry)
+
+        if (entry['etag'] or entry['last_modified']) and await self._revalidate(url, entry, session):
+            self._stats['hits'] += 1
+            self._stats['revalidated'] += 1
+            await asyncio.to_thread(self.touch, entry['key'], True)
+            logger.info(f"[ScrapeCache] Revalidated (304): {url[:80]}")
+            return self._to_result(url, entry)
+
+        self._stats['stale'] += 1
+        self._stats['misses'] += 1
+        return None
+
+    async def store(self, url: str, result: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        """异步写入缓存，仅缓存成功且有正文的结果"""
+        if not result or result.get('error') or not result.get('text'):
+            return
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        try:
+            await asyncio.to_thread(
+                self.put, url, result, headers.get('etag'), headers.get('last-modified')
+            )
+        except Exception as e:
+            logger.warning(f"[ScrapeCache] Store failed for {url[:80]}: {e}")
+
+    @staticmethod
+    async def _revalidate(url: str, entry: Dict[str, Any], session: aiohttp.ClientSession) -> bool:
+        """发起条件 GET，返回内容是否未变化"""
+        headers = {'User-Agent': _USER_AGENT}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            async with session.get(url, headers=headers, allow_redirects=True,
+                                   timeout=aiohttp.ClientTimeout(total=REVALIDATE_TIMEOUT)) as response:
+                return response.status == 304
+        except Exception as e:
+            logger.debug(f"[ScrapeCache] Revalidation failed for {url[:80]}: {e}")
+            return False
+
+    @staticmethod
+    def _to_result(url: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        cached = entry['result']
+        return {
+            'url': cached.get('url') or url,
+            'original_url': url,
+            'text': cached.get('text', ''),
+            'images': list(cached.get('images', [])),
+            'from_cache': True,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计（含命中率）"""
+        stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 全局实例
+scrape_cache = ScrapeCache()
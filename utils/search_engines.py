@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+多搜索引擎并发查询
+
+Search.query_search() 原先依次调用 DDGS 和 Serper，总耗时为各引擎之和。
+本模块把各引擎封装为统一接口并在线程池中并发执行：
+
+- 每个引擎有独立的截止时间，超时的引擎被放弃，只返回已完成引擎的结果
+- 已有引擎返回足够结果后，其余引擎最多再等待一个宽限期，
+  搜索耗时由最快的可用引擎决定，而不是各引擎之和
+- 结果按完成顺序通过回调增量合并
+- 按引擎记录延迟和结果数直方图
+
+引擎列表由 SEARCH_ENGINES 环境变量控制（默认 ddgs,serper）；
+sougou 和 searxng（需配置 SEARXNG_URL）为可选引擎。
+"""
+
+import bisect
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SEARCH_ENGINES = [name.strip() for name in os.getenv('SEARCH_ENGINES', 'ddgs,serper').split(',') if name.strip()]
+SEARXNG_URL = os.getenv('SEARXNG_URL', '')
+
+# 各引擎默认截止时间（秒）
+ENGINE_DEADLINES = {
+    'ddgs': float(os.getenv('SEARCH_DDGS_DEADLINE', '12')),
+    'serper': float(os.getenv('SEARCH_SERPER_DEADLINE', '10')),
+    'sougou': float(os.getenv('SEARCH_SOUGOU_DEADLINE', '8')),
+    'searxng': float(os.getenv('SEARCH_SEARXNG_DEADLINE', '8')),
+}
+DEFAULT_ENGINE_DEADLINE = 10.0
+
+# 已获得足够结果后，其余引擎的最长宽限期（秒）
+SEARCH_GRACE_PERIOD = float(os.getenv('SEARCH_GRACE_PERIOD', '2'))
+SEARCH_ENOUGH_RESULTS = int(os.getenv('SEARCH_ENOUGH_RESULTS', '20'))
+
+# 直方图分桶
+LATENCY_BUCKETS = [0.5, 1, 2, 3, 5, 8, 13, 20]
+COUNT_BUCKETS = [0, 1, 5, 10, 20, 30, 50]
+
+# 超时引擎的线程不会被强制终止，线程池需要留出余量
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix='search-engine')
+
+
+class SearchEngine(ABC):
+    """搜索引擎接口：search() 返回统一格式 {title, url, content, score, source}"""
+
+    name = 'base'
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline if deadline is not None else ENGINE_DEADLINES.get(self.name, DEFAULT_ENGINE_DEADLINE)
+
+    @abstractmethod
+    def search(self, query: str, max_results: int) -> List[Dict]:
+        ...
+
+
+class DDGSEngine(SearchEngine):
+    name = 'ddgs'
+
+    def search(self, query: str, max_results: int) -> List[Dict]:
+        from utils.ddgs_utils import search_ddgs
+        raw_results = search_ddgs(query, search_type="text", max_results=max_results)
+        return [
+            {
+                'title': item.get('title', ''),
+                'url': item.get('href', ''),  # DDGS 使用 'href'
+                'content': item.get('body', ''),  # DDGS 使用 'body'
+                'score': 1.0 - idx * 0.03,  # 根据位置计算分数
+                'source': self.name,
+            }
+            for idx, item in enumerate(raw_results)
+        ]
+
+
+class SerperEngine(SearchEngine):
+    name = 'serper'
+
+    def __init__(self, api_key: str, deadline: Optional[float] = None):
+        super().__init__(deadline)
+        self.api_key = api_key
+
+    def search(self, query: str, max_results: int) -> List[Dict]:
+        from utils.serper_search import serper_search
+        # Serper 固定返回约 10 条，时间范围一年内
+        return serper_search(api_key=self.api_key, query=query, gl="cn", hl="zh-cn", time_range="y") or []
+
+
+class SougouEngine(SearchEngine):
+    """搜狗微信搜索，只有标题和链接"""
+
+    name = 'sougou'
+
+    def search(self, query: str, max_results: int) -> List[Dict]:
+        from utils.sougou_search import query_search
+        return [
+            {
+                'title': item.get('title', ''),
+                'url': item.get('url', ''),
+                'content': '',
+                'score': 1.0 - idx * 0.05,
+                'source': self.name,
+            }
+            for idx, item in enumerate(query_search(query, max_results=max_results))
+        ]
+
+
+class SearxngEngine(SearchEngine):
+    """自建 SearXNG 实例（JSON API）"""
+
+    name = 'searxng'
+
+    def __init__(self, base_url: str = SEARXNG_URL, deadline: Optional[float] = None):
+        super().__init__(deadline)
+        self.base_url = base_url.rstrip('/')
+
+    def search(self, query: str, max_results: int) -> List[Dict]:
+        response = requests.get(
+            f"{self.base_url}/search",
+            params={'q': query, 'format': 'json', 'language': 'zh-CN'},
+            timeout=self.deadline,
+        )
+        response.raise_for_status()
+        results = response.json().get('results', [])[:max_results]
+        return [
+            {
+                'title': item.get('title', ''),
+                'url': item.get('url', ''),
+                'content': item.get('content', ''),
+                'score': 1.0 - idx * 0.03,
+                'source': self.name,
+            }
+            for idx, item in enumerate(results)
+        ]
+
+
+def build_engines(serper_api_key: Optional[str] = None, names: Optional[List[str]] = None) -> List[SearchEngine]:
+    """按配置构建引擎列表，缺少必要配置的引擎会被跳过"""
+    engines = []
+    for name in names or SEARCH_ENGINES:
+        if name == 'ddgs':
+            engines.append(DDGSEngine())
+        elif name == 'serper':
+            if serper_api_key:
+                engines.append(SerperEngine(serper_api_key))
+            else:
+                logger.info("Serper API Key 未配置，跳过 Serper 搜索")
+        elif name == 'sougou':
+            engines.append(SougouEngine())
+        elif name == 'searxng':
+            if SEARXNG_URL:
+                engines.append(SearxngEngine())
+            else:
+                logger.info("SEARXNG_URL 未配置，跳过 SearXNG 搜索")
+        else:
+            logger.warning(f"[SearchEngines] Unknown engine: {name}")
+    return engines
+
+
+class _Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.samples = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.samples += 1
+
+    def snapshot(self) -> Dict:
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.samples,
+            'avg': round(self.total / self.samples, 3) if self.samples else 0.0,
+        }
+
+
+class SearchEngineMetrics:
+    """按引擎记录延迟和结果数直方图（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Dict] = {}
+
+    def _get(self, name: str) -> Dict:
+        stats = self._engines.get(name)
+        if stats is None:
+            stats = {
+                'latency': _Histogram(LATENCY_BUCKETS),
+                'results': _Histogram(COUNT_BUCKETS),
+                'errors': 0,
+                'timeouts': 0,
+            }
+            self._engines[name] = stats
+        return stats
+
+    def observe(self, name: str, latency: float, result_count: int):
+        with self._lock:
+            stats = self._get(name)
+            stats['latency'].observe(latency)
+            stats['results'].observe(result_count)
+
+    def record_error(self, name: str):
+        with self._lock:
+            self._get(name)['errors'] += 1
+
+    def record_timeout(self, name: str):
+        with self._lock:
+            self._get(name)['timeouts'] += 1
+
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {
+                    'latency': stats['latency'].snapshot(),
+                    'results': stats['results'].snapshot(),
+                    'errors': stats['errors'],
+                    'timeouts': stats['timeouts'],
+                }
+                for name, stats in self._engines.items()
+            }
+
+
+def run_engines(engines: List[SearchEngine], query: str, max_results: int,
+                on_results: Callable[[str, List[Dict]], None],
+                enough_results: int = SEARCH_ENOUGH_RESULTS,
+                grace_period: float = SEARCH_GRACE_PERIOD) -> Dict[str, int]:
+    """
+    并发执行多个搜索引擎
+
+    每个引擎完成时调用 on_results(engine_name, results) 增量合并；
+    超过各自截止时间的引擎被放弃。累计结果达到 enough_results 后，
+    其余引擎最多再等待 grace_period 秒。
+
+    Returns:
+        各引擎返回的结果数（超时或失败的引擎为 0）
+    """
+    start = time.monotonic()
+    counts = {engine.name: 0 for engine in engines}
+
+    def _run(engine):
+        engine_start = time.monotonic()
+        results = engine.search(query, max_results)
+        return results, time.monotonic() - engine_start
+
+    pending = {_EXECUTOR.submit(_run, engine): engine for engine in engines}
+    deadlines = {future: start + engine.deadline for future, engine in pending.items()}
+    collected = 0
+    cutoff = None
+
+    while pending:
+        now = time.monotonic()
+        wait_until = min(deadlines[future] for future in pending)
+        if cutoff is not None:
+            wait_until = min(wait_until, cutoff)
+        done, _ = concurrent.futures.wait(
+            pending, timeout=max(0.0, wait_until - now), return_when=concurrent.futures.FIRST_COMPLETED
+        )
+
+        for future in done:
+            engine = pending.pop(future)
+            try:
+                results, latency = future.result()
+            except Exception as e:
+                search_metrics.record_error(engine.name)
+                logger.error(f"{engine.name} 搜索失败: {e}")
+                continue
+            search_metrics.observe(engine.name, latency, len(results))
+            counts[engine.name] = len(results)
+            collected += len(results)
+            logger.info(f"{engine.name} 搜索结果: {len(results)} 条 ({latency:.2f}s)")
+            on_results(engine.name, results)
+
+        if cutoff is None and collected >= enough_results and pending:
+            cutoff = time.monotonic() + grace_period
+
+        now = time.monotonic()
+        for future in list(pending):
+            if now >= deadlines[future] or (cutoff is not None and now >= cutoff):
+                engine = pending.pop(future)
+                future.cancel()
+                search_metrics.record_timeout(engine.name)
+                search_metrics.observe(engine.name, now - start, 0)
+                logger.warning(f"{engine.name} 搜索超时 ({now - start:.1f}s)，使用其他引擎的部分结果")
+
+    logger.info(f"[SearchEngines] {len(engines)} engines finished in {time.monotonic() - start:.2f}s: {counts}")
+    return counts
+
+
+# 全局实例
+search_metrics = SearchEngineMetrics()
@@ -16,7 +16,7 @@ import hashlib
 import threading
 import asyncio
 import concurrent.futures
-from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from urllib.parse import urlparse
 from utils.image_filter import should_skip_image_url, filter_image_urls
 
 # 配置日志
@@ -31,73 +31,14 @@ logger = logging.getLogger(__name__)
 # 禁用SSL警告
 urllib3.disable_warnings()
 
-# ----------------------
-# URL 规范化与相似性判断工具（替代 sougou_search）
-# ----------------------
-def normalize_url(url: str) -> str:
-    """将 URL 进行规范化，便于去重与相似性判断。
-    规则：
-    - 小写 scheme 和 host
-    - 去除 fragment
-    - 去除常见追踪参数（utm_*、gclid、fbclid 等）
-    - 规范化路径的多余斜杠与结尾斜杠
-    - 对于无效 URL，返回原始字符串以避免崩溃
-    """
-    try:
-        pr = urlparse(url)
-        scheme = (pr.scheme or 'http').lower()
-        netloc = pr.netloc.lower()
-
-        # 规范化路径：去除多余斜杠
-        path = re.sub(r'/+', '/', pr.path or '/')
-        # 移除结尾斜杠，根路径保留 '/'
-        if path != '/' and path.endswith('/'):
-            path = path[:-1]
-
-        # 清理查询参数
-        tracking_keys = {
-            'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
-            'gclid', 'fbclid', 'igshid', 'spm', 'mkt_tok'
-        }
-        query_pairs = [(k, v) for k, v in parse_qsl(pr.query, keep_blank_values=True) if k not in tracking_keys]
-        # 按键排序，避免顺序影响去重
-        query_pairs.sort(key=lambda x: x[0])
-        query = urlencode(query_pairs, doseq=True)
-
-        # 去除 fragment
-        fragment = ''
-
-        normalized = urlunparse((scheme, netloc, path, '', query, fragment))
-        return normalized
-    except Exception:
-        return url
-
-
-def is_similar_url(a: str, b: str) -> bool:
-    """判断两个 URL 是否相似。
-    规则：
-    - 完全相等直接相似
-    - 域名与路径相同（忽略查询参数顺序与追踪参数）判定为相似
-    - 常见的 www 前缀差异等也视为相似
-    """
-    na = normalize_url(a)
-    nb = normalize_url(b)
-    if na == nb:
-        return True
-    pra, prb = urlparse(na), urlparse(nb)
-    # 去掉 www 前缀对比
-    host_a = pra.netloc[4:] if pra.netloc.startswith('www.') else pra.netloc
-    host_b = prb.netloc[4:] if prb.netloc.startswith('www.') else prb.netloc
-    if host_a != host_b:
-        return False
-    # 路径一致则认为相似（查询参数差异忽略）
-    return pra.path == prb.path
+# URL 规范化与相似性判断工具（实现位于 utils.url_utils，此处保留导出以兼容旧调用）
+from utils.url_utils import normalize_url, is_similar_url
 
 # 本地导入
 import settings
 from settings import base_path, LLM_MODEL, DEFAULT_SPIDER_NUM, SERPER_API_KEY
 from grab_html_content import get_main_content
-from utils.llm_chat import chat
+from utils.llm_chat import chat, achat
 import prompt_template
 from utils.embedding_utils import (
     Embedding,
@@ -107,13 +48,17 @@ from utils.embedding_utils import (
 )
 from utils.embedding_utils import create_faiss_index
 from utils.image_search_indexer import index_ddgs_images, fetch_ddgs_images
-from utils.serper_search import serper_search
-from utils.ddgs_utils import search_ddgs
+from utils.search_engines import build_engines, run_engines
+from utils.lexical_rank import lexical_prefilter
 
 max_workers = 20
 
 SERPER_RESULT_LIMIT = 10  # 固定保留的 Serper 搜索结果数量
 
+# LLM 相关性审核超时（秒），超时后对中间带结果使用 BM25 分数的确定性回退
+LLM_FILTER_TIMEOUT = 30
+LLM_FILTER_FALLBACK_SCORE = 0.3  # 回退时中间带保留的最低 BM25 相对分数
+
 # 注意：不再使用全局URL去重，改为任务级别的去重，确保每次文章生成都是独立的搜索
 # GLOBAL_PROCESSED_URLS = set()  # 已移除全局去重
 
@@ -141,30 +86,16 @@ def process_result(content, question, output_type=prompt_template.ARTICLE, model
 
 from typing import Optional
 
-def llm_task(search_result, question, output_type, model_type, model_name, max_workers=20, progress_callback: Optional[callable] = None):
+MAX_CONTENT_LENGTH = 80000  # 128K模型支持更长上下文，提高到80K字符
+
+
+def _prepare_llm_chunks(search_result, question):
     """
-    使用线程池并发处理搜索结果，并提供进度回调
+    按相关性排序搜索结果，并将较短内容合并为不超过 MAX_CONTENT_LENGTH 的块
     :param search_result: 搜索结果列表
     :param question: 查询问题
-    :param output_type: 输出类型
-    :param model_type: 模型类型
-    :param model_name: 模型名称
-    :param max_workers: 最大线程数
-    :param progress_callback: 进度回调函数，接收 (completed_count, total_count)
-    :return: 处理后的结果
+    :return: 合并后的待处理列表
     """
-    if model_type == 'glm':
-        max_workers = 10
-    
-    task_description = ""
-    if "---任务---" in output_type:
-        task_parts = output_type.split("---任务---")
-        if len(task_parts) > 1:
-            task_description = task_parts[1].split("---")[0].strip()
-    
-    logger.info(f"开始处理LLM任务: 模型={model_type}/{model_name}, 任务类型=---任务---{task_description}---, 搜索结果数量={len(search_result)}")
-    
-    MAX_CONTENT_LENGTH = 80000  # 128K模型支持更长上下文，提高到80K字符
     optimized_search_result = []
     current_chunk = ""
     current_titles = []
@@ -269,6 +200,53 @@ def llm_task(search_result, question, output_type, model_type, model_name, max_w
     logger.info(f"搜索结果优化: 原始数量={len(search_result)}, 优化后数量={len(optimized_search_result)}, "
                 f"前5相关性得分={top_relevance}, 字数变化={length_diff:+}, "
                 f"原字数={original_length}, 优字数={optimized_length}")
+    return optimized_search_result
+
+
+def _merge_llm_results(results, output_type):
+    """
+    合并各块的 LLM 处理结果
+    :param results: 结果列表
+    :param output_type: 输出类型
+    :return: 合并后的文本
+    """
+    if output_type == prompt_template.ARTICLE_OUTLINE_GEN:
+        outlines = '\n'.join([res.replace('\n', '').replace('```json', '').replace('```', '') for res in results if res != "CONNECTION_ERROR"])
+        logger.info(f"大纲结果合并完成，总长度={len(outlines)}")
+        return outlines
+    else:
+        outlines = '\n'.join([res for res in results if res != "CONNECTION_ERROR"])
+        if len(outlines) > MAX_CONTENT_LENGTH:
+            logger.info(f"结果过长({len(outlines)}字符)，截断至{MAX_CONTENT_LENGTH}字符")
+            outlines = outlines[:MAX_CONTENT_LENGTH]
+        return outlines
+
+
+def llm_task(search_result, question, output_type, model_type, model_name, max_workers=20, progress_callback: Optional[callable] = None):
+    """
+    使用线程池并发处理搜索结果，并提供进度回调
+    :param search_result: 搜索结果列表
+    :param question: 查询问题
+    :param output_type: 输出类型
+    :param model_type: 模型类型
+    :param model_name: 模型名称
+    :param max_workers: 最大线程数
+    :param progress_callback: 进度回调函数，接收 (completed_count, total_count)
+    :return: 处理后的结果
+    """
+    if model_type == 'glm':
+        max_workers = 10
+    
+    task_description = ""
+    if "---任务---" in output_type:
+        task_parts = output_type.split("---任务---")
+        if len(task_parts) > 1:
+            task_description = task_parts[1].split("---")[0].strip()
+    
+    logger.info(f"开始处理LLM任务: 模型={model_type}/{model_name}, 任务类型=---任务---{task_description}---, 搜索结果数量={len(search_result)}")
+
+    optimized_search_result = _prepare_llm_chunks(search_result, question)
+
     connection_error = None
     
     def process_result_wrapper(content, question, output_type, model_type, model_name):
@@ -310,17 +288,73 @@ def llm_task(search_result, question, output_type, model_type, model_name, max_w
         raise connection_error
     
     logger.info(f"所有LLM任务已完成，获取到{len(results)}个结果")
-    
-    if output_type == prompt_template.ARTICLE_OUTLINE_GEN:
-        outlines = '\n'.join([res.replace('\n', '').replace('```json', '').replace('```', '') for res in results if res != "CONNECTION_ERROR"])
-        logger.info(f"大纲结果合并完成，总长度={len(outlines)}")
-        return outlines
-    else:
-        outlines = '\n'.join([res for res in results if res != "CONNECTION_ERROR"])
-        if len(outlines) > MAX_CONTENT_LENGTH:
-            logger.info(f"结果过长({len(outlines)}字符)，截断至{MAX_CONTENT_LENGTH}字符")
-            outlines = outlines[:MAX_CONTENT_LENGTH]
-        return outlines
+
+    return _merge_llm_results(results, output_type)
+
+
+async def aprocess_result(content, question, output_type=prompt_template.ARTICLE, model_type='deepseek', model_name='deepseek-chat'):
+    """
+    process_result 的异步版本
+    :param content: 搜索结果内容
+    :param question: 查询问题
+    :param output_type: 输出类型
+    :return: 摘要内容
+    """
+    html_content = content[:30000]
+    logger.debug(f"处理任务: 模型={model_type}/{model_name}, 内容长度={len(html_content)}")
+    chat_result = await achat(f'## 参考的上下文资料：<content>{html_content}</content> ## 请严格依据topic完成相关任务：<topic>{question}</topic> ', output_type, model_type, model_name)
+    logger.debug(f"任务完成: 结果长度={len(chat_result)}")
+    return chat_result
+
+
+async def allm_task(search_result, question, output_type, model_type, model_name, progress_callback: Optional[callable] = None):
+    """
+    llm_task 的异步版本：在事件循环中并发处理搜索结果，不占用线程池
+    并发度由 achat 的提供商级信号量控制
+    :param search_result: 搜索结果列表
+    :param question: 查询问题
+    :param output_type: 输出类型
+    :param model_type: 模型类型
+    :param model_name: 模型名称
+    :param progress_callback: 进度回调函数，接收 (completed_count, total_count)
+    :return: 处理后的结果
+    """
+    logger.info(f"开始处理异步LLM任务: 模型={model_type}/{model_name}, 搜索结果数量={len(search_result)}")
+
+    optimized_search_result = _prepare_llm_chunks(search_result, question)
+
+    tasks = [
+        asyncio.create_task(aprocess_result(item['html_content'], question, output_type, model_type, model_name))
+        for item in optimized_search_result
+    ]
+    logger.info(f"已提交{len(tasks)}个异步LLM任务，等待完成...")
+
+    results = []
+    completed_count = 0
+    total_count = len(tasks)
+    try:
+        for future in asyncio.as_completed(tasks):
+            try:
+                result = await future
+            except ConnectionError as e:
+                logger.error(f"检测到连接错误，正在中止其余任务: {str(e)}")
+                raise
+
+            results.append(result)
+            completed_count += 1
+            if progress_callback:
+                try:
+                    progress_callback(completed_count, total_count)
+                except Exception as e:
+                    logger.error(f"进度回调函数出错: {e}")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    logger.info(f"所有异步LLM任务已完成，获取到{len(results)}个结果")
+    return _merge_llm_results(results, output_type)
+
 
 class Search:
     def __init__(self, result_num=DEFAULT_SPIDER_NUM):
@@ -436,6 +470,28 @@ class Search:
             # 出错时返回原始结果，不影响后续流程
             return search_results
 
+    def _filter_ambiguous_results(self, ambiguous: list, user_topic: str, model_type: str, model_name: str) -> list:
+        """
+        对 BM25 中间带结果做 LLM 相关性审核，超时则按 BM25 分数确定性回退
+        """
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(
+            self.filter_relevant_results_with_llm,
+            search_results=ambiguous,
+            user_topic=user_topic,
+            model_type=model_type,
+            model_name=model_name
+        )
+        try:
+            return future.result(timeout=LLM_FILTER_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            fallback = [item for item in ambiguous if item.get('lexical_score', 0) >= LLM_FILTER_FALLBACK_SCORE]
+            logger.warning(f"LLM相关性审核超时 ({LLM_FILTER_TIMEOUT}s)，按 BM25 分数回退: {len(ambiguous)} 条 -> {len(fallback)} 条")
+            return fallback
+        finally:
+            # 不等待超时的 LLM 调用结束
+            executor.shutdown(wait=False)
+
     def deduplicate_urls(self, urls_with_data, key='url'):
         """
         在当前批次内去除重复URL，使用高级URL标准化和相似性检查
@@ -485,65 +541,30 @@ class Search:
     def query_search(self, query: str):
         """
         发送请求到搜索引擎，获取JSON响应
-        整合 DDGS 和 Serper 搜索结果
+        并发查询各搜索引擎（默认 DDGS + Serper），每个引擎有独立截止时间，
+        结果按完成顺序增量合并去重
         :param query: 查询词（已优化）
         :return: JSON数据，包含合并后的搜索结果
         """
-        all_results = []
-        ddgs_count = 0
-        serper_count = 0
-        
-        # 1. 使用 DDGS (DuckDuckGo Search) 搜索
-        try:
-            logger.info(f"DDGS 搜索开始: {query}, 最大结果数: {self.result_num}")
-            ddgs_raw_results = search_ddgs(query, search_type="text", max_results=self.result_num)
-            
-            # 转换 DDGS 结果为统一格式
-            ddgs_results = []
-            for idx, item in enumerate(ddgs_raw_results):
-                formatted_item = {
-                    'title': item.get('title', ''),
-                    'url': item.get('href', ''),  # DDGS 使用 'href'
-                    'content': item.get('body', ''),  # DDGS 使用 'body'
-                    'score': 1.0 - idx * 0.03,  # 根据位置计算分数
-                    'source': 'ddgs'  # 标记来源
-                }
-                ddgs_results.append(formatted_item)
-            
-            ddgs_count = len(ddgs_results)
-            logger.info(f"DDGS 搜索结果: {ddgs_count} 条")
-            all_results.extend(ddgs_results)
-        except Exception as e:
-            logger.error(f"DDGS 搜索失败: {e}")
-        
-        # 2. 使用 Serper 搜索引擎（仅当 API Key 有效时）
         # 动态读取 settings.SERPER_API_KEY，避免静态导入在 backend 上下文中为 None
         _serper_key = getattr(settings, 'SERPER_API_KEY', None) or SERPER_API_KEY
-        if _serper_key:
-            try:
-                logger.info(f"Serper 搜索开始: query='{query}'")
-                serper_results = serper_search(
-                    api_key=_serper_key,
-                    query=query,
-                    gl="cn",
-                    hl="zh-cn",
-                    time_range="y"  # 一年内的结果
-                )
-                
-                if serper_results:
-                    serper_count = len(serper_results)
-                    logger.info(f"Serper 搜索结果: {serper_count} 条")
-                    all_results.extend(serper_results)
-                else:
-                    logger.warning("Serper 搜索返回空列表")
-            except Exception as e:
-                logger.error(f"Serper 搜索失败: {e}", exc_info=True)
-        else:
-            logger.info("Serper API Key 未配置，跳过 Serper 搜索")
-        
-        # 3. 返回合并后的结果
-        logger.info(f"合并搜索结果: DDGS ({ddgs_count}) + Serper ({serper_count}) = 总计 {len(all_results)} 条")
-        return {'results': all_results, 'unfiltered_count': len(all_results)}
+        engines = build_engines(serper_api_key=_serper_key)
+        logger.info(f"并发搜索开始: {query}, 引擎: {[engine.name for engine in engines]}, DDGS 最大结果数: {self.result_num}")
+
+        all_results = []
+        unfiltered_count = 0
+
+        def _merge(engine_name, results):
+            nonlocal all_results, unfiltered_count
+            unfiltered_count += len(results)
+            all_results = self.deduplicate_urls(all_results + results)
+
+        counts = run_engines(engines, query, self.result_num, _merge)
+
+        # 返回合并后的结果
+        summary = " + ".join(f"{name} ({count})" for name, count in counts.items())
+        logger.info(f"合并搜索结果: {summary} = 去重后 {len(all_results)} 条")
+        return {'results': all_results, 'unfiltered_count': unfiltered_count}
 
     def get_search_result(self, question: str, theme="", spider_mode=False, progress_callback: Optional[callable] = None, username: str = None, article_id: str = None, model_type: str = 'deepseek', model_name: str = 'deepseek-chat'):
         # 先优化查询词，提取关键词
@@ -572,19 +593,19 @@ class Search:
         
         # 检查是否有搜索结果
         if data and data.get('results'):
-            # 使用LLM进行相关性审核，过滤掉不相关的结果
+            # 先用 BM25 词法预筛选：明显相关的直接保留、明显无关的直接丢弃，
+            # 只有中间带交给 LLM 相关性审核
             original_count = len(data['results'])
-            filtered_results = self.filter_relevant_results_with_llm(
-                search_results=data['results'],
-                user_topic=question,  # 使用原始问题而非优化后的查询词
-                model_type=model_type,
-                model_name=model_name
-            )
-            
+            confident, ambiguous, dropped = lexical_prefilter(data['results'], f"{question} {optimizeq}")
+            llm_kept = self._filter_ambiguous_results(ambiguous, question, model_type, model_name) if ambiguous else []
+            kept_ids = {id(item) for item in confident + llm_kept}
+            filtered_results = [item for item in data['results'] if id(item) in kept_ids]
+
             # 更新data中的结果为过滤后的结果
             data['results'] = filtered_results
-            logger.info(f"LLM相关性过滤: {original_count} 条 -> {len(filtered_results)} 条")
-            
+            logger.info(f"相关性过滤: {original_count} 条 -> {len(filtered_results)} 条 "
+                        f"(BM25 直接保留 {len(confident)}，LLM 审核 {len(ambiguous)} 保留 {len(llm_kept)}，BM25 丢弃 {len(dropped)})")
+
             # 注释：不在此处直接添加结果，而是在下面进行相关性评分后再添加
             # 避免重复添加导致结果数量翻倍
             # search_engine_items = []
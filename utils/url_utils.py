@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+URL 规范化与相似性判断工具
+
+不依赖 settings，可被抓取缓存等底层模块直接导入；
+searxng_utils 中保留同名导出。
+"""
+
+import re
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+
+def normalize_url(url: str) -> str:
+    """将 URL 进行规范化，便于去重与相似性判断。
+    规则：
+    - 小写 scheme 和 host
+    - 去除 fragment
+    - 去除常见追踪参数（utm_*、gclid、fbclid 等）
+    - 规范化路径的多余斜杠与结尾斜杠
+    - 对于无效 URL，返回原始字符串以避免崩溃
+    """
+    try:
+        pr = urlparse(url)
+        scheme = (pr.scheme or 'http').lower()
+        netloc = pr.netloc.lower()
+
+        # 规范化路径：去除多余斜杠
+        path = re.sub(r'/+', '/', pr.path or '/')
+        # 移除结尾斜杠，根路径保留 '/'
+        if path != '/' and path.endswith('/'):
+            path = path[:-1]
+
+        # 清理查询参数
+        tracking_keys = {
+            'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+            'gclid', 'fbclid', 'igshid', 'spm', 'mkt_tok'
+        }
+        query_pairs = [(k, v) for k, v in parse_qsl(pr.query, keep_blank_values=True) if k not in tracking_keys]
+        # 按键排序，避免顺序影响去重
+        query_pairs.sort(key=lambda x: x[0])
+        query = urlencode(query_pairs, doseq=True)
+
+        # 去除 fragment
+        fragment = ''
+
+        normalized = urlunparse((scheme, netloc, path, '', query, fragment))
+        return normalized
+    except Exception:
+        return url
+
+
+def is_similar_url(a: str, b: str) -> bool:
+    """判断两个 URL 是否相似。
+    规则：
+    - 完全相等直接相似
+    - 域名与路径相同（忽略查询参数顺序与追踪参数）判定为相似
+    - 常见的 www 前缀差异等也视为相似
+    """
+    na = normalize_url(a)
+    nb = normalize_url(b)
+    if na == nb:
+        return True
+    pra, prb = urlparse(na), urlparse(nb)
+    # 去掉 www 前缀对比
+    host_a = pra.netloc[4:] if pra.netloc.startswith('www.') else pra.netloc
+    host_b = prb.netloc[4:] if prb.netloc.startswith('www.') else prb.netloc
+    if host_a != host_b:
+        return False
+    # 路径一致则认为相似（查询参数差异忽略）
+    return pra.path == prb.path